@@ -0,0 +1,73 @@
+"""monthly rollups for reports
+
+Revision ID: 0006_monthly_rollups
+Revises: 0005_add_account_note
+Create Date: 2025-09-05 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+revision = "0006_monthly_rollups"
+down_revision = "0005_add_account_note"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "account_month_rollups",
+        sa.Column("account_id", pg.UUID(as_uuid=True), sa.ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("month", sa.Date(), primary_key=True, nullable=False),
+        sa.Column("budget_id", pg.UUID(as_uuid=True), sa.ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("inflow_cents", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("outflow_cents", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("net_cents", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_account_month_rollups_budget_month", "account_month_rollups", ["budget_id", "month"])
+
+    op.create_table(
+        "category_month_rollups",
+        sa.Column("category_id", pg.UUID(as_uuid=True), sa.ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("month", sa.Date(), primary_key=True, nullable=False),
+        sa.Column("budget_id", pg.UUID(as_uuid=True), sa.ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("activity_cents", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_category_month_rollups_budget_month", "category_month_rollups", ["budget_id", "month"])
+
+    # Backfill from the existing ledger
+    op.execute(
+        """
+        INSERT INTO account_month_rollups (account_id, month, budget_id, inflow_cents, outflow_cents, net_cents)
+        SELECT t.account_id,
+               date_trunc('month', t.date)::date,
+               t.budget_id,
+               COALESCE(SUM(t.amount_cents) FILTER (WHERE t.transfer_tx_id IS NULL AND t.amount_cents > 0), 0),
+               COALESCE(-SUM(t.amount_cents) FILTER (WHERE t.transfer_tx_id IS NULL AND t.amount_cents < 0), 0),
+               SUM(t.amount_cents)
+        FROM transactions t
+        WHERE t.deleted_at IS NULL
+        GROUP BY t.account_id, date_trunc('month', t.date)::date, t.budget_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO category_month_rollups (category_id, month, budget_id, activity_cents)
+        SELECT s.category_id,
+               date_trunc('month', t.date)::date,
+               t.budget_id,
+               SUM(s.amount_cents)
+        FROM subtransactions s
+        JOIN transactions t ON t.id = s.transaction_id
+        WHERE t.deleted_at IS NULL AND s.category_id IS NOT NULL
+        GROUP BY s.category_id, date_trunc('month', t.date)::date, t.budget_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_category_month_rollups_budget_month", table_name="category_month_rollups")
+    op.drop_table("category_month_rollups")
+    op.drop_index("ix_account_month_rollups_budget_month", table_name="account_month_rollups")
+    op.drop_table("account_month_rollups")
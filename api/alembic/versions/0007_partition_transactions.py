@@ -0,0 +1,144 @@
+"""hash-partition transactions and subtransactions by budget
+
+Revision ID: 0007_partition_transactions
+Revises: 0006_monthly_rollups
+Create Date: 2025-09-12 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+revision = "0007_partition_transactions"
+down_revision = "0006_monthly_rollups"
+branch_labels = None
+depends_on = None
+
+PARTITIONS = 16
+
+
+def _create_partitions(table: str) -> None:
+    for i in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE {table}_p{i} PARTITION OF {table} "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {i})"
+        )
+
+
+def upgrade() -> None:
+    # Build partitioned copies next to the old heaps, move the rows, then swap
+    # names. Runs in the migration transaction; writers block until it commits.
+    op.execute(
+        """
+        CREATE TABLE transactions_new (
+            id uuid NOT NULL,
+            budget_id uuid NOT NULL REFERENCES budgets(id) ON DELETE CASCADE,
+            account_id uuid NOT NULL REFERENCES accounts(id) ON DELETE CASCADE,
+            date date NOT NULL,
+            amount_cents integer NOT NULL,
+            state varchar(16) NOT NULL DEFAULT 'uncleared',
+            memo text,
+            payee_id uuid REFERENCES payees(id),
+            import_id varchar(255),
+            transfer_tx_id uuid,
+            deleted_at timestamptz,
+            income_month date,
+            PRIMARY KEY (budget_id, id)
+        ) PARTITION BY HASH (budget_id)
+        """
+    )
+    _create_partitions("transactions_new")
+
+    op.execute(
+        """
+        CREATE TABLE subtransactions_new (
+            id uuid NOT NULL,
+            budget_id uuid NOT NULL,
+            transaction_id uuid NOT NULL,
+            date date NOT NULL,
+            category_id uuid REFERENCES categories(id),
+            amount_cents integer NOT NULL,
+            memo text,
+            PRIMARY KEY (budget_id, id)
+        ) PARTITION BY HASH (budget_id)
+        """
+    )
+    _create_partitions("subtransactions_new")
+
+    op.execute(
+        """
+        INSERT INTO transactions_new (id, budget_id, account_id, date, amount_cents, state, memo,
+                                      payee_id, import_id, transfer_tx_id, deleted_at, income_month)
+        SELECT id, budget_id, account_id, date, amount_cents, state, memo,
+               payee_id, import_id, transfer_tx_id, deleted_at, income_month
+        FROM transactions
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO subtransactions_new (id, budget_id, transaction_id, date, category_id, amount_cents, memo)
+        SELECT s.id, t.budget_id, s.transaction_id, t.date, s.category_id, s.amount_cents, s.memo
+        FROM subtransactions s
+        JOIN transactions t ON t.id = s.transaction_id
+        """
+    )
+
+    op.drop_table("subtransactions")
+    op.drop_table("transactions")
+
+    op.rename_table("transactions_new", "transactions")
+    op.rename_table("subtransactions_new", "subtransactions")
+    for i in range(PARTITIONS):
+        op.rename_table(f"transactions_new_p{i}", f"transactions_p{i}")
+        op.rename_table(f"subtransactions_new_p{i}", f"subtransactions_p{i}")
+
+    op.create_foreign_key(
+        "subtransactions_transaction_fkey",
+        "subtransactions",
+        "transactions",
+        ["budget_id", "transaction_id"],
+        ["budget_id", "id"],
+        ondelete="CASCADE",
+    )
+    # Indexes on a partitioned parent cascade to every partition
+    op.create_index("ix_transactions_budget_date", "transactions", ["budget_id", "date"])
+    op.create_index("ix_transactions_account_date", "transactions", ["account_id", "date"])
+    op.create_index("ix_subtransactions_tx", "subtransactions", ["budget_id", "transaction_id"])
+    op.create_index("ix_subtransactions_budget_date", "subtransactions", ["budget_id", "date"])
+
+
+def downgrade() -> None:
+    op.create_table(
+        "transactions_old",
+        sa.Column("id", pg.UUID(as_uuid=True), primary_key=True, nullable=False),
+        sa.Column("budget_id", pg.UUID(as_uuid=True), sa.ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("account_id", pg.UUID(as_uuid=True), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("amount_cents", sa.Integer(), nullable=False),
+        sa.Column("state", sa.String(length=16), nullable=False, server_default="uncleared"),
+        sa.Column("memo", sa.Text(), nullable=True),
+        sa.Column("payee_id", pg.UUID(as_uuid=True), sa.ForeignKey("payees.id"), nullable=True),
+        sa.Column("import_id", sa.String(length=255), nullable=True),
+        sa.Column("transfer_tx_id", pg.UUID(as_uuid=True), nullable=True),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("income_month", sa.Date(), nullable=True),
+    )
+    op.create_table(
+        "subtransactions_old",
+        sa.Column("id", pg.UUID(as_uuid=True), primary_key=True, nullable=False),
+        sa.Column("transaction_id", pg.UUID(as_uuid=True), sa.ForeignKey("transactions_old.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("category_id", pg.UUID(as_uuid=True), sa.ForeignKey("categories.id"), nullable=True),
+        sa.Column("amount_cents", sa.Integer(), nullable=False),
+        sa.Column("memo", sa.Text(), nullable=True),
+    )
+    op.execute("INSERT INTO transactions_old SELECT id, budget_id, account_id, date, amount_cents, state, memo, payee_id, import_id, transfer_tx_id, deleted_at, income_month FROM transactions")
+    op.execute("INSERT INTO subtransactions_old SELECT id, transaction_id, category_id, amount_cents, memo FROM subtransactions")
+
+    # Dropping the parents drops every partition with them
+    op.drop_table("subtransactions")
+    op.drop_table("transactions")
+    op.rename_table("transactions_old", "transactions")
+    op.rename_table("subtransactions_old", "subtransactions")
+    op.create_index("ix_transactions_budget_date", "transactions", ["budget_id", "date"])
+    op.create_index("ix_transactions_account_date", "transactions", ["account_id", "date"])
+    op.create_index("ix_subtransactions_tx", "subtransactions", ["transaction_id"])
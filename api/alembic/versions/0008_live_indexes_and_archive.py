@@ -0,0 +1,100 @@
+"""partial live-row indexes and archive tables for purged transactions
+
+Revision ID: 0008_live_indexes_and_archive
+Revises: 0007_partition_transactions
+Create Date: 2025-09-14 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+revision = "0008_live_indexes_and_archive"
+down_revision = "0007_partition_transactions"
+branch_labels = None
+depends_on = None
+
+LIVE = sa.text("deleted_at IS NULL")
+
+
+def upgrade() -> None:
+    # Hot ledger queries only ever read live rows; index just those
+    op.drop_index("ix_transactions_budget_date", table_name="transactions")
+    op.drop_index("ix_transactions_account_date", table_name="transactions")
+    # Register listing: budget, newest first
+    op.create_index(
+        "ix_transactions_live_budget_date",
+        "transactions",
+        ["budget_id", sa.text("date DESC"), sa.text("id DESC")],
+        postgresql_where=LIVE,
+    )
+    # Account balances/registers; amount included for index-only SUMs
+    op.create_index(
+        "ix_transactions_live_account_date",
+        "transactions",
+        ["budget_id", "account_id", "date"],
+        postgresql_include=["amount_cents"],
+        postgresql_where=LIVE,
+    )
+    # Ready-to-assign income per month
+    op.create_index(
+        "ix_transactions_live_income_month",
+        "transactions",
+        ["budget_id", "income_month"],
+        postgresql_include=["account_id", "amount_cents"],
+        postgresql_where=sa.text("deleted_at IS NULL AND income_month IS NOT NULL"),
+    )
+    # Purge scan over the (small) set of tombstones
+    op.create_index(
+        "ix_transactions_deleted_at",
+        "transactions",
+        ["deleted_at"],
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+    )
+
+    op.create_table(
+        "transactions_archive",
+        sa.Column("id", pg.UUID(as_uuid=True), nullable=False),
+        sa.Column("budget_id", pg.UUID(as_uuid=True), sa.ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("account_id", pg.UUID(as_uuid=True), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("amount_cents", sa.Integer(), nullable=False),
+        sa.Column("state", sa.String(length=16), nullable=False),
+        sa.Column("memo", sa.Text(), nullable=True),
+        sa.Column("payee_id", pg.UUID(as_uuid=True), nullable=True),
+        sa.Column("import_id", sa.String(length=255), nullable=True),
+        sa.Column("transfer_tx_id", pg.UUID(as_uuid=True), nullable=True),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("income_month", sa.Date(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.PrimaryKeyConstraint("budget_id", "id"),
+    )
+    op.create_table(
+        "subtransactions_archive",
+        sa.Column("id", pg.UUID(as_uuid=True), nullable=False),
+        sa.Column("budget_id", pg.UUID(as_uuid=True), nullable=False),
+        sa.Column("transaction_id", pg.UUID(as_uuid=True), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("category_id", pg.UUID(as_uuid=True), nullable=True),
+        sa.Column("amount_cents", sa.Integer(), nullable=False),
+        sa.Column("memo", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("budget_id", "id"),
+        sa.ForeignKeyConstraint(
+            ["budget_id", "transaction_id"],
+            ["transactions_archive.budget_id", "transactions_archive.id"],
+            ondelete="CASCADE",
+        ),
+    )
+    op.create_index("ix_subtransactions_archive_tx", "subtransactions_archive", ["budget_id", "transaction_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_subtransactions_archive_tx", table_name="subtransactions_archive")
+    op.drop_table("subtransactions_archive")
+    op.drop_table("transactions_archive")
+    op.drop_index("ix_transactions_deleted_at", table_name="transactions")
+    op.drop_index("ix_transactions_live_income_month", table_name="transactions")
+    op.drop_index("ix_transactions_live_account_date", table_name="transactions")
+    op.drop_index("ix_transactions_live_budget_date", table_name="transactions")
+    op.create_index("ix_transactions_budget_date", "transactions", ["budget_id", "date"])
+    op.create_index("ix_transactions_account_date", "transactions", ["account_id", "date"])
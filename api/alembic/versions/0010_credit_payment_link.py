@@ -0,0 +1,47 @@
+"""link credit card payment categories to their card account
+
+Revision ID: 0010_credit_payment_link
+Revises: 0009_idempotency_keys
+Create Date: 2025-09-20 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+revision = "0010_credit_payment_link"
+down_revision = "0009_idempotency_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "categories",
+        sa.Column("credit_account_id", pg.UUID(as_uuid=True), sa.ForeignKey("accounts.id", ondelete="SET NULL"), nullable=True),
+    )
+    op.create_index(
+        "ux_categories_credit_account",
+        "categories",
+        ["credit_account_id"],
+        unique=True,
+        postgresql_where=sa.text("credit_account_id IS NOT NULL"),
+    )
+    # Existing payment categories are named after their card
+    op.execute(
+        """
+        UPDATE categories c
+        SET credit_account_id = a.id
+        FROM accounts a
+        WHERE c.is_credit_payment
+          AND a.budget_id = c.budget_id
+          AND a.type = 'credit'
+          AND a.name = c.name
+          AND NOT EXISTS (SELECT 1 FROM categories o WHERE o.credit_account_id = a.id)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_categories_credit_account", table_name="categories")
+    op.drop_column("categories", "credit_account_id")
@@ -0,0 +1,37 @@
+"""age of money checkpoints and daily spend ages
+
+Revision ID: 0011_age_of_money
+Revises: 0010_credit_payment_link
+Create Date: 2025-09-22 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+revision = "0011_age_of_money"
+down_revision = "0010_credit_payment_link"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "age_of_money_checkpoints",
+        sa.Column("budget_id", pg.UUID(as_uuid=True), sa.ForeignKey("budgets.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("through_date", sa.Date(), primary_key=True, nullable=False),
+        sa.Column("queue", pg.JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    op.create_table(
+        "age_of_money_days",
+        sa.Column("budget_id", pg.UUID(as_uuid=True), sa.ForeignKey("budgets.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("date", sa.Date(), primary_key=True, nullable=False),
+        sa.Column("spent_cents", sa.BigInteger(), nullable=False),
+        sa.Column("age_weighted", sa.BigInteger(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("age_of_money_days")
+    op.drop_table("age_of_money_checkpoints")
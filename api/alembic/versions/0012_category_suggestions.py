@@ -0,0 +1,40 @@
+"""payee/memo -> category suggestion weights
+
+Revision ID: 0012_category_suggestions
+Revises: 0011_age_of_money
+Create Date: 2025-09-29 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+revision = "0012_category_suggestions"
+down_revision = "0011_age_of_money"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "category_suggestions",
+        sa.Column("budget_id", pg.UUID(as_uuid=True), sa.ForeignKey("budgets.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("key", sa.String(80), primary_key=True, nullable=False),
+        sa.Column("category_id", pg.UUID(as_uuid=True), sa.ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("weight", sa.Float(), nullable=False),
+        sa.Column("updated_on", sa.Date(), nullable=False),
+    )
+    op.create_table(
+        "category_suggestion_sources",
+        sa.Column("budget_id", pg.UUID(as_uuid=True), sa.ForeignKey("budgets.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("transaction_id", pg.UUID(as_uuid=True), primary_key=True, nullable=False),
+        sa.Column("keys", pg.ARRAY(sa.String(80)), nullable=False),
+        sa.Column("category_id", pg.UUID(as_uuid=True), sa.ForeignKey("categories.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+    )
+    # Existing budgets are backfilled by the "suggestions.rebuild" job
+
+
+def downgrade() -> None:
+    op.drop_table("category_suggestion_sources")
+    op.drop_table("category_suggestions")
@@ -0,0 +1,29 @@
+"""live-row index for duplicate detection
+
+Revision ID: 0013_duplicate_lookup_index
+Revises: 0012_category_suggestions
+Create Date: 2025-10-02 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013_duplicate_lookup_index"
+down_revision = "0012_category_suggestions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Same account, same amount, date range: one index range scan per (account, amount)
+    op.create_index(
+        "ix_transactions_live_account_amount_date",
+        "transactions",
+        ["account_id", "amount_cents", "date"],
+        postgresql_include=["payee_id"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_live_account_amount_date", table_name="transactions")
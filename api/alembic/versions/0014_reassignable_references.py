@@ -0,0 +1,48 @@
+"""reassignable category/payee references and one assignment row per category month
+
+Revision ID: 0014_reassignable_references
+Revises: 0013_duplicate_lookup_index
+Create Date: 2025-10-06 00:00:00
+
+"""
+from alembic import op
+
+revision = "0014_reassignable_references"
+down_revision = "0013_duplicate_lookup_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 0007 created these on the *_new tables, so they kept that name through the swap
+    op.execute("ALTER TABLE subtransactions DROP CONSTRAINT subtransactions_new_category_id_fkey")
+    op.create_foreign_key(
+        "subtransactions_category_id_fkey", "subtransactions", "categories", ["category_id"], ["id"], ondelete="SET NULL"
+    )
+    op.execute("ALTER TABLE transactions DROP CONSTRAINT transactions_new_payee_id_fkey")
+    op.create_foreign_key(
+        "transactions_payee_id_fkey", "transactions", "payees", ["payee_id"], ["id"], ondelete="SET NULL"
+    )
+
+    # Reads already treat the newest row of a (category, month) as the value; keep only it
+    op.execute(
+        """
+        DELETE FROM monthly_category_budget m
+        USING (
+            SELECT id, row_number() OVER (PARTITION BY category_id, month ORDER BY updated_at DESC, id) AS rn
+            FROM monthly_category_budget
+        ) d
+        WHERE m.id = d.id AND d.rn > 1
+        """
+    )
+    op.create_unique_constraint("uq_mcb_category_month", "monthly_category_budget", ["category_id", "month"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_mcb_category_month", "monthly_category_budget", type_="unique")
+    op.drop_constraint("transactions_payee_id_fkey", "transactions", type_="foreignkey")
+    op.create_foreign_key("transactions_new_payee_id_fkey", "transactions", "payees", ["payee_id"], ["id"])
+    op.drop_constraint("subtransactions_category_id_fkey", "subtransactions", type_="foreignkey")
+    op.create_foreign_key(
+        "subtransactions_new_category_id_fkey", "subtransactions", "categories", ["category_id"], ["id"]
+    )
@@ -0,0 +1,61 @@
+"""period closes: opening balances, carry-ins, closed rows in the archive
+
+Revision ID: 0015_period_closes
+Revises: 0014_reassignable_references
+Create Date: 2025-10-20 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+revision = "0015_period_closes"
+down_revision = "0014_reassignable_references"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "period_closes",
+        sa.Column("id", pg.UUID(as_uuid=True), primary_key=True, nullable=False),
+        sa.Column("budget_id", pg.UUID(as_uuid=True), sa.ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("cutoff", sa.Date(), nullable=False),
+        sa.Column("summary", pg.JSONB(), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("reopened_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_period_closes_budget_cutoff", "period_closes", ["budget_id", "cutoff"])
+    op.create_table(
+        "period_close_carry_ins",
+        sa.Column("close_id", pg.UUID(as_uuid=True), sa.ForeignKey("period_closes.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("category_id", pg.UUID(as_uuid=True), sa.ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("budget_id", pg.UUID(as_uuid=True), sa.ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("assigned_cents", sa.Integer(), nullable=False),
+        sa.Column("activity_cents", sa.Integer(), nullable=False),
+    )
+    # Nullable without a default: a catalog-only change, also on the hash partitions
+    op.add_column("transactions", sa.Column("close_id", pg.UUID(as_uuid=True), nullable=True))
+    op.add_column("transactions_archive", sa.Column("close_id", pg.UUID(as_uuid=True), nullable=True))
+    op.create_index(
+        "ix_transactions_close",
+        "transactions",
+        ["budget_id", "close_id"],
+        postgresql_where=sa.text("close_id IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_transactions_archive_close",
+        "transactions_archive",
+        ["budget_id", "close_id"],
+        postgresql_where=sa.text("close_id IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_archive_close", table_name="transactions_archive")
+    op.drop_index("ix_transactions_close", table_name="transactions")
+    op.drop_column("transactions_archive", "close_id")
+    op.drop_column("transactions", "close_id")
+    op.drop_table("period_close_carry_ins")
+    op.drop_index("ix_period_closes_budget_cutoff", table_name="period_closes")
+    op.drop_table("period_closes")
@@ -0,0 +1,89 @@
+"""enforce period closes in the database
+
+Revision ID: 0016_period_close_guards
+Revises: 0015_period_closes
+Create Date: 2025-10-21 00:00:00
+
+"""
+from alembic import op
+
+revision = "0016_period_close_guards"
+down_revision = "0015_period_closes"
+branch_labels = None
+depends_on = None
+
+
+# Writes dated before the budget's active close are refused with SQLSTATE MB409
+# (mapped to 409 by the API), whatever the API worker believes about the close.
+# The close/reopen jobs and category merges set markbudget.closed_writes for
+# their own transaction. Deletes are not checked: only account deletion
+# (cascade) and the tombstone purge hard-delete ledger rows.
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE FUNCTION enforce_open_period() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            closed_before date;
+        BEGIN
+            IF current_setting('markbudget.closed_writes', true) = 'on' THEN
+                RETURN NEW;
+            END IF;
+            SELECT max(c.cutoff) INTO closed_before
+            FROM period_closes c
+            WHERE c.budget_id = NEW.budget_id AND c.reopened_at IS NULL;
+            IF closed_before IS NOT NULL AND (
+                NEW.date < closed_before
+                OR (to_jsonb(NEW) ->> 'income_month')::date < closed_before
+                OR (TG_OP = 'UPDATE' AND OLD.date < closed_before)
+            ) THEN
+                RAISE EXCEPTION 'The period before % is closed', closed_before USING ERRCODE = 'MB409';
+            END IF;
+            RETURN NEW;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION enforce_open_month() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            closed_before date;
+        BEGIN
+            IF current_setting('markbudget.closed_writes', true) = 'on' THEN
+                RETURN NEW;
+            END IF;
+            SELECT max(c.cutoff) INTO closed_before
+            FROM period_closes c
+            JOIN categories k ON k.budget_id = c.budget_id
+            WHERE k.id = NEW.category_id AND c.reopened_at IS NULL;
+            IF closed_before IS NOT NULL AND (
+                NEW.month < closed_before OR (TG_OP = 'UPDATE' AND OLD.month < closed_before)
+            ) THEN
+                RAISE EXCEPTION 'The period before % is closed', closed_before USING ERRCODE = 'MB409';
+            END IF;
+            RETURN NEW;
+        END
+        $$
+        """
+    )
+    # Re-pointing payees/categories (merges) stays allowed; amounts, dates and accounts do not
+    op.execute(
+        "CREATE TRIGGER transactions_open_period BEFORE INSERT OR UPDATE OF date, amount_cents, account_id, "
+        "income_month, deleted_at ON transactions FOR EACH ROW EXECUTE FUNCTION enforce_open_period()"
+    )
+    op.execute(
+        "CREATE TRIGGER subtransactions_open_period BEFORE INSERT OR UPDATE OF date, amount_cents "
+        "ON subtransactions FOR EACH ROW EXECUTE FUNCTION enforce_open_period()"
+    )
+    op.execute(
+        "CREATE TRIGGER monthly_category_budget_open_period BEFORE INSERT OR UPDATE OF month, assigned_cents "
+        "ON monthly_category_budget FOR EACH ROW EXECUTE FUNCTION enforce_open_month()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER monthly_category_budget_open_period ON monthly_category_budget")
+    op.execute("DROP TRIGGER subtransactions_open_period ON subtransactions")
+    op.execute("DROP TRIGGER transactions_open_period ON transactions")
+    op.execute("DROP FUNCTION enforce_open_month()")
+    op.execute("DROP FUNCTION enforce_open_period()")
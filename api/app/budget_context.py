@@ -0,0 +1,150 @@
+"""Per-request budget context with a short-TTL in-process cache.
+
+`get_budget_context` resolves the budget and its ownership sets (accounts,
+groups, categories) in one query on a miss and from memory otherwise, so
+handlers can 404 unknown budgets and validate referenced ids without a round
+trip. Entries are dropped as soon as a commit touches the budget's structure:
+in this process through app.changes, in others (API and job workers) through
+the budget event channel (app.events). An id missing from a cached entry is
+confirmed against the primary before it is rejected, so a row created a moment
+ago elsewhere is never refused while the invalidation is in flight.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from uuid import UUID
+
+from fastapi import Depends, HTTPException
+import orjson
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import changes, events
+from app.config import Settings
+from app.db import SessionLocal, get_async_db
+from app.models.budget import Budget
+from app.models.account import Account
+from app.models.category import CategoryGroup, Category
+from app.models.period import PeriodClose
+
+
+settings = Settings()
+
+STRUCTURAL_ENTITIES = {"budgets", "accounts", "category_groups", "categories", "period_closes"}
+
+
+@dataclass(frozen=True)
+class BudgetContext:
+    id: UUID
+    name: str
+    currency: str
+    start_month: date
+    account_ids: frozenset[UUID]
+    on_budget_account_ids: frozenset[UUID]
+    group_ids: frozenset[UUID]
+    category_ids: frozenset[UUID]
+    # Cutoff of the active period close: months before it are read-only
+    closed_before: date | None
+    loaded_at: float
+
+    def _confirm(self, model, entity_id: UUID) -> bool:
+        # Misses only: one indexed lookup on the primary, then the stale entry goes
+        with SessionLocal() as db:
+            found = db.execute(sa.select(model.id).where(model.id == entity_id, model.budget_id == self.id)).first()
+        if found is not None:
+            invalidate(self.id)
+        return found is not None
+
+    def require_account(self, account_id: UUID, status: int = 404, detail: str = "Account not found") -> None:
+        if account_id not in self.account_ids and not self._confirm(Account, account_id):
+            raise HTTPException(status, detail)
+
+    def require_group(self, group_id: UUID, status: int = 404, detail: str = "Category group not found") -> None:
+        if group_id not in self.group_ids and not self._confirm(CategoryGroup, group_id):
+            raise HTTPException(status, detail)
+
+    def require_category(self, category_id: UUID, status: int = 404, detail: str = "Category not found") -> None:
+        if category_id not in self.category_ids and not self._confirm(Category, category_id):
+            raise HTTPException(status, detail)
+
+    def require_open(self, d: date, status: int = 409, detail: str | None = None) -> None:
+        if self.closed_before is not None and d < self.closed_before:
+            raise HTTPException(status, detail or f"The period before {self.closed_before.isoformat()} is closed")
+
+
+_cache: dict[UUID, BudgetContext] = {}
+_lock = threading.Lock()
+
+
+def invalidate(budget_id: UUID) -> None:
+    with _lock:
+        _cache.pop(budget_id, None)
+
+
+@changes.subscribe
+def _invalidate_on_structural_change(batch: list[changes.Change]) -> None:
+    for budget_id in {c.budget_id for c in batch if c.entity_type in STRUCTURAL_ENTITIES}:
+        invalidate(budget_id)
+
+
+@events.hub.listen
+def _invalidate_on_remote_change(budget_id: UUID | None, payload: bytes | None) -> None:
+    if budget_id is None:
+        with _lock:
+            _cache.clear()
+    elif any(entity_type in STRUCTURAL_ENTITIES for entity_type, _id, _op in orjson.loads(payload)["changes"]):
+        invalidate(budget_id)
+
+
+def _ids(stmt):
+    return sa.func.coalesce(stmt.scalar_subquery(), sa.text("'{}'::uuid[]"))
+
+
+async def load_budget_context(db: AsyncSession, budget_id: UUID) -> BudgetContext | None:
+    row = (
+        await db.execute(
+            sa.select(
+                Budget.id,
+                Budget.name,
+                Budget.currency,
+                Budget.start_month,
+                _ids(sa.select(sa.func.array_agg(Account.id)).where(Account.budget_id == Budget.id)).label("account_ids"),
+                _ids(
+                    sa.select(sa.func.array_agg(Account.id)).where(Account.budget_id == Budget.id, Account.on_budget.is_(True))
+                ).label("on_budget_account_ids"),
+                _ids(sa.select(sa.func.array_agg(CategoryGroup.id)).where(CategoryGroup.budget_id == Budget.id)).label("group_ids"),
+                _ids(sa.select(sa.func.array_agg(Category.id)).where(Category.budget_id == Budget.id)).label("category_ids"),
+                sa.select(sa.func.max(PeriodClose.cutoff))
+                .where(PeriodClose.budget_id == Budget.id, PeriodClose.reopened_at.is_(None))
+                .scalar_subquery()
+                .label("closed_before"),
+            ).where(Budget.id == budget_id)
+        )
+    ).one_or_none()
+    if row is None:
+        return None
+    return BudgetContext(
+        id=row.id,
+        name=row.name,
+        currency=row.currency,
+        start_month=row.start_month,
+        account_ids=frozenset(row.account_ids),
+        on_budget_account_ids=frozenset(row.on_budget_account_ids),
+        group_ids=frozenset(row.group_ids),
+        category_ids=frozenset(row.category_ids),
+        closed_before=row.closed_before,
+        loaded_at=time.monotonic(),
+    )
+
+
+async def get_budget_context(budget_id: UUID, db: AsyncSession = Depends(get_async_db)) -> BudgetContext:
+    ctx = _cache.get(budget_id)
+    if ctx is not None and time.monotonic() - ctx.loaded_at < settings.budget_context_ttl_seconds:
+        return ctx
+    ctx = await load_budget_context(db, budget_id)
+    if ctx is None:
+        raise HTTPException(404, "Budget not found")
+    with _lock:
+        _cache[budget_id] = ctx
+    return ctx
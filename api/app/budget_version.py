@@ -0,0 +1,47 @@
+"""Monotonic per-budget version, bumped after every commit that touches the budget.
+
+The shared counter lives in Redis (`budget:{id}:version`) so every worker sees
+the same value; while Redis is unreachable an in-process counter stands in.
+Each bump is published to the budget's event stream (app.events).
+"""
+import logging
+from collections import defaultdict
+from uuid import UUID
+
+from redis.exceptions import RedisError
+
+from app import changes, events
+from app.redis import sync_client, async_client
+
+
+logger = logging.getLogger("app.budget_version")
+
+_local: defaultdict[UUID, int] = defaultdict(int)
+
+
+def _key(budget_id: UUID) -> str:
+    return f"budget:{budget_id}:version"
+
+
+@changes.subscribe
+def _bump(batch: list[changes.Change]) -> None:
+    budget_ids = list({c.budget_id for c in batch})
+    for budget_id in budget_ids:
+        _local[budget_id] += 1
+    try:
+        pipe = sync_client().pipeline(transaction=False)
+        for budget_id in budget_ids:
+            pipe.incr(_key(budget_id))
+        versions = dict(zip(budget_ids, pipe.execute()))
+    except RedisError:
+        logger.warning("could not bump budget versions in Redis", exc_info=True)
+        return
+    events.publish(versions, batch)
+
+
+async def current(budget_id: UUID) -> str:
+    try:
+        shared = await async_client().get(_key(budget_id))
+    except RedisError:
+        return f"l{_local[budget_id]}"
+    return str(int(shared or 0))
@@ -0,0 +1,79 @@
+"""Budget-scoped change tracking.
+
+Every flush records which budget-owned rows were inserted, updated or deleted;
+once the session commits, the batch is handed to subscribers (cache
+invalidation, versioning, event fan-out). Writes that bypass the ORM (Core
+UPDATE/DELETE, COPY) call `record()` themselves.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Callable
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.budget import Budget
+
+
+logger = logging.getLogger("app.changes")
+
+_INFO_KEY = "budget_changes"
+
+
+@dataclass(frozen=True)
+class Change:
+    budget_id: UUID
+    entity_type: str
+    entity_id: UUID | None
+    op: str  # 'insert' | 'update' | 'delete'
+
+
+_subscribers: list[Callable[[list[Change]], None]] = []
+
+
+def subscribe(fn: Callable[[list[Change]], None]) -> Callable[[list[Change]], None]:
+    _subscribers.append(fn)
+    return fn
+
+
+def record(session: Session, budget_id: UUID, entity_type: str, entity_id: UUID | None = None, op: str = "update") -> None:
+    session.info.setdefault(_INFO_KEY, []).append(Change(budget_id, entity_type, entity_id, op))
+
+
+def _budget_of(obj) -> UUID | None:
+    if isinstance(obj, Budget):
+        return obj.id
+    return getattr(obj, "budget_id", None)
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    for op, objs in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objs:
+            if op == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            budget_id = _budget_of(obj)
+            if budget_id is None or not hasattr(obj, "__tablename__"):
+                continue
+            record(session, budget_id, obj.__tablename__, getattr(obj, "id", None), op)
+
+
+def _after_commit(session: Session) -> None:
+    changes = session.info.pop(_INFO_KEY, None)
+    if not changes:
+        return
+    for fn in _subscribers:
+        try:
+            fn(changes)
+        except Exception:  # subscribers must never turn a committed write into an error
+            logger.exception("change subscriber %r failed", fn)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_INFO_KEY, None)
+
+
+def register(target=Session) -> None:
+    event.listen(target, "after_flush", _after_flush)
+    event.listen(target, "after_commit", _after_commit)
+    event.listen(target, "after_rollback", _after_rollback)
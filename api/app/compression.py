@@ -0,0 +1,186 @@
+"""Response compression (zstd, br, gzip) negotiated from Accept-Encoding.
+
+Pure ASGI middleware. The coding is the client's highest-q choice among those
+available here, ties going to zstd > br > gzip; brotli and zstandard are
+optional installs and simply drop out of negotiation when missing. A response
+is compressed only when its type is textual (JSON, text, msgpack) and its body
+reaches COMPRESSION_MIN_BYTES; smaller bodies cost more CPU than they save on
+the wire. Bodies are compressed chunk by chunk, so streamed exports stay
+streamed. Server-sent events are never compressed: a compressor holds back
+bytes until it has enough to emit, which would stall the stream.
+"""
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import Settings
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+
+settings = Settings()
+
+_TEXTUAL = ("application/json", "application/problem+json", "application/x-msgpack", "application/javascript")
+_NEVER = ("text/event-stream",)
+
+
+class _Gzip:
+    def __init__(self):
+        self._c = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=settings.compression_brotli_quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        self._c = zstandard.ZstdCompressor(level=settings.compression_zstd_level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+def available() -> dict[str, type]:
+    """Codings this process can produce, in server preference order."""
+    codings = {}
+    if zstandard is not None:
+        codings["zstd"] = _Zstd
+    if brotli is not None:
+        codings["br"] = _Brotli
+    codings["gzip"] = _Gzip
+    return codings
+
+
+def negotiate(accept_encoding: str | None, codings: dict[str, type] | None = None) -> str | None:
+    """Best coding for an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    codings = available() if codings is None else codings
+    q: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if name:
+            q[name] = weight
+    star = q.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in codings:
+        weight = q.get(name, star)
+        if weight > best_q:
+            best, best_q = name, weight
+    return best
+
+
+def compressible(content_type: str) -> bool:
+    media = content_type.split(";", 1)[0].strip().lower()
+    if media in _NEVER:
+        return False
+    return media.startswith("text/") or media in _TEXTUAL or media.endswith("+json")
+
+
+def compress(coding: str, body: bytes) -> bytes:
+    """One-shot compression with the configured level (bench and tests)."""
+    c = available()[coding]()
+    return c.compress(body) + c.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.codings = available()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.compression_enabled:
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding"), self.codings)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        pending: list[bytes] = []
+        size = 0
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, size, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or not compressible(headers.get("content-type", ""))
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Hold the start until the body size is known to clear the threshold
+                    MutableHeaders(scope=message).add_vary_header("Accept-Encoding")
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if compressor is None:
+                pending.append(body)
+                size += len(body)
+                if size < settings.compression_min_bytes:
+                    if more:
+                        return
+                    # Complete and small: send as is
+                    passthrough = True
+                    await send(start)
+                    await send({"type": "http.response.body", "body": b"".join(pending), "more_body": False})
+                    return
+                compressor = self.codings[coding]()
+                headers = MutableHeaders(scope=start)
+                headers["Content-Encoding"] = coding
+                if "content-length" in headers:
+                    del headers["content-length"]
+                await send(start)
+                body = b"".join(pending)
+                pending.clear()
+            out = compressor.compress(body)
+            if not more:
+                out += compressor.finish()
+            if out or not more:
+                await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 from pydantic import Field, AnyUrl
 
@@ -8,13 +10,97 @@ class Settings(BaseSettings):
     api_url: AnyUrl | str = Field("http://localhost:8000", alias="API_URL")
 
     postgres_url: str = Field(..., alias="POSTGRES_URL")
+    # Async driver URL; defaults to POSTGRES_URL (psycopg 3 serves both sync and async)
+    postgres_async_url: str | None = Field(None, alias="POSTGRES_ASYNC_URL")
+    # Streaming replica for read-only routes; unset = everything on the primary
+    postgres_replica_url: str | None = Field(None, alias="POSTGRES_REPLICA_URL")
+    postgres_replica_async_url: str | None = Field(None, alias="POSTGRES_REPLICA_ASYNC_URL")
+    # Connection pool (applies to both the sync and async engines)
+    db_pool_size: int = Field(10, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(30.0, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(1800, alias="DB_POOL_RECYCLE")
+    db_pool_pre_ping: bool = Field(True, alias="DB_POOL_PRE_PING")
+    # Server-side timeouts in milliseconds; 0 disables
+    db_statement_timeout_ms: int = Field(0, alias="DB_STATEMENT_TIMEOUT_MS")
+    db_idle_in_transaction_timeout_ms: int = Field(0, alias="DB_IDLE_IN_TRANSACTION_TIMEOUT_MS")
+
+    # Statements slower than this are logged with their route
+    slow_query_ms: int = Field(200, alias="SLOW_QUERY_MS")
+
+    # Month view implementation: "queries" (one per piece) or "single" (one CTE statement)
+    month_rollup_strategy: Literal["queries", "single"] = Field("queries", alias="MONTH_ROLLUP_STRATEGY")
+
+    # In-process cache of budget metadata/ownership sets used by get_budget_context
+    budget_context_ttl_seconds: float = Field(5.0, alias="BUDGET_CONTEXT_TTL_SECONDS")
+
+    # Soft-deleted transactions older than this move to the archive tables
+    archive_retention_days: int = Field(90, alias="ARCHIVE_RETENTION_DAYS")
+    archive_batch_size: int = Field(1000, alias="ARCHIVE_BATCH_SIZE")
+    archive_interval_seconds: int = Field(3600, alias="ARCHIVE_INTERVAL_SECONDS")
+
     redis_url: str = Field("redis://redis:6379/0", alias="REDIS_URL")
+    redis_socket_timeout: float = Field(0.5, alias="REDIS_SOCKET_TIMEOUT")
+
+    # Background jobs (RQ); a job waits up to jobs_lock_wait_seconds for its budget's lock
+    jobs_queue: str = Field("markbudget", alias="JOBS_QUEUE")
+    jobs_timeout_seconds: int = Field(1800, alias="JOBS_TIMEOUT_SECONDS")
+    jobs_lock_wait_seconds: int = Field(600, alias="JOBS_LOCK_WAIT_SECONDS")
+    jobs_result_ttl_seconds: int = Field(86400, alias="JOBS_RESULT_TTL_SECONDS")
+    jobs_artifact_dir: str = Field("/tmp/markbudget-jobs", alias="JOBS_ARTIFACT_DIR")
+
+    # Idempotency-Key: how long responses are kept, and how long a racing retry waits for the original
+    idempotency_ttl_seconds: int = Field(86400, alias="IDEMPOTENCY_TTL_SECONDS")
+    idempotency_wait_seconds: float = Field(10.0, alias="IDEMPOTENCY_WAIT_SECONDS")
+    # How long an in-progress claim holds the key; keep it above the longest request
+    idempotency_lease_seconds: int = Field(120, alias="IDEMPOTENCY_LEASE_SECONDS")
+
+    # Coalescing of identical concurrent reads (in-process + Redis lock across workers)
+    singleflight_enabled: bool = Field(True, alias="SINGLEFLIGHT_ENABLED")
+    singleflight_lock_ttl_ms: int = Field(5000, alias="SINGLEFLIGHT_LOCK_TTL_MS")
+    singleflight_result_ttl_ms: int = Field(2000, alias="SINGLEFLIGHT_RESULT_TTL_MS")
+    singleflight_poll_ms: int = Field(20, alias="SINGLEFLIGHT_POLL_MS")
+
+    # Category suggestions from payee/memo history; new uncategorized rows take a confident suggestion
+    auto_categorize: bool = Field(True, alias="AUTO_CATEGORIZE")
+    suggestion_half_life_days: float = Field(180.0, alias="SUGGESTION_HALF_LIFE_DAYS")
+    suggestion_min_weight: float = Field(1.0, alias="SUGGESTION_MIN_WEIGHT")
+    suggestion_min_confidence: float = Field(0.6, alias="SUGGESTION_MIN_CONFIDENCE")
+    suggestion_cache_ttl_seconds: float = Field(300.0, alias="SUGGESTION_CACHE_TTL_SECONDS")
+
+    # Duplicate detection: same account and amount within +-window days, scored on payee and date
+    duplicate_window_days: int = Field(5, alias="DUPLICATE_WINDOW_DAYS")
+    duplicate_min_score: float = Field(0.6, alias="DUPLICATE_MIN_SCORE")
+
+    # Server-sent change events: heartbeat interval, per-client backlog, client reconnect delay
+    events_heartbeat_seconds: float = Field(15.0, alias="EVENTS_HEARTBEAT_SECONDS")
+    events_queue_size: int = Field(256, alias="EVENTS_QUEUE_SIZE")
+    events_retry_ms: int = Field(3000, alias="EVENTS_RETRY_MS")
+
+    # Response compression; bodies under compression_min_bytes go out as is
+    compression_enabled: bool = Field(True, alias="COMPRESSION_ENABLED")
+    compression_min_bytes: int = Field(1024, alias="COMPRESSION_MIN_BYTES")
+    compression_gzip_level: int = Field(6, alias="COMPRESSION_GZIP_LEVEL")
+    compression_brotli_quality: int = Field(4, alias="COMPRESSION_BROTLI_QUALITY")
+    compression_zstd_level: int = Field(3, alias="COMPRESSION_ZSTD_LEVEL")
+
+    # Per-request profiling (off: the middleware is not installed). Admins trigger it with X-Profile: 1;
+    # profiling_sample_rate profiles that share of all requests
+    profiling_enabled: bool = Field(False, alias="PROFILING_ENABLED")
+    profiling_sample_rate: float = Field(0.0, alias="PROFILING_SAMPLE_RATE")
+    profiling_interval_ms: float = Field(1.0, alias="PROFILING_INTERVAL_MS")
+    profiling_format: str = Field("speedscope", alias="PROFILING_FORMAT")  # speedscope | html
+    profiling_dir: str = Field("/tmp/markbudget-profiles", alias="PROFILING_DIR")
+    profiling_max_files: int = Field(200, alias="PROFILING_MAX_FILES")
 
     jwt_secret: str = Field("change-me", alias="JWT_SECRET")
     jwt_refresh_secret: str = Field("change-me-too", alias="JWT_REFRESH_SECRET")
 
     sentry_dsn: str | None = Field(None, alias="SENTRY_DSN")
 
+    # Shared secret for /internal endpoints (X-Admin-Token); unset = open in development only
+    admin_token: str | None = Field(None, alias="ADMIN_TOKEN")
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,15 +1,78 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from .config import Settings
+from .instrumentation import install_sql_hooks
+from .pool_stats import InstrumentedQueuePool, InstrumentedAsyncQueuePool, instrument
+from . import changes
+from .services import age_of_money, rollups, suggestions
 
 
 settings = Settings()
 
+
+def _engine_kwargs() -> dict:
+    options = []
+    if settings.db_statement_timeout_ms:
+        options.append(f"-c statement_timeout={settings.db_statement_timeout_ms}")
+    if settings.db_idle_in_transaction_timeout_ms:
+        options.append(f"-c idle_in_transaction_session_timeout={settings.db_idle_in_transaction_timeout_ms}")
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": {"options": " ".join(options)} if options else {},
+    }
+
+
 # Using synchronous SQLAlchemy engine with psycopg
-engine = create_engine(settings.postgres_url, future=True)
+engine = create_engine(settings.postgres_url, future=True, poolclass=InstrumentedQueuePool, **_engine_kwargs())
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# Async engine for hot read endpoints (`async def` routes don't occupy a threadpool slot)
+async_engine = create_async_engine(
+    settings.postgres_async_url or settings.postgres_url, poolclass=InstrumentedAsyncQueuePool, **_engine_kwargs()
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+instrument(engine, "primary", settings.db_max_overflow)
+instrument(async_engine.sync_engine, "primary_async", settings.db_max_overflow)
+install_sql_hooks(engine)
+install_sql_hooks(async_engine.sync_engine)
+
+# Optional streaming replica for read-only routes (routing lives in app.replica)
+replica_engine = None
+async_replica_engine = None
+ReplicaSessionLocal = None
+AsyncReplicaSessionLocal = None
+if settings.postgres_replica_url:
+    replica_engine = create_engine(
+        settings.postgres_replica_url, future=True, poolclass=InstrumentedQueuePool, **_engine_kwargs()
+    )
+    async_replica_engine = create_async_engine(
+        settings.postgres_replica_async_url or settings.postgres_replica_url,
+        poolclass=InstrumentedAsyncQueuePool,
+        **_engine_kwargs(),
+    )
+    ReplicaSessionLocal = sessionmaker(bind=replica_engine, autoflush=False, autocommit=False, future=True)
+    AsyncReplicaSessionLocal = async_sessionmaker(bind=async_replica_engine, autoflush=False, expire_on_commit=False)
+    instrument(replica_engine, "replica", settings.db_max_overflow)
+    instrument(async_replica_engine.sync_engine, "replica_async", settings.db_max_overflow)
+    install_sql_hooks(replica_engine)
+    install_sql_hooks(async_replica_engine.sync_engine)
+
+# Keep report rollups in step with ledger writes on every session
+rollups.register()
+# Drop Age of Money checkpoints a back-dated write makes stale
+age_of_money.register()
+# Payee/memo -> category votes follow every ledger write
+suggestions.register()
+# Budget-scoped change batches for cache invalidation and subscribers
+changes.register()
+
 
 def get_db():
     db = SessionLocal()
@@ -18,3 +81,7 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
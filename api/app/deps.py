@@ -0,0 +1,23 @@
+import hmac
+
+from fastapi import Header, HTTPException
+
+from app.config import Settings
+
+
+settings = Settings()
+
+
+def is_admin(token: str | None) -> bool:
+    if not settings.admin_token:
+        return settings.app_env == "development"
+    return token is not None and hmac.compare_digest(token, settings.admin_token)
+
+
+def require_admin(x_admin_token: str | None = Header(default=None, alias="X-Admin-Token")):
+    if not settings.admin_token:
+        if settings.app_env != "development":
+            raise HTTPException(403, "Admin endpoints are disabled")
+        return
+    if not is_admin(x_admin_token):
+        raise HTTPException(403, "Forbidden")
@@ -0,0 +1,166 @@
+"""Budget change events for connected clients (server-sent events).
+
+After a commit bumps a budget's version (app.budget_version), one compact event
+is published on Redis channel `budget:{id}:events`:
+
+    {"v": "42", "changes": [["transactions", "<id>", "update"], ...]}
+
+Each API worker holds a single pattern subscription and fans messages out to
+its open streams through in-process queues, so an idle client costs a queue
+and a heartbeat and no database work. A client that falls behind (full queue),
+reconnects across a gap, or was connected while the subscription dropped gets
+a `resync` event and refetches instead. In-process caches listen on the same
+subscription (`hub.listen`) to drop entries another process made stale.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable
+from uuid import UUID
+
+import orjson
+from redis.exceptions import RedisError
+
+from app import changes
+from app.config import Settings
+from app.redis import sync_client, pubsub_client
+
+
+logger = logging.getLogger("app.events")
+
+settings = Settings()
+
+PATTERN = "budget:*:events"
+# Bookkeeping rows clients never render
+QUIET_ENTITIES = {
+    "audit_log",
+    "category_suggestions",
+    "category_suggestion_sources",
+    "age_of_money_days",
+    "age_of_money_checkpoints",
+}
+# Past this many distinct changes an event names entity types only
+MAX_CHANGES = 100
+
+RESYNC = b"event: resync\ndata: {}\n\n"
+
+
+def channel(budget_id: UUID) -> str:
+    return f"budget:{budget_id}:events"
+
+
+def encode(version: int | str, batch: list[changes.Change]) -> bytes:
+    seen = dict.fromkeys(
+        (c.entity_type, str(c.entity_id) if c.entity_id else None, c.op) for c in batch if c.entity_type not in QUIET_ENTITIES
+    )
+    items = list(seen)
+    if len(items) > MAX_CHANGES:
+        items = [(entity_type, None, "update") for entity_type in dict.fromkeys(t for t, _id, _op in items)]
+    return orjson.dumps({"v": str(version), "changes": items})
+
+
+def publish(versions: dict[UUID, int], batch: list[changes.Change]) -> None:
+    """Publish one event per budget in `versions` (called after the version bump)."""
+    by_budget: dict[UUID, list[changes.Change]] = defaultdict(list)
+    for c in batch:
+        by_budget[c.budget_id].append(c)
+    try:
+        pipe = sync_client().pipeline(transaction=False)
+        for budget_id, version in versions.items():
+            pipe.publish(channel(budget_id), encode(version, by_budget[budget_id]))
+        pipe.execute()
+    except RedisError:
+        logger.warning("could not publish budget events", exc_info=True)
+
+
+def frame(payload: bytes) -> bytes:
+    """SSE frame for a published event; the version doubles as the event id."""
+    version = orjson.loads(payload)["v"]
+    return b"id: " + version.encode() + b"\nevent: change\ndata: " + payload + b"\n\n"
+
+
+class EventHub:
+    """Per-process fan-out from the Redis subscription to open streams."""
+
+    def __init__(self):
+        self._streams: dict[UUID, set[asyncio.Queue]] = defaultdict(set)
+        self._listeners: list[Callable[[UUID | None, bytes | None], None]] = []
+        self._task: asyncio.Task | None = None
+
+    def listen(self, fn: Callable[[UUID | None, bytes | None], None]) -> Callable[[UUID | None, bytes | None], None]:
+        """Call `fn(budget_id, payload)` for every event; `(None, None)` after events were missed."""
+        self._listeners.append(fn)
+        return fn
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def subscribe(self, budget_id: UUID) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.events_queue_size)
+        self._streams[budget_id].add(queue)
+        self.start()
+        return queue
+
+    def unsubscribe(self, budget_id: UUID, queue: asyncio.Queue) -> None:
+        streams = self._streams.get(budget_id)
+        if streams is not None:
+            streams.discard(queue)
+            if not streams:
+                del self._streams[budget_id]
+
+    def _deliver(self, queue: asyncio.Queue, data: bytes) -> None:
+        try:
+            queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # The client is too far behind for individual events to help
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC)
+
+    def _notify(self, budget_id: UUID | None, payload: bytes | None) -> None:
+        for fn in self._listeners:
+            try:
+                fn(budget_id, payload)
+            except Exception:
+                logger.exception("event listener failed")
+
+    def _broadcast(self, budget_id: UUID, data: bytes) -> None:
+        for queue in list(self._streams.get(budget_id, ())):
+            self._deliver(queue, data)
+
+    async def _run(self) -> None:
+        delay = 0.5
+        lost = False
+        while True:
+            pubsub = pubsub_client().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(PATTERN)
+                if lost:
+                    # Events published while the subscription was down are gone
+                    self._notify(None, None)
+                    for budget_id in list(self._streams):
+                        self._broadcast(budget_id, RESYNC)
+                    lost = False
+                delay = 0.5
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    name = message["channel"].decode()
+                    budget_id = UUID(name.split(":", 2)[1])
+                    self._notify(budget_id, message["data"])
+                    if budget_id in self._streams:
+                        self._broadcast(budget_id, frame(message["data"]))
+            except (RedisError, OSError):
+                lost = True
+                logger.warning("event subscription lost; reconnecting in %.1fs", delay, exc_info=True)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except (RedisError, OSError):
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+hub = EventHub()
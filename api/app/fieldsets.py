@@ -0,0 +1,31 @@
+"""Sparse fieldsets: `?fields=id,date,amount_cents` on list endpoints.
+
+A route names the fields it can emit; `parse()` checks the request against
+them (unknown names are a 400) and returns None when the client wants
+everything. The route then fetches only the columns behind the requested
+fields and emits only those keys, so the saving shows up in SQL, in
+serialization and on the wire.
+"""
+from fastapi import HTTPException
+
+
+def parse(fields: str | None, allowed: tuple[str, ...], always: tuple[str, ...] = ("id",)) -> frozenset[str] | None:
+    if fields is None:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+    return frozenset(requested | set(always))
+
+
+def wants(fields: frozenset[str] | None, *names: str) -> bool:
+    return fields is None or any(n in fields for n in names)
+
+
+def prune(row: dict, fields: frozenset[str] | None) -> dict:
+    return row if fields is None else {k: v for k, v in row.items() if k in fields}
+
+
+def cache_key(fields: frozenset[str] | None) -> str:
+    return "*" if fields is None else ",".join(sorted(fields))
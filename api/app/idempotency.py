@@ -0,0 +1,250 @@
+"""Idempotency-Key support for mutating requests.
+
+The first request with a given key claims it (INSERT .. ON CONFLICT, so racing
+retries cannot both win), runs, and stores its status, headers and body. Any
+later request with the key is answered from that row without reaching the
+handler; one that arrives while the original is still running waits for it.
+Reusing a key for a different request is a 422.
+
+The handler's first commit also flips the row to 'committed' in that same
+transaction (a session hook), so the key cannot be lost once the write is in.
+A 5xx before that releases the key so the client can retry for real; a 5xx
+after it marks the key 'failed' and retries get a 409 instead of applying the
+write twice. A claim is only a lease of
+IDEMPOTENCY_LEASE_SECONDS (longer than any request may run): if the process
+dies mid-request, a retry after that reclaims the key instead of getting 409s
+until the row expires, unless the write committed. Stored responses are kept
+for IDEMPOTENCY_TTL_SECONDS.
+"""
+import asyncio
+import hashlib
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import Settings
+from app.db import engine, async_engine
+from app.models.idempotency import IdempotencyKey
+
+
+settings = Settings()
+
+MUTATING = {"POST", "PUT", "PATCH", "DELETE"}
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+# Per-response headers that must not be replayed verbatim
+_SKIP_HEADERS = {b"server-timing", b"content-length", b"date", b"server"}
+
+T = IdempotencyKey.__table__
+
+# [key, committed] of the claim the current request holds (threadpool workers share the list)
+_claim_held: ContextVar[list | None] = ContextVar("idempotency_claim", default=None)
+
+
+def _json_response(status: int, detail: str, extra: list | None = None) -> tuple[int, list, bytes]:
+    body = orjson.dumps({"detail": detail})
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    return status, headers + (extra or []), body
+
+
+async def _send_stored(send, status: int, headers: list, body: bytes) -> None:
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _claim(key: str, method: str, path: str, request_hash: str) -> bool:
+    now = datetime.now(timezone.utc)
+    values = {
+        "key": key,
+        "method": method,
+        "path": path,
+        "request_hash": request_hash,
+        "state": "in_progress",
+        "response_status": None,
+        "response_headers": None,
+        "response_body": None,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=settings.idempotency_lease_seconds),
+    }
+    stmt = insert(T).values(**values)
+    # An expired key is free to be claimed again
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[T.c.key], set_=values, where=T.c.expires_at < now
+    ).returning(T.c.key)
+    async with async_engine.begin() as conn:
+        return (await conn.execute(stmt)).first() is not None
+
+
+async def _load(key: str):
+    async with async_engine.connect() as conn:
+        return (await conn.execute(sa.select(T).where(T.c.key == key))).first()
+
+
+async def _store(key: str, status: int, headers: list, body: bytes) -> None:
+    stored = [[k.decode("latin-1"), v.decode("latin-1")] for k, v in headers if k.lower() not in _SKIP_HEADERS]
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            sa.update(T)
+            .where(T.c.key == key)
+            .values(
+                state="done",
+                response_status=status,
+                response_headers=stored,
+                response_body=body,
+                expires_at=datetime.now(timezone.utc) + timedelta(seconds=settings.idempotency_ttl_seconds),
+            )
+        )
+
+
+async def _release(key: str) -> None:
+    """Free the key for a retry, unless the handler already committed: then keep it as 'failed'."""
+    async with async_engine.begin() as conn:
+        await conn.execute(sa.delete(T).where(T.c.key == key, T.c.state == "in_progress"))
+        await conn.execute(sa.update(T).where(T.c.key == key, T.c.state == "committed").values(state="failed"))
+
+
+def _before_commit(session: Session) -> None:
+    held = _claim_held.get()
+    if held is None or held[1]:
+        return
+    # Same transaction as the handler's write: both land or neither does
+    session.execute(
+        sa.update(T)
+        .where(T.c.key == held[0], T.c.state == "in_progress")
+        .values(state="committed", expires_at=sa.func.now() + timedelta(seconds=settings.idempotency_ttl_seconds))
+    )
+
+
+def _after_commit(session: Session) -> None:
+    held = _claim_held.get()
+    if held is not None:
+        held[1] = True
+
+
+def register(target=Session) -> None:
+    event.listen(target, "before_commit", _before_commit)
+    event.listen(target, "after_commit", _after_commit)
+
+
+def _replay(row) -> tuple[int, list, bytes]:
+    body = row.response_body or b""
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in row.response_headers or []]
+    headers += [(b"content-length", str(len(body)).encode()), (b"idempotent-replayed", b"true")]
+    return row.response_status, headers, body
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware; requests without an Idempotency-Key pass straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING:
+            await self.app(scope, receive, send)
+            return
+        key = next((v.decode("latin-1") for k, v in scope["headers"] if k == HEADER), None)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_stored(send, *_json_response(400, "Invalid Idempotency-Key"))
+            return
+
+        # Buffer the body: it is part of the request fingerprint and must be replayed to the app
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        method, path = scope["method"], scope["path"]
+        digest = hashlib.sha256(
+            b"\0".join([method.encode(), path.encode(), scope.get("query_string", b""), body])
+        ).hexdigest()
+
+        if not await _claim(key, method, path, digest):
+            await self._answer_existing(key, digest, send)
+            return
+
+        sent_body = False
+
+        async def replay_receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status = 500
+        headers: list = []
+        out: list[bytes] = []
+
+        async def capture_send(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                out.append(message.get("body", b""))
+            await send(message)
+
+        held = _claim_held.set([key, False])
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await _release(key)
+            raise
+        finally:
+            _claim_held.reset(held)
+        if status >= 500:
+            await _release(key)
+        else:
+            await _store(key, status, headers, b"".join(out))
+
+    async def _answer_existing(self, key: str, digest: str, send) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.idempotency_wait_seconds
+        while True:
+            row = await _load(key)
+            if row is None:
+                # Original failed and released the key between our claim and this read
+                await _send_stored(send, *_json_response(409, "Original request failed; retry", [(b"retry-after", b"1")]))
+                return
+            if row.request_hash != digest:
+                await _send_stored(send, *_json_response(422, "Idempotency-Key was used for a different request"))
+                return
+            if row.state == "done":
+                await _send_stored(send, *_replay(row))
+                return
+            lease_over = row.created_at + timedelta(seconds=settings.idempotency_lease_seconds) < datetime.now(timezone.utc)
+            if row.state == "failed" or (row.state == "committed" and lease_over):
+                # The write went in but its response was lost; repeating it would apply it twice
+                await _send_stored(send, *_json_response(409, "Original request was applied but its response was lost"))
+                return
+            if row.expires_at < datetime.now(timezone.utc):
+                # The lease ran out without a response: the original died; the retry takes the key
+                await _send_stored(send, *_json_response(409, "Original request was abandoned; retry", [(b"retry-after", b"1")]))
+                return
+            if loop.time() >= deadline:
+                await _send_stored(
+                    send, *_json_response(409, "Original request still in progress", [(b"retry-after", b"1")])
+                )
+                return
+            await asyncio.sleep(0.05)
+
+
+def purge_expired() -> int:
+    with engine.begin() as conn:
+        return conn.execute(sa.delete(T).where(T.c.expires_at < sa.func.now())).rowcount
+
+
+register()
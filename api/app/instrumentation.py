@@ -0,0 +1,153 @@
+"""Per-request SQL accounting, Server-Timing headers and Prometheus metrics.
+
+Cursor events on each engine add their query count and elapsed time to the
+RequestStats of the current request (held in a contextvar, which follows the
+request into threadpool workers and SQLAlchemy's async greenlets).
+"""
+import logging
+import time
+from contextvars import ContextVar
+
+from prometheus_client import Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+
+from app.config import Settings
+from app.pool_stats import snapshot_all
+
+
+settings = Settings()
+logger = logging.getLogger("app.sql")
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_SECONDS = Histogram(
+    "markbudget_request_duration_seconds", "Total request latency", ["route", "method"], buckets=_LATENCY_BUCKETS
+)
+REQUEST_DB_SECONDS = Histogram(
+    "markbudget_request_db_seconds", "Time spent executing SQL per request", ["route", "method"], buckets=_LATENCY_BUCKETS
+)
+REQUEST_APP_SECONDS = Histogram(
+    "markbudget_request_app_seconds", "Time spent outside SQL per request", ["route", "method"], buckets=_LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    "markbudget_request_queries", "SQL statements executed per request", ["route", "method"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+
+
+class RequestStats:
+    __slots__ = ("scope", "started", "queries", "db_seconds")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    def server_timing(self, total: float) -> str:
+        db_ms = self.db_seconds * 1000
+        total_ms = total * 1000
+        return (
+            f'db;dur={db_ms:.1f};desc="{self.queries} queries", '
+            f"app;dur={max(total_ms - db_ms, 0.0):.1f}, total;dur={total_ms:.1f}"
+        )
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("mb_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["mb_query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= settings.slow_query_ms:
+        logger.warning(
+            "slow query %.1fms route=%s: %s",
+            elapsed * 1000,
+            stats.route if stats is not None else "-",
+            " ".join(statement.split())[:1000],
+        )
+
+
+def install_sql_hooks(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class SQLTimingMiddleware:
+    """Pure ASGI middleware: adds Server-Timing and records per-route histograms."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - stats.started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total = time.perf_counter() - stats.started
+            labels = (stats.route, scope["method"])
+            REQUEST_SECONDS.labels(*labels).observe(total)
+            REQUEST_DB_SECONDS.labels(*labels).observe(stats.db_seconds)
+            REQUEST_APP_SECONDS.labels(*labels).observe(max(total - stats.db_seconds, 0.0))
+            REQUEST_QUERIES.labels(*labels).observe(stats.queries)
+
+
+class _PoolCollector:
+    def collect(self):
+        gauges = {
+            key: GaugeMetricFamily(f"markbudget_db_pool_{key}", f"Connection pool {key.replace('_', ' ')}", labels=["pool"])
+            for key in ("size", "checked_out", "overflow", "overflow_peak")
+        }
+        counters = {
+            key: CounterMetricFamily(f"markbudget_db_pool_{key}", f"Connection pool {key.replace('_', ' ')}", labels=["pool"])
+            for key in ("checkouts", "waits", "slow_waits")
+        }
+        wait = CounterMetricFamily("markbudget_db_pool_wait_seconds", "Time spent waiting for a pooled connection", labels=["pool"])
+        for snap in snapshot_all():
+            for key, metric in gauges.items():
+                metric.add_metric([snap["name"]], snap[key])
+            for key, metric in counters.items():
+                metric.add_metric([snap["name"]], snap[key])
+            wait.add_metric([snap["name"]], snap["wait_ms_total"] / 1000)
+        yield from gauges.values()
+        yield from counters.values()
+        yield wait
+
+
+REGISTRY.register(_PoolCollector())
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,88 @@
+"""Background jobs on Redis (RQ).
+
+A job kind is a function registered with `@job(name, Params)`; it receives a
+sync session, the budget id, validated params and a `progress` callback, and
+returns a JSON-able result. `enqueue()` validates params and queues the kind
+for `app.jobs.worker`; the worker holds a per-budget Redis lock for the whole
+run, so two jobs never touch the same budget at once. Files a job leaves in
+JOBS_ARTIFACT_DIR live as long as its result (`purge_artifacts`).
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+from uuid import UUID
+
+from pydantic import BaseModel
+from rq import Queue
+from rq.job import Job
+
+from app.config import Settings
+from app.redis import sync_client
+
+
+settings = Settings()
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    name: str
+    fn: Callable[..., Any]
+    params: type[BaseModel]
+
+
+JOBS: dict[str, JobSpec] = {}
+
+
+def job(name: str, params: type[BaseModel]):
+    def register(fn):
+        JOBS[name] = JobSpec(name, fn, params)
+        return fn
+    return register
+
+
+def queue() -> Queue:
+    return Queue(settings.jobs_queue, connection=sync_client(), default_timeout=settings.jobs_timeout_seconds)
+
+
+def enqueue(kind: str, budget_id: UUID, params: dict | None = None) -> Job:
+    from app.jobs import tasks  # noqa: F401  (registers the job kinds)
+
+    spec = JOBS.get(kind)
+    if spec is None:
+        raise KeyError(kind)
+    validated = spec.params.model_validate(params or {})
+    return queue().enqueue(
+        "app.jobs.runner.execute",
+        kind,
+        str(budget_id),
+        validated.model_dump(mode="json"),
+        result_ttl=settings.jobs_result_ttl_seconds,
+        failure_ttl=settings.jobs_result_ttl_seconds,
+        meta={"kind": kind, "budget_id": str(budget_id), "progress": None},
+    )
+
+
+def fetch(job_id: str) -> Job | None:
+    try:
+        return Job.fetch(job_id, connection=sync_client())
+    except Exception:  # rq raises NoSuchJobError, or ValueError on malformed ids
+        return None
+
+
+def purge_artifacts() -> int:
+    """Delete artifacts older than the job result TTL; their jobs answer 410 until they expire too."""
+    cutoff = time.time() - settings.jobs_result_ttl_seconds
+    removed = 0
+    try:
+        entries = list(os.scandir(settings.jobs_artifact_dir))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass  # another maintenance pass got there first
+    return removed
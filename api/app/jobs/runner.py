@@ -0,0 +1,52 @@
+"""Entry point RQ calls for every job: budget lock, session, progress, commit."""
+import logging
+from uuid import UUID
+
+from redis.exceptions import LockError
+from rq import get_current_job
+
+from app import budget_version  # noqa: F401  (commits here bump versions and publish events)
+from app.config import Settings
+from app.db import SessionLocal
+from app.jobs import JOBS
+from app.jobs import tasks  # noqa: F401  (registers the job kinds)
+from app.redis import sync_client
+
+
+logger = logging.getLogger("app.jobs")
+settings = Settings()
+
+
+class BudgetBusy(RuntimeError):
+    pass
+
+
+def _progress(done: int, total: int | None = None, message: str | None = None) -> None:
+    current = get_current_job()
+    if current is None:
+        return
+    current.meta["progress"] = {"done": done, "total": total, "message": message}
+    current.save_meta()
+
+
+def execute(kind: str, budget_id: str, params: dict):
+    spec = JOBS[kind]
+    lock = sync_client().lock(
+        f"jobs:budget:{budget_id}",
+        timeout=settings.jobs_timeout_seconds,
+        blocking_timeout=settings.jobs_lock_wait_seconds,
+    )
+    if not lock.acquire():
+        raise BudgetBusy(f"budget {budget_id} is locked by another job")
+    try:
+        _progress(0, message="started")
+        with SessionLocal() as db:
+            result = spec.fn(db, UUID(budget_id), spec.params.model_validate(params), _progress)
+            db.commit()
+        logger.info("job %s finished for budget %s", kind, budget_id)
+        return result
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            logger.warning("job %s outlived its budget lock for %s", kind, budget_id)
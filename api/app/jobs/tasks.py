@@ -0,0 +1,81 @@
+"""Job kinds. Each takes (db, budget_id, params, progress) and returns a JSON-able result."""
+import os
+from datetime import date
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+from rq import get_current_job
+from sqlalchemy.orm import Session
+
+from app.config import Settings
+from app.jobs import job
+from app.models.budget import Budget
+from app.services import periods, rollups, snapshot, suggestions
+
+
+settings = Settings()
+
+
+class NoParams(BaseModel):
+    pass
+
+
+class CloneParams(BaseModel):
+    name: str | None = Field(default=None, max_length=200)
+    include_ledger: bool = True
+
+
+class ClosePeriodParams(BaseModel):
+    cutoff: date
+
+
+class ReopenPeriodParams(BaseModel):
+    close_id: UUID
+
+
+@job("rollups.rebuild", NoParams)
+def rebuild_rollups(db: Session, budget_id: UUID, params: NoParams, progress) -> dict:
+    rollups.rebuild_budget(db, budget_id)
+    progress(1, 1)
+    return {}
+
+
+@job("suggestions.rebuild", NoParams)
+def rebuild_suggestions(db: Session, budget_id: UUID, params: NoParams, progress) -> dict:
+    suggestions.rebuild(db, budget_id)
+    progress(1, 1)
+    return {}
+
+
+@job("snapshot.export", NoParams)
+def export_snapshot(db: Session, budget_id: UUID, params: NoParams, progress) -> dict:
+    os.makedirs(settings.jobs_artifact_dir, exist_ok=True)
+    path = os.path.join(settings.jobs_artifact_dir, f"{get_current_job().id}.mbsnap")
+    with open(path, "wb") as fp:
+        for i, chunk in enumerate(snapshot.iter_export(db, budget_id)):
+            fp.write(chunk)
+            if i % 10 == 0:
+                progress(i, message="exporting")
+    return {"artifact": os.path.basename(path), "bytes": os.path.getsize(path)}
+
+
+@job("snapshot.clone", CloneParams)
+def clone_budget(db: Session, budget_id: UUID, params: CloneParams, progress) -> dict:
+    name = params.name or f"{db.get(Budget, budget_id).name} (copy)"
+    new_id = snapshot.clone_budget(db, budget_id, name=name, include_ledger=params.include_ledger)
+    progress(1, 1)
+    return {"budget_id": str(new_id)}
+
+
+@job("period.close", ClosePeriodParams)
+def close_period(db: Session, budget_id: UUID, params: ClosePeriodParams, progress) -> dict:
+    close = periods.close_period(db, budget_id, params.cutoff)
+    progress(1, 1)
+    return {"close_id": str(close.id), **close.summary}
+
+
+@job("period.reopen", ReopenPeriodParams)
+def reopen_period(db: Session, budget_id: UUID, params: ReopenPeriodParams, progress) -> dict:
+    close = periods.reopen_period(db, budget_id, params.close_id)
+    progress(1, 1)
+    return {"close_id": str(close.id)}
@@ -0,0 +1,17 @@
+"""Run a job worker: `python -m app.jobs.worker` (scale by running more of them)."""
+import logging
+
+from rq import Worker
+
+from app.jobs import queue
+from app.jobs import runner  # noqa: F401  (imports models, session hooks and job kinds up front)
+from app.redis import sync_client
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    Worker([queue()], connection=sync_client()).work()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,31 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import DBAPIError
 from .config import Settings
-from .routers import budgets, categories, accounts, transactions, payees
+from .responses import ORJSONResponse
+from .instrumentation import SQLTimingMiddleware, metrics_response
+from .idempotency import IdempotencyMiddleware
+from .replica import ConsistencyMiddleware
+from .compression import CompressionMiddleware
+from .profiling import ProfilingMiddleware
+from . import events
+from .routers import budgets, categories, accounts, transactions, payees, reports, jobs, periods, internal
+from .services.periods import is_closed_error
 
 settings = Settings()
 
-app = FastAPI(title=settings.app_name)
+app = FastAPI(title=settings.app_name, default_response_class=ORJSONResponse)
 
-# CORS: allow web origin for dev
+if settings.profiling_enabled:
+    # Innermost: the profile covers routing and the handler, not the other middleware
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(ConsistencyMiddleware)
+app.add_middleware(IdempotencyMiddleware)
+# Outside idempotency, so stored responses are uncompressed and replays are negotiated per request
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(SQLTimingMiddleware)
+# CORS: allow web origin for dev. Added last, so it is outermost and also covers
+# responses the other middleware produce themselves (idempotency 400/409/422)
 allowed_origins = {str(settings.app_url), "http://localhost:3000", "http://127.0.0.1:3000"}
 app.add_middleware(
     CORSMiddleware,
@@ -15,8 +33,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Idempotent-Replayed", "X-Consistency-Token", "X-Profile-Id"],
 )
 
+
+@app.on_event("startup")
+async def start_event_subscription():
+    # Cache invalidation from other processes rides the budget event channel
+    events.hub.start()
+
+
+@app.exception_handler(DBAPIError)
+async def database_error(request: Request, exc: DBAPIError):
+    # The database's own period-close guard (a worker's cached context may not know the close yet)
+    if is_closed_error(exc):
+        return ORJSONResponse({"detail": str(exc.orig).splitlines()[0]}, status_code=409)
+    raise exc
+
+
 @app.get("/health")
 async def health():
     return {
@@ -25,9 +59,17 @@ async def health():
         "env": settings.app_env,
     }
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
 # Routers
 app.include_router(budgets.router)
 app.include_router(categories.router)
 app.include_router(accounts.router)
 app.include_router(transactions.router)
 app.include_router(payees.router)
+app.include_router(reports.router)
+app.include_router(jobs.router)
+app.include_router(periods.router)
+app.include_router(internal.router)
@@ -0,0 +1,274 @@
+"""Scan every budget's ledger for broken invariants and write a JSON report.
+
+Checks (all set-based; each touches one budget's partitions):
+
+- split_sum: live transactions whose subtransactions do not sum to the amount
+- sub_date: subtransactions dated differently from their transaction
+- income_categorized: income (income_month set) that still carries category lines
+- transfer_missing / transfer_unpaired: transfer_tx_id pointing at no row, or at
+  a row that does not point back
+- transfer_amount / transfer_date / transfer_deleted / transfer_same_account:
+  pair halves that are not opposite, same-dated, deleted together and in two accounts
+- orphan_subtransactions: subtransactions without their transaction
+- foreign_account / foreign_category: references into another budget
+
+Plus one schema check: every `*_cents` column is an integer type (no floats).
+
+Budgets are spread over a process pool; each worker reads one budget at a time
+in a REPEATABLE READ, READ ONLY transaction so its checks agree with each other.
+Report rows carry a count and up to --sample example rows per check.
+
+    python -m app.maintenance.ledger_scan -o ledger-report.json
+    python -m app.maintenance.ledger_scan --budget-id <id> --workers 1
+
+Exits 1 when anything was found, so a nightly job can alert on it.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+
+from app.db import SessionLocal
+
+
+logger = logging.getLogger("app.maintenance.ledger_scan")
+
+# Each query returns the offending rows (ids and the values that disagree) and `total`,
+# the full count, while only :sample rows come back
+CHECKS = {
+    "split_sum": """
+        SELECT t.id AS transaction_id, t.amount_cents, s.total_cents, s.lines, count(*) OVER () AS total
+        FROM transactions t
+        JOIN (
+            SELECT transaction_id, sum(amount_cents) AS total_cents, count(*) AS lines
+            FROM subtransactions WHERE budget_id = :budget_id GROUP BY transaction_id
+        ) s ON s.transaction_id = t.id
+        WHERE t.budget_id = :budget_id AND t.deleted_at IS NULL AND s.total_cents <> t.amount_cents
+        ORDER BY t.date, t.id LIMIT :sample
+    """,
+    "sub_date": """
+        SELECT s.id AS subtransaction_id, s.transaction_id, s.date AS sub_date, t.date, count(*) OVER () AS total
+        FROM subtransactions s
+        JOIN transactions t ON t.budget_id = s.budget_id AND t.id = s.transaction_id
+        WHERE s.budget_id = :budget_id AND t.budget_id = :budget_id AND t.deleted_at IS NULL AND s.date <> t.date
+        ORDER BY t.date, s.id LIMIT :sample
+    """,
+    "income_categorized": """
+        SELECT t.id AS transaction_id, t.income_month, count(*) OVER () AS total
+        FROM transactions t
+        WHERE t.budget_id = :budget_id AND t.deleted_at IS NULL AND t.income_month IS NOT NULL
+          AND EXISTS (SELECT 1 FROM subtransactions s WHERE s.budget_id = :budget_id AND s.transaction_id = t.id)
+        ORDER BY t.date, t.id LIMIT :sample
+    """,
+    "transfer_missing": """
+        SELECT t.id AS transaction_id, t.transfer_tx_id, count(*) OVER () AS total
+        FROM transactions t
+        LEFT JOIN transactions o ON o.budget_id = t.budget_id AND o.id = t.transfer_tx_id
+        WHERE t.budget_id = :budget_id AND t.transfer_tx_id IS NOT NULL AND o.id IS NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM transactions_archive a WHERE a.budget_id = :budget_id AND a.id = t.transfer_tx_id
+          )
+        ORDER BY t.date, t.id LIMIT :sample
+    """,
+    "transfer_unpaired": """
+        SELECT t.id AS transaction_id, t.transfer_tx_id, o.transfer_tx_id AS counterpart_points_to,
+               count(*) OVER () AS total
+        FROM transactions t
+        JOIN transactions o ON o.budget_id = t.budget_id AND o.id = t.transfer_tx_id
+        WHERE t.budget_id = :budget_id AND o.budget_id = :budget_id AND o.transfer_tx_id IS DISTINCT FROM t.id
+        ORDER BY t.date, t.id LIMIT :sample
+    """,
+    # The pair checks below report each pair once (from its lower id)
+    "transfer_amount": """
+        SELECT t.id AS transaction_id, o.id AS counterpart_id, t.amount_cents, o.amount_cents AS counterpart_cents,
+               count(*) OVER () AS total
+        FROM transactions t
+        JOIN transactions o ON o.budget_id = t.budget_id AND o.id = t.transfer_tx_id
+        WHERE t.budget_id = :budget_id AND o.budget_id = :budget_id AND t.id < o.id
+          AND o.amount_cents <> -t.amount_cents
+        ORDER BY t.date, t.id LIMIT :sample
+    """,
+    "transfer_date": """
+        SELECT t.id AS transaction_id, o.id AS counterpart_id, t.date, o.date AS counterpart_date,
+               count(*) OVER () AS total
+        FROM transactions t
+        JOIN transactions o ON o.budget_id = t.budget_id AND o.id = t.transfer_tx_id
+        WHERE t.budget_id = :budget_id AND o.budget_id = :budget_id AND t.id < o.id AND o.date <> t.date
+        ORDER BY t.date, t.id LIMIT :sample
+    """,
+    "transfer_deleted": """
+        SELECT t.id AS transaction_id, o.id AS counterpart_id, t.deleted_at, o.deleted_at AS counterpart_deleted_at,
+               count(*) OVER () AS total
+        FROM transactions t
+        JOIN transactions o ON o.budget_id = t.budget_id AND o.id = t.transfer_tx_id
+        WHERE t.budget_id = :budget_id AND o.budget_id = :budget_id AND t.id < o.id
+          AND (t.deleted_at IS NULL) <> (o.deleted_at IS NULL)
+        ORDER BY t.date, t.id LIMIT :sample
+    """,
+    "transfer_same_account": """
+        SELECT t.id AS transaction_id, o.id AS counterpart_id, t.account_id, count(*) OVER () AS total
+        FROM transactions t
+        JOIN transactions o ON o.budget_id = t.budget_id AND o.id = t.transfer_tx_id
+        WHERE t.budget_id = :budget_id AND o.budget_id = :budget_id AND t.id < o.id AND o.account_id = t.account_id
+        ORDER BY t.date, t.id LIMIT :sample
+    """,
+    "orphan_subtransactions": """
+        SELECT s.id AS subtransaction_id, s.transaction_id, count(*) OVER () AS total
+        FROM subtransactions s
+        LEFT JOIN transactions t ON t.budget_id = s.budget_id AND t.id = s.transaction_id
+        WHERE s.budget_id = :budget_id AND t.id IS NULL
+        ORDER BY s.id LIMIT :sample
+    """,
+    "foreign_account": """
+        SELECT t.id AS transaction_id, t.account_id, a.budget_id AS account_budget_id, count(*) OVER () AS total
+        FROM transactions t
+        JOIN accounts a ON a.id = t.account_id
+        WHERE t.budget_id = :budget_id AND a.budget_id <> t.budget_id
+        ORDER BY t.date, t.id LIMIT :sample
+    """,
+    "foreign_category": """
+        SELECT s.id AS subtransaction_id, s.transaction_id, s.category_id, c.budget_id AS category_budget_id,
+               count(*) OVER () AS total
+        FROM subtransactions s
+        JOIN categories c ON c.id = s.category_id
+        WHERE s.budget_id = :budget_id AND c.budget_id <> s.budget_id
+        ORDER BY s.id LIMIT :sample
+    """,
+}
+
+_SCHEMA_SQL = sa.text(
+    """
+    SELECT table_name, column_name, data_type
+    FROM information_schema.columns
+    WHERE table_schema = current_schema() AND column_name LIKE '%\\_cents'
+      AND data_type NOT IN ('integer', 'bigint', 'smallint')
+      -- partitions repeat their parent's columns
+      AND table_name NOT IN (SELECT c.relname FROM pg_class c WHERE c.relispartition)
+    ORDER BY table_name, column_name
+    """
+)
+
+_COMPILED = {name: sa.text(sql) for name, sql in CHECKS.items()}
+
+
+def _jsonable(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def scan_budget(budget_id: str, sample: int, checks: list[str]) -> dict:
+    """Run `checks` for one budget (in a pool worker); {check: {"count", "sample"}} plus timing."""
+    started = time.perf_counter()
+    found: dict[str, dict] = {}
+    with SessionLocal() as db:
+        db.execute(sa.text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"))
+        for name in checks:
+            rows = db.execute(_COMPILED[name], {"budget_id": budget_id, "sample": sample}).mappings().all()
+            if rows:
+                found[name] = {
+                    "count": rows[0]["total"],
+                    "sample": [{k: _jsonable(v) for k, v in r.items() if k != "total"} for r in rows],
+                }
+        db.rollback()
+    return {"budget_id": budget_id, "seconds": round(time.perf_counter() - started, 3), "checks": found}
+
+
+def _budget_ids(db) -> list[str]:
+    # Budgets with more accounts first (a cheap proxy for ledger size), so the pool does not end on a straggler
+    return [
+        str(r.id)
+        for r in db.execute(
+            sa.text(
+                """
+                SELECT b.id FROM budgets b LEFT JOIN accounts a ON a.budget_id = b.id
+                GROUP BY b.id ORDER BY count(a.id) DESC, b.id
+                """
+            )
+        )
+    ]
+
+
+def scan(
+    budget_ids: list[str] | None = None,
+    workers: int | None = None,
+    sample: int = 20,
+    checks: list[str] | None = None,
+) -> dict:
+    checks = checks or list(CHECKS)
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        schema = [dict(r) for r in db.execute(_SCHEMA_SQL).mappings()]
+        if budget_ids is None:
+            budget_ids = _budget_ids(db)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(budget_ids) or 1))
+    results, errors = [], []
+    # spawn: workers build their own engine instead of inheriting the parent's pooled connections
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(scan_budget, b, sample, checks): b for b in budget_ids}
+        for done, fut in enumerate(as_completed(futures), 1):
+            budget_id = futures[fut]
+            try:
+                result = fut.result()
+            except Exception as e:  # one broken budget must not hide the others
+                logger.exception("scan of budget %s failed", budget_id)
+                errors.append({"budget_id": budget_id, "error": repr(e)})
+                continue
+            if result["checks"]:
+                results.append(result)
+            if done % 100 == 0:
+                logger.info("scanned %d/%d budgets", done, len(budget_ids))
+
+    totals = {name: 0 for name in checks}
+    for r in results:
+        for name, found in r["checks"].items():
+            totals[name] += found["count"]
+    results.sort(key=lambda r: r["budget_id"])
+    return {
+        "started_at": started_at.isoformat(),
+        "seconds": round(time.perf_counter() - started, 3),
+        "workers": workers,
+        "budgets_scanned": len(budget_ids),
+        "violations": sum(totals.values()) + len(schema),
+        "totals": totals,
+        "schema": schema,
+        "budgets": results,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--budget-id", action="append", help="scan only these budgets (repeatable)")
+    ap.add_argument("--workers", type=int, help="process pool size (default: CPU count)")
+    ap.add_argument("--sample", type=int, default=20, help="example rows kept per check and budget")
+    ap.add_argument("--check", action="append", choices=sorted(CHECKS), help="run only these checks (repeatable)")
+    ap.add_argument("-o", "--output", help="report path (default: stdout)")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    report = scan(args.budget_id, args.workers, args.sample, args.check)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(text)
+    else:
+        print(text)
+    logger.info(
+        "%d budgets in %.1fs: %d violations, %d errors",
+        report["budgets_scanned"], report["seconds"], report["violations"], len(report["errors"]),
+    )
+    sys.exit(1 if report["violations"] or report["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Move old soft-deleted transactions into the archive tables.
+
+Each batch locks up to `batch_size` tombstones older than the retention window
+(plus their transfer counterparts), copies them and their subtransactions into
+`transactions_archive`/`subtransactions_archive`, deletes them from the hot
+partitions and commits, so locks and WAL stay bounded however large the
+backlog is.
+
+    python -m app.maintenance.purge_deleted                # drain once
+    python -m app.maintenance.purge_deleted --loop         # run forever
+
+Archived rows were already excluded from every ledger query and rollup, so
+nothing user-visible changes. Each pass also drops expired idempotency keys and
+job artifacts.
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.config import Settings
+from app import idempotency, jobs
+from app.db import SessionLocal
+from app.models.transaction import Transaction, SubTransaction, TransactionArchive, SubTransactionArchive
+
+
+logger = logging.getLogger("app.maintenance.purge")
+settings = Settings()
+
+_TX_COLS = [c.name for c in Transaction.__table__.columns]
+_SUB_COLS = [c.name for c in SubTransaction.__table__.columns]
+
+
+def purge_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    T = Transaction.__table__
+    S = SubTransaction.__table__
+    rows = db.execute(
+        sa.select(T.c.budget_id, T.c.id, T.c.transfer_tx_id)
+        .where(T.c.deleted_at < cutoff)
+        .order_by(T.c.deleted_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        return 0
+    # Transfer halves are deleted together; archive them together too
+    keys = {(r.budget_id, r.id) for r in rows}
+    keys |= {(r.budget_id, r.transfer_tx_id) for r in rows if r.transfer_tx_id is not None}
+    tx_match = sa.and_(sa.tuple_(T.c.budget_id, T.c.id).in_(keys), T.c.deleted_at.is_not(None))
+
+    moved = db.execute(
+        sa.insert(TransactionArchive.__table__)
+        .from_select(_TX_COLS, sa.select(*(T.c[n] for n in _TX_COLS)).where(tx_match))
+        .returning(TransactionArchive.__table__.c.budget_id, TransactionArchive.__table__.c.id)
+    ).all()
+    moved_keys = [tuple(k) for k in moved]
+    db.execute(
+        sa.insert(SubTransactionArchive.__table__).from_select(
+            _SUB_COLS,
+            sa.select(*(S.c[n] for n in _SUB_COLS)).where(sa.tuple_(S.c.budget_id, S.c.transaction_id).in_(moved_keys)),
+        )
+    )
+    # Subtransactions go with their parent via ON DELETE CASCADE
+    db.execute(sa.delete(T).where(sa.tuple_(T.c.budget_id, T.c.id).in_(moved_keys)))
+    db.commit()
+    return len(moved_keys)
+
+
+def purge(
+    retention_days: int = settings.archive_retention_days,
+    batch_size: int = settings.archive_batch_size,
+    max_batches: int | None = None,
+) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    total = 0
+    batches = 0
+    with SessionLocal() as db:
+        while max_batches is None or batches < max_batches:
+            n = purge_batch(db, cutoff, batch_size)
+            if not n:
+                break
+            total += n
+            batches += 1
+    logger.info("archived %d soft-deleted transactions in %d batches (cutoff %s)", total, batches, cutoff.isoformat())
+    return total
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--retention-days", type=int, default=settings.archive_retention_days)
+    ap.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    ap.add_argument("--max-batches", type=int)
+    ap.add_argument("--loop", action="store_true", help="repeat every --interval seconds")
+    ap.add_argument("--interval", type=int, default=settings.archive_interval_seconds)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    while True:
+        purge(args.retention_days, args.batch_size, args.max_batches)
+        logger.info("dropped %d expired idempotency keys", idempotency.purge_expired())
+        logger.info("deleted %d expired job artifacts", jobs.purge_artifacts())
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
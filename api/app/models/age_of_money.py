@@ -0,0 +1,28 @@
+import uuid
+from datetime import date, datetime
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+
+from .base import Base
+
+
+class AgeOfMoneyCheckpoint(Base):
+    __tablename__ = "age_of_money_checkpoints"
+
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("budgets.id", ondelete="CASCADE"), primary_key=True)
+    # Every transaction dated on or before this day has been applied
+    through_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    # Remaining inflow buckets, oldest first: [[date ordinal, cents], ...]
+    queue: Mapped[list] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class AgeOfMoneyDay(Base):
+    __tablename__ = "age_of_money_days"
+
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("budgets.id", ondelete="CASCADE"), primary_key=True)
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    # Outflows matched to earlier inflows that day, and sum(cents * age in days)
+    spent_cents: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    age_weighted: Mapped[int] = mapped_column(BigInteger, nullable=False)
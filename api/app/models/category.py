@@ -1,6 +1,6 @@
 import uuid
 from datetime import date, datetime
-from sqlalchemy import String, Integer, Boolean, Date, DateTime, ForeignKey
+from sqlalchemy import String, Integer, Boolean, Date, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -28,12 +28,15 @@ class Category(Base):
     sort: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     hidden: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     is_credit_payment: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # Card whose funded spending flows into this payment category (see app.services.credit)
+    credit_account_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("accounts.id", ondelete="SET NULL"), nullable=True)
 
     group: Mapped[CategoryGroup] = relationship(back_populates="categories")
 
 
 class MonthlyCategoryBudget(Base):
     __tablename__ = "monthly_category_budget"
+    __table_args__ = (UniqueConstraint("category_id", "month", name="uq_mcb_category_month"),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     category_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("categories.id", ondelete="CASCADE"), nullable=False, index=True)
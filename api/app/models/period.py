@@ -0,0 +1,34 @@
+import uuid
+from datetime import date, datetime
+from sqlalchemy import Integer, Date, DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+
+from .base import Base
+
+
+# A period close (app.services.periods): ledger rows dated before `cutoff` live in
+# the archive tables, summarized by one opening-balance transaction per account
+class PeriodClose(Base):
+    __tablename__ = "period_closes"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False, index=True)
+    # First day of the first open month
+    cutoff: Mapped[date] = mapped_column(Date, nullable=False)
+    # Row counts and totals moved by the close
+    summary: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    reopened_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+# What each category brought out of the closed period
+class PeriodCloseCarryIn(Base):
+    __tablename__ = "period_close_carry_ins"
+
+    close_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("period_closes.id", ondelete="CASCADE"), primary_key=True)
+    category_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False)
+    assigned_cents: Mapped[int] = mapped_column(Integer, nullable=False)
+    # signed sum of the closed subtransactions (outflows negative)
+    activity_cents: Mapped[int] = mapped_column(Integer, nullable=False)
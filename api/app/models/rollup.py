@@ -0,0 +1,29 @@
+import uuid
+from datetime import date
+from sqlalchemy import Integer, Date, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import UUID
+
+from .base import Base
+
+
+class AccountMonthRollup(Base):
+    __tablename__ = "account_month_rollups"
+
+    account_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True)
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False)
+    # inflow/outflow exclude transfers; net includes everything (drives net worth)
+    inflow_cents: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    outflow_cents: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    net_cents: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class CategoryMonthRollup(Base):
+    __tablename__ = "category_month_rollups"
+
+    category_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False)
+    # signed sum of subtransactions (outflows negative)
+    activity_cents: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
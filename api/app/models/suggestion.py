@@ -0,0 +1,30 @@
+import uuid
+from datetime import date
+from sqlalchemy import String, Float, Date, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+
+from .base import Base
+
+
+class CategorySuggestion(Base):
+    __tablename__ = "category_suggestions"
+
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("budgets.id", ondelete="CASCADE"), primary_key=True)
+    # "p:<payee id>" or "m:<memo token>"
+    key: Mapped[str] = mapped_column(String(80), primary_key=True)
+    category_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    # Decayed count as of updated_on (halves every SUGGESTION_HALF_LIFE_DAYS)
+    weight: Mapped[float] = mapped_column(Float, nullable=False)
+    updated_on: Mapped[date] = mapped_column(Date, nullable=False)
+
+
+# What one transaction currently contributes, so an edit can take it back
+class CategorySuggestionSource(Base):
+    __tablename__ = "category_suggestion_sources"
+
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("budgets.id", ondelete="CASCADE"), primary_key=True)
+    transaction_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    keys: Mapped[list[str]] = mapped_column(ARRAY(String(80)), nullable=False)
+    category_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
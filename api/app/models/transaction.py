@@ -1,38 +1,136 @@
 import uuid
 from datetime import date, datetime
-from sqlalchemy import String, Integer, Date, DateTime, ForeignKey, Text
+from sqlalchemy import String, Integer, Date, DateTime, ForeignKey, ForeignKeyConstraint, Index, PrimaryKeyConstraint, Text, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 
 from .base import Base
 
 
+# transactions and subtransactions are hash-partitioned on budget_id (see
+# migration 0007). The primary keys lead with budget_id, so every ORM
+# get/update/delete names the partition key and touches a single partition.
+# Ledger indexes cover live rows only (migrations 0008, 0013).
+
+_LIVE = text("deleted_at IS NULL")
+
+
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        PrimaryKeyConstraint("budget_id", "id"),
+        Index("ix_transactions_live_budget_date", "budget_id", text("date DESC"), text("id DESC"), postgresql_where=_LIVE),
+        Index(
+            "ix_transactions_live_account_date",
+            "budget_id",
+            "account_id",
+            "date",
+            postgresql_include=["amount_cents"],
+            postgresql_where=_LIVE,
+        ),
+        Index(
+            "ix_transactions_live_income_month",
+            "budget_id",
+            "income_month",
+            postgresql_include=["account_id", "amount_cents"],
+            postgresql_where=text("deleted_at IS NULL AND income_month IS NOT NULL"),
+        ),
+        Index(
+            "ix_transactions_live_account_amount_date",
+            "account_id",
+            "amount_cents",
+            "date",
+            postgresql_include=["payee_id"],
+            postgresql_where=_LIVE,
+        ),
+        Index("ix_transactions_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+        Index("ix_transactions_close", "budget_id", "close_id", postgresql_where=text("close_id IS NOT NULL")),
+        {"postgresql_partition_by": "HASH (budget_id)"},
+    )
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False, index=True)
-    account_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False, index=True)
-    date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), default=uuid.uuid4)
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False)
+    account_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
     amount_cents: Mapped[int] = mapped_column(Integer, nullable=False)
     state: Mapped[str] = mapped_column(String(16), nullable=False, default="uncleared")
     memo: Mapped[str | None] = mapped_column(Text, nullable=True)
-    payee_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("payees.id"), nullable=True)
+    payee_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("payees.id", ondelete="SET NULL"), nullable=True)
     import_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
-    transfer_tx_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("transactions.id"), nullable=True)
+    # Counterpart of a transfer; always in the same budget (and so the same partition)
+    transfer_tx_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
     deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     income_month: Mapped[date | None] = mapped_column(Date, nullable=True)
+    # Set on the opening-balance rows a period close writes (no FK: snapshots carry the rows without the close)
+    close_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
 
     subtransactions: Mapped[list["SubTransaction"]] = relationship(back_populates="transaction", cascade="all, delete-orphan")
 
 
 class SubTransaction(Base):
     __tablename__ = "subtransactions"
+    __table_args__ = (
+        PrimaryKeyConstraint("budget_id", "id"),
+        ForeignKeyConstraint(
+            ["budget_id", "transaction_id"], ["transactions.budget_id", "transactions.id"], ondelete="CASCADE"
+        ),
+        Index("ix_subtransactions_tx", "budget_id", "transaction_id"),
+        Index("ix_subtransactions_budget_date", "budget_id", "date"),
+        {"postgresql_partition_by": "HASH (budget_id)"},
+    )
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    transaction_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("transactions.id", ondelete="CASCADE"), nullable=False, index=True)
-    category_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), default=uuid.uuid4)
+    # budget_id/date are copied from the parent so subtransactions co-partition with it
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    transaction_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
+    category_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("categories.id", ondelete="SET NULL"), nullable=True)
     amount_cents: Mapped[int] = mapped_column(Integer, nullable=False)
     memo: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     transaction: Mapped[Transaction] = relationship(back_populates="subtransactions")
+
+
+# Soft-deleted rows moved out of the hot tables by app.maintenance.purge_deleted, and
+# rows of closed periods (app.services.periods)
+class TransactionArchive(Base):
+    __tablename__ = "transactions_archive"
+    __table_args__ = (
+        PrimaryKeyConstraint("budget_id", "id"),
+        Index("ix_transactions_archive_close", "budget_id", "close_id", postgresql_where=text("close_id IS NOT NULL")),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True))
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False)
+    account_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
+    amount_cents: Mapped[int] = mapped_column(Integer, nullable=False)
+    state: Mapped[str] = mapped_column(String(16), nullable=False)
+    memo: Mapped[str | None] = mapped_column(Text, nullable=True)
+    payee_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+    import_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    transfer_tx_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    income_month: Mapped[date | None] = mapped_column(Date, nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # The period close that moved the row here; None for purged tombstones
+    close_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+
+
+class SubTransactionArchive(Base):
+    __tablename__ = "subtransactions_archive"
+    __table_args__ = (
+        PrimaryKeyConstraint("budget_id", "id"),
+        ForeignKeyConstraint(
+            ["budget_id", "transaction_id"], ["transactions_archive.budget_id", "transactions_archive.id"], ondelete="CASCADE"
+        ),
+        Index("ix_subtransactions_archive_tx", "budget_id", "transaction_id"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True))
+    budget_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    transaction_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
+    category_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+    amount_cents: Mapped[int] = mapped_column(Integer, nullable=False)
+    memo: Mapped[str | None] = mapped_column(Text, nullable=True)
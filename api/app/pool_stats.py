@@ -0,0 +1,126 @@
+"""Connection pool instrumentation.
+
+Counts checkouts/checkins/connects/invalidations through pool events and times
+how long callers wait for a connection. SQLAlchemy has no event for "checkout
+requested", so the wait is measured by the pool subclasses below around
+`_do_get`, which is where QueuePool blocks when it is exhausted.
+"""
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+
+SLOW_WAIT_SECONDS = 0.010
+
+
+class PoolStats:
+    def __init__(self, name: str, max_overflow: int):
+        self.name = name
+        self.max_overflow = max_overflow
+        self.pool = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.slow_waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.overflow_peak = 0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+            if seconds >= SLOW_WAIT_SECONDS:
+                self.slow_waits += 1
+
+    def _on_checkout(self, *_):
+        with self._lock:
+            self.checkouts += 1
+            if self.pool is not None:
+                self.overflow_peak = max(self.overflow_peak, self.pool.overflow())
+
+    def _on_checkin(self, *_):
+        with self._lock:
+            self.checkins += 1
+
+    def _on_connect(self, *_):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, *_):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": pool.size() if pool is not None else 0,
+                "checked_out": pool.checkedout() if pool is not None else 0,
+                "overflow": max(pool.overflow(), 0) if pool is not None else 0,
+                "max_overflow": self.max_overflow,
+                "overflow_peak": max(self.overflow_peak, 0),
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "waits": self.waits,
+                "slow_waits": self.slow_waits,
+                "wait_ms_total": round(self.wait_seconds_total * 1000, 3),
+                "wait_ms_avg": round(self.wait_seconds_total * 1000 / self.waits, 3) if self.waits else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+class _TimedCheckout:
+    _mb_stats: PoolStats | None = None
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self._mb_stats is not None:
+                self._mb_stats.record_wait(time.perf_counter() - t0)
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+_registry: dict[str, PoolStats] = {}
+
+
+def instrument(engine: Engine, name: str, max_overflow: int) -> PoolStats:
+    stats = PoolStats(name, max_overflow)
+
+    def attach(pool):
+        stats.pool = pool
+        pool._mb_stats = stats
+
+    attach(engine.pool)
+    event.listen(engine.pool, "checkout", stats._on_checkout)
+    event.listen(engine.pool, "checkin", stats._on_checkin)
+    event.listen(engine.pool, "connect", stats._on_connect)
+    event.listen(engine.pool, "invalidate", stats._on_invalidate)
+    # engine.dispose() swaps in a recreated pool (listeners carry over); keep following it
+    event.listen(engine, "engine_disposed", lambda _engine: attach(engine.pool))
+    _registry[name] = stats
+    return stats
+
+
+def snapshot_all() -> list[dict]:
+    return [s.snapshot() for s in _registry.values()]
@@ -0,0 +1,185 @@
+"""Opt-in profiling of single requests.
+
+With PROFILING_ENABLED the middleware is installed and profiles a request when
+an admin sends `X-Profile: 1` (with X-Admin-Token) or when it falls in
+PROFILING_SAMPLE_RATE. Without the flag nothing is installed, so the normal
+path pays nothing. The sampling profiler is pyinstrument (an optional
+install, `pip install pyinstrument`) in async mode, which follows the request
+across awaits and into `run_sync` on the same thread; without it cProfile
+stands in, which also sees whatever else the event loop runs meanwhile.
+Handlers that FastAPI runs in the threadpool (sync `def` routes) execute on
+another thread and only show up as the await on it.
+
+Each profile is written to PROFILING_DIR as `<id>.<ext>` (speedscope JSON,
+pyinstrument HTML or cProfile pstats) next to `<id>.json` with the route,
+budget, status and timings; the response carries X-Profile-Id. Only one
+request per process is profiled at a time, and the oldest files go past
+PROFILING_MAX_FILES. Profiles are listed and downloaded under
+/internal/profiles.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import Settings
+from app.deps import is_admin
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+except ImportError:  # optional
+    Profiler = None
+
+
+logger = logging.getLogger("app.profiling")
+
+settings = Settings()
+
+HEADER = "X-Profile"
+ID_HEADER = "X-Profile-Id"
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{12}$")
+MEDIA_TYPES = {"speedscope.json": "application/json", "html": "text/html", "pstats": "application/octet-stream"}
+
+_active = False
+
+
+def _wanted(scope) -> bool:
+    headers = Headers(scope=scope)
+    if headers.get(HEADER) == "1" and is_admin(headers.get("x-admin-token")):
+        return True
+    return settings.profiling_sample_rate > 0 and random.random() < settings.profiling_sample_rate
+
+
+class _Capture:
+    def __init__(self):
+        if Profiler is not None:
+            self._p = Profiler(interval=settings.profiling_interval_ms / 1000, async_mode="enabled")
+            self._p.start()
+        else:
+            self._p = cProfile.Profile()
+            self._p.enable()
+
+    def stop(self) -> None:
+        if Profiler is not None:
+            self._p.stop()
+        else:
+            self._p.disable()
+
+    def write(self, base: str) -> str:
+        if Profiler is None:
+            self._p.dump_stats(base + ".pstats")
+            return "pstats"
+        if settings.profiling_format == "html":
+            ext, renderer = "html", HTMLRenderer()
+        else:
+            ext, renderer = "speedscope.json", SpeedscopeRenderer()
+        with open(f"{base}.{ext}", "w") as fp:
+            fp.write(self._p.output(renderer))
+        return ext
+
+
+def _prune() -> None:
+    metas = sorted(f for f in os.listdir(settings.profiling_dir) if f.endswith(".json") and PROFILE_ID.match(f[:-5]))
+    for name in metas[: max(len(metas) - settings.profiling_max_files, 0)]:
+        profile_id = name[:-5]
+        for f in os.listdir(settings.profiling_dir):
+            if f.startswith(profile_id + "."):
+                os.remove(os.path.join(settings.profiling_dir, f))
+
+
+def _save(capture: _Capture, profile_id: str, meta: dict) -> None:
+    os.makedirs(settings.profiling_dir, exist_ok=True)
+    base = os.path.join(settings.profiling_dir, profile_id)
+    meta["format"] = capture.write(base)
+    with open(base + ".json", "w") as fp:
+        json.dump(meta, fp)
+    _prune()
+
+
+def list_profiles(budget_id: str | None = None, route: str | None = None, limit: int = 50) -> list[dict]:
+    if not os.path.isdir(settings.profiling_dir):
+        return []
+    out = []
+    for name in sorted(os.listdir(settings.profiling_dir), reverse=True):
+        if not name.endswith(".json") or not PROFILE_ID.match(name[:-5]):
+            continue
+        with open(os.path.join(settings.profiling_dir, name)) as fp:
+            meta = json.load(fp)
+        if (budget_id and meta.get("budget_id") != budget_id) or (route and meta.get("route") != route):
+            continue
+        out.append(meta)
+        if len(out) == limit:
+            break
+    return out
+
+
+def profile_path(profile_id: str) -> tuple[str, str] | None:
+    """(path, media type) of a stored profile, or None."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(settings.profiling_dir, profile_id + ".json")) as fp:
+            fmt = json.load(fp)["format"]
+    except (OSError, ValueError, KeyError):
+        return None
+    path = os.path.join(settings.profiling_dir, f"{profile_id}.{fmt}")
+    return (path, MEDIA_TYPES[fmt]) if os.path.exists(path) else None
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; installed only with PROFILING_ENABLED."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _active
+        if scope["type"] != "http" or _active or not _wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        _active = True
+        profile_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:12]
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append(ID_HEADER, profile_id)
+            await send(message)
+
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        capture = _Capture()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            capture.stop()
+            _active = False
+            route = scope.get("route")
+            meta = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "budget_id": (scope.get("path_params") or {}).get("budget_id"),
+                "status": status,
+                "wall_ms": round((time.perf_counter() - started) * 1000, 3),
+                "process_cpu_ms": round((time.process_time() - cpu_started) * 1000, 3),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+            if meta["budget_id"] is not None:
+                meta["budget_id"] = str(meta["budget_id"])
+            try:
+                await run_in_threadpool(_save, capture, profile_id, meta)
+            except OSError:
+                logger.warning("could not write profile %s", profile_id, exc_info=True)
@@ -0,0 +1,52 @@
+"""Shared Redis clients, created on first use.
+
+The sync client serves code that runs inside session hooks; the asyncio client
+serves request handlers; the pub/sub client holds the long-lived subscription
+behind the event streams (no read timeout: it is idle between messages). Both use short socket timeouts: Redis only carries
+coordination data here, so callers treat errors as "Redis unavailable" and
+fall back to in-process behaviour.
+"""
+import redis
+import redis.asyncio
+
+from app.config import Settings
+
+
+settings = Settings()
+
+_sync: redis.Redis | None = None
+_async: redis.asyncio.Redis | None = None
+_pubsub: redis.asyncio.Redis | None = None
+
+
+def sync_client() -> redis.Redis:
+    global _sync
+    if _sync is None:
+        _sync = redis.Redis.from_url(
+            settings.redis_url,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_socket_timeout,
+        )
+    return _sync
+
+
+def async_client() -> redis.asyncio.Redis:
+    global _async
+    if _async is None:
+        _async = redis.asyncio.Redis.from_url(
+            settings.redis_url,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_socket_timeout,
+        )
+    return _async
+
+
+def pubsub_client() -> redis.asyncio.Redis:
+    global _pubsub
+    if _pubsub is None:
+        _pubsub = redis.asyncio.Redis.from_url(
+            settings.redis_url,
+            socket_connect_timeout=settings.redis_socket_timeout,
+            health_check_interval=30,
+        )
+    return _pubsub
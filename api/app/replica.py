@@ -0,0 +1,155 @@
+"""Read-replica routing with read-your-writes consistency.
+
+Read-only routes take their session from `get_read_db` / `get_async_read_db`
+(or `read_session` inside singleflight computations). With no
+POSTGRES_REPLICA_URL everything stays on the primary.
+
+Consistency token: a request that committed a write gets the primary's WAL
+position back in X-Consistency-Token. Clients echo the latest token they hold
+on reads; such a read goes to the replica only once the replica has replayed
+up to that LSN, and to the primary until then. Reads without a token accept
+replica lag. The highest replay position seen is remembered in-process, so a
+caught-up replica costs no extra round trip.
+"""
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+import sqlalchemy as sa
+from fastapi import Header
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+from app.db import (
+    SessionLocal,
+    AsyncSessionLocal,
+    async_engine,
+    replica_engine,
+    async_replica_engine,
+    ReplicaSessionLocal,
+    AsyncReplicaSessionLocal,
+)
+
+
+HEADER = "X-Consistency-Token"
+
+_REPLAY_LSN = sa.text("SELECT pg_last_wal_replay_lsn()::text")
+_CURRENT_LSN = sa.text("SELECT pg_current_wal_lsn()::text")
+
+# Set per request by ConsistencyMiddleware; a commit flips it (threadpool workers share the list)
+_wrote: ContextVar[list | None] = ContextVar("consistency_wrote", default=None)
+
+# Highest replay position observed on the replica; it only moves forward
+_replayed = 0
+
+
+def parse_lsn(token: str | None) -> int | None:
+    """'16/B374D848' -> int; None for anything malformed."""
+    if not token:
+        return None
+    hi, sep, lo = token.partition("/")
+    try:
+        return (int(hi, 16) << 32) | int(lo, 16) if sep else None
+    except ValueError:
+        return None
+
+
+def _seen(replay: str | None) -> int:
+    global _replayed
+    lsn = parse_lsn(replay) or 0
+    if lsn > _replayed:
+        _replayed = lsn
+    return _replayed
+
+
+def use_replica(token: str | None) -> bool:
+    if replica_engine is None:
+        return False
+    lsn = parse_lsn(token)
+    if lsn is None or lsn <= _replayed:
+        return True
+    try:
+        with replica_engine.connect() as conn:
+            return _seen(conn.execute(_REPLAY_LSN).scalar()) >= lsn
+    except DBAPIError:
+        return False
+
+
+async def use_replica_async(token: str | None) -> bool:
+    if async_replica_engine is None:
+        return False
+    lsn = parse_lsn(token)
+    if lsn is None or lsn <= _replayed:
+        return True
+    try:
+        async with async_replica_engine.connect() as conn:
+            return _seen((await conn.execute(_REPLAY_LSN)).scalar()) >= lsn
+    except DBAPIError:
+        return False
+
+
+def get_read_db(token: str | None = Header(default=None, alias=HEADER)):
+    db = ReplicaSessionLocal() if use_replica(token) else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(token: str | None = Header(default=None, alias=HEADER)):
+    async with read_session(token) as db:
+        yield db
+
+
+@asynccontextmanager
+async def read_session(token: str | None):
+    factory = AsyncReplicaSessionLocal if await use_replica_async(token) else AsyncSessionLocal
+    async with factory() as db:
+        yield db
+
+
+async def read_target(token: str | None) -> str:
+    """Cache-key component: results computed on a lagging replica must not be served to a token holder."""
+    if not await use_replica_async(token):
+        return "primary"
+    return f"replica@{token}" if parse_lsn(token) is not None else "replica"
+
+
+def _after_commit(session: Session) -> None:
+    wrote = _wrote.get()
+    if wrote is not None:
+        wrote[0] = True
+
+
+def register(target=Session) -> None:
+    event.listen(target, "after_commit", _after_commit)
+
+
+class ConsistencyMiddleware:
+    """Pure ASGI middleware: adds X-Consistency-Token to responses of requests that committed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or replica_engine is None:
+            await self.app(scope, receive, send)
+            return
+        wrote = [False]
+        token = _wrote.set(wrote)
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start" and wrote[0]:
+                async with async_engine.connect() as conn:
+                    lsn = (await conn.execute(_CURRENT_LSN)).scalar()
+                MutableHeaders(scope=message).append(HEADER, lsn)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_token)
+        finally:
+            _wrote.reset(token)
+
+
+register()
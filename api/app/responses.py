@@ -0,0 +1,17 @@
+"""Response classes for the fast serialization path.
+
+`ORJSONResponse` is the app-wide default. Hot endpoints that assemble their
+payload from rows they just queried return `trusted(...)` instead: a plain
+dict/list already shaped like the route's `response_model`. Returning a
+Response instance makes FastAPI skip response-model validation and
+`jsonable_encoder`; the `response_model` stays on the route for OpenAPI only.
+"""
+from fastapi.responses import ORJSONResponse
+
+
+class TrustedJSONResponse(ORJSONResponse):
+    pass
+
+
+def trusted(content, status_code: int = 200, headers: dict | None = None) -> TrustedJSONResponse:
+    return TrustedJSONResponse(content, status_code=status_code, headers=headers)
@@ -1,11 +1,14 @@
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 import sqlalchemy as sa
 from sqlalchemy.orm import Session
 
 from app.db import get_db
-from app.models.budget import Budget
+from app import budget_version, fieldsets, replica, singleflight
+from app.responses import trusted
+from app.budget_context import BudgetContext, get_budget_context
 from app.models.account import Account
+from app.models.category import CategoryGroup, Category
 from app.schemas.accounts import AccountCreate, AccountPatch, AccountOut
 from app.models.transaction import Transaction
 from app.models.reconciliation import Reconciliation
@@ -14,28 +17,66 @@ from app.schemas.reconcile import ReconcileRequest, ReconcileResponse
 
 router = APIRouter(prefix="/api/v1/budgets/{budget_id}/accounts", tags=["accounts"])
 
+CREDIT_GROUP_NAME = "Credit Card Payments"
+
+
+ACCOUNT_FIELDS = ("id", "name", "type", "on_budget", "note")
+BALANCE_FIELDS = ACCOUNT_FIELDS + ("current_balance_cents",)
+
 
 @router.get("/", response_model=list[AccountOut])
-def list_accounts(budget_id: UUID, db: Session = Depends(get_db)):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
-    return db.query(Account).filter_by(budget_id=budget_id).order_by(Account.name).all()
+def list_accounts(
+    budget_id: UUID,
+    fields: str | None = Query(default=None, description="Comma-separated subset of AccountOut fields"),
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(replica.get_read_db),
+):
+    wanted = fieldsets.parse(fields, ACCOUNT_FIELDS)
+    if wanted is None:
+        return db.query(Account).filter_by(budget_id=budget_id).order_by(Account.name).all()
+    columns = [getattr(Account, f) for f in ACCOUNT_FIELDS if f in wanted]
+    rows = db.execute(sa.select(*columns).where(Account.budget_id == budget_id).order_by(Account.name)).mappings()
+    return trusted([dict(r) for r in rows])
+
+
+def _create_payment_category(db: Session, budget_id: UUID, acc: Account) -> None:
+    # Every on-budget card gets a payment category, filed under "Credit Card Payments"
+    group = db.query(CategoryGroup).filter_by(budget_id=budget_id, name=CREDIT_GROUP_NAME).first()
+    if group is None:
+        sort = db.query(sa.func.coalesce(sa.func.max(CategoryGroup.sort) + 1, 0)).filter(CategoryGroup.budget_id == budget_id).scalar()
+        group = CategoryGroup(budget_id=budget_id, name=CREDIT_GROUP_NAME, sort=sort)
+        db.add(group)
+        db.flush()
+    db.add(Category(budget_id=budget_id, group_id=group.id, name=acc.name, is_credit_payment=True, credit_account_id=acc.id))
 
 
 @router.post("/", response_model=AccountOut, status_code=201)
-def create_account(budget_id: UUID, payload: AccountCreate, db: Session = Depends(get_db)):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
+def create_account(
+    budget_id: UUID,
+    payload: AccountCreate,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
     acc = Account(budget_id=budget_id, name=payload.name, type=payload.type, on_budget=payload.on_budget)
     db.add(acc)
+    db.flush()
+    if acc.type == "credit" and acc.on_budget:
+        _create_payment_category(db, budget_id, acc)
     db.commit()
     db.refresh(acc)
     return acc
 
 
 @router.patch("/{account_id}", response_model=AccountOut)
-def update_account(budget_id: UUID, account_id: UUID, payload: AccountPatch, db: Session = Depends(get_db)):
+def update_account(
+    budget_id: UUID,
+    account_id: UUID,
+    payload: AccountPatch,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    ctx.require_account(account_id)
     acc = db.get(Account, account_id)
-    if not acc or acc.budget_id != budget_id:
-        raise HTTPException(404, "Account not found")
     if payload.name is not None:
         acc.name = payload.name
     if payload.on_budget is not None:
@@ -50,63 +91,80 @@ def update_account(budget_id: UUID, account_id: UUID, payload: AccountPatch, db:
 
 
 @router.get("/{account_id}/balance", response_model=dict)
-def get_account_balance(budget_id: UUID, account_id: UUID, db: Session = Depends(get_db)):
-    acc = db.get(Account, account_id)
-    if not acc or acc.budget_id != budget_id:
-        raise HTTPException(404, "Account not found")
+def get_account_balance(
+    budget_id: UUID,
+    account_id: UUID,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(replica.get_read_db),
+):
+    ctx.require_account(account_id)
     total = (
         db.query(sa.func.coalesce(sa.func.sum(Transaction.amount_cents), 0))
-        .filter(Transaction.account_id == account_id, Transaction.deleted_at.is_(None))
+        .filter(
+            Transaction.budget_id == budget_id,
+            Transaction.account_id == account_id,
+            Transaction.deleted_at.is_(None),
+        )
         .scalar()
     )
     return {"current_balance_cents": int(total)}
 
 
 @router.get("/with-balances", response_model=list[dict])
-def list_accounts_with_balances(budget_id: UUID, db: Session = Depends(get_db)):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
-    # Aggregate balances per account
-    subq = (
-        db.query(
-            Transaction.account_id.label("account_id"),
-            sa.func.coalesce(sa.func.sum(Transaction.amount_cents), 0).label("balance")
-        )
-        .filter(Transaction.deleted_at.is_(None))
-        .group_by(Transaction.account_id)
-        .subquery()
-    )
-    rows = (
-        db.query(
-            Account.id,
-            Account.name,
-            Account.type,
-            Account.on_budget,
-            sa.func.coalesce(subq.c.balance, 0).label("current_balance_cents"),
-        )
-        .outerjoin(subq, subq.c.account_id == Account.id)
-        .filter(Account.budget_id == budget_id)
-        .order_by(Account.name)
-        .all()
+async def list_accounts_with_balances(
+    budget_id: UUID,
+    fields: str | None = Query(default=None, description="Comma-separated subset of the row fields"),
+    ctx: BudgetContext = Depends(get_budget_context),
+    consistency_token: str | None = Header(default=None, alias=replica.HEADER),
+):
+    wanted = fieldsets.parse(fields, BALANCE_FIELDS)
+
+    async def compute():
+        columns = [getattr(Account, f) for f in ACCOUNT_FIELDS if fieldsets.wants(wanted, f)]
+        q = sa.select(*columns).where(Account.budget_id == budget_id).order_by(Account.name)
+        if fieldsets.wants(wanted, "current_balance_cents"):
+            # Aggregate balances per account; the budget filter prunes to one partition
+            subq = (
+                sa.select(
+                    Transaction.account_id.label("account_id"),
+                    sa.func.coalesce(sa.func.sum(Transaction.amount_cents), 0).label("balance")
+                )
+                .where(Transaction.budget_id == budget_id, Transaction.deleted_at.is_(None))
+                .group_by(Transaction.account_id)
+                .subquery()
+            )
+            q = q.add_columns(sa.func.coalesce(subq.c.balance, 0).label("current_balance_cents")).outerjoin(
+                subq, subq.c.account_id == Account.id
+            )
+        async with replica.read_session(consistency_token) as db:
+            rows = (await db.execute(q)).mappings().all()
+        out = []
+        for r in rows:
+            row = dict(r)
+            if "current_balance_cents" in row:
+                row["current_balance_cents"] = int(row["current_balance_cents"] or 0)
+            out.append(fieldsets.prune(row, wanted))
+        return out
+
+    key = singleflight.make_key(
+        "accounts_with_balances",
+        await budget_version.current(budget_id),
+        budget_id=budget_id,
+        source=await replica.read_target(consistency_token),
+        fields=fieldsets.cache_key(wanted),
     )
-    return [
-        {
-            "id": r.id,
-            "name": r.name,
-            "type": r.type,
-            "on_budget": r.on_budget,
-            "current_balance_cents": int(getattr(r, "current_balance_cents", 0) or 0),
-            "note": None,
-        }
-        for r in rows
-    ]
+    return trusted(await singleflight.run(key, compute))
 
 
 @router.delete("/{account_id}", status_code=204)
-def delete_account(budget_id: UUID, account_id: UUID, db: Session = Depends(get_db)):
-    acc = db.get(Account, account_id)
-    if not acc or acc.budget_id != budget_id:
-        raise HTTPException(404, "Account not found")
-    db.delete(acc)
+def delete_account(
+    budget_id: UUID,
+    account_id: UUID,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    ctx.require_account(account_id)
+    db.delete(db.get(Account, account_id))
     db.commit()
     return
 
@@ -116,14 +174,18 @@ def reconcile_account(
     budget_id: UUID,
     account_id: UUID,
     payload: ReconcileRequest,
+    ctx: BudgetContext = Depends(get_budget_context),
     db: Session = Depends(get_db),
 ):
-    acc = db.get(Account, account_id)
-    if not acc or acc.budget_id != budget_id:
-        raise HTTPException(404, "Account not found")
+    ctx.require_account(account_id)
+    ctx.require_open(payload.statement_date)
     current = (
         db.query(sa.func.coalesce(sa.func.sum(Transaction.amount_cents), 0))
-        .filter(Transaction.account_id == account_id, Transaction.deleted_at.is_(None))
+        .filter(
+            Transaction.budget_id == budget_id,
+            Transaction.account_id == account_id,
+            Transaction.deleted_at.is_(None),
+        )
         .scalar()
     )
     diff = int(payload.statement_balance_cents) - int(current)
@@ -1,12 +1,25 @@
+import asyncio
+import tempfile
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException
+from uuid import UUID
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.db import get_db
+from app.config import Settings
+from app.db import get_db, SessionLocal
+from app.budget_context import BudgetContext, get_budget_context
 from app.models.budget import Budget
 from app.schemas.budgets import BudgetCreate, BudgetOut
+from app.services import snapshot
+from app import budget_version, events, jobs
+from app.routers.jobs import job_out
+from app.schemas.jobs import JobOut
 
 
+settings = Settings()
+
 router = APIRouter(prefix="/api/v1/budgets", tags=["budgets"])
 
 
@@ -25,3 +38,88 @@ def create_budget(payload: BudgetCreate, db: Session = Depends(get_db)):
     db.refresh(b)
     return b
 
+
+
+@router.get("/{budget_id}/snapshot")
+def export_snapshot(budget_id: UUID, ctx: BudgetContext = Depends(get_budget_context)):
+    # The stream outlives the request-scoped session, so it owns its own
+    def body():
+        with SessionLocal() as db:
+            yield from snapshot.iter_export(db, budget_id)
+
+    return StreamingResponse(
+        body(),
+        media_type="application/x-msgpack",
+        headers={"Content-Disposition": f'attachment; filename="budget-{budget_id}.mbsnap"'},
+    )
+
+
+@router.get("/{budget_id}/events")
+async def stream_events(
+    budget_id: UUID,
+    request: Request,
+    ctx: BudgetContext = Depends(get_budget_context),
+    last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
+):
+    # Server-sent events: one `change` event per commit touching the budget (see app.events)
+    async def body():
+        # Subscribe before reading the version, so nothing falls between the two
+        queue = events.hub.subscribe(budget_id)
+        try:
+            version = await budget_version.current(budget_id)
+            yield f"retry: {settings.events_retry_ms}\n\n".encode()
+            if last_event_id is not None and last_event_id != version:
+                # Reconnected after missing events
+                yield events.RESYNC
+            yield f"id: {version}\nevent: hello\ndata: {{\"v\": \"{version}\"}}\n\n".encode()
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), settings.events_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield b": ping\n\n"
+        finally:
+            events.hub.unsubscribe(budget_id, queue)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _import(fp, clone: bool, name: str | None) -> Budget:
+    with SessionLocal() as db:
+        try:
+            budget_id = snapshot.import_snapshot(db, fp, clone=clone, name=name)
+        except snapshot.BudgetExists as e:
+            raise HTTPException(409, str(e))
+        except snapshot.SnapshotError as e:
+            raise HTTPException(400, str(e))
+        db.commit()
+        return db.get(Budget, budget_id)
+
+
+@router.post("/import", response_model=BudgetOut, status_code=201)
+async def import_snapshot(request: Request, clone: bool = False, name: str | None = None):
+    # Spool the upload (to disk past 64MB) and COPY it in from a worker thread
+    with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as fp:
+        async for chunk in request.stream():
+            fp.write(chunk)
+        fp.seek(0)
+        return await run_in_threadpool(_import, fp, clone, name)
+
+
+@router.post("/{budget_id}/clone", response_model=JobOut, status_code=202)
+def clone_budget(
+    budget_id: UUID,
+    response: Response,
+    name: str | None = None,
+    include_ledger: bool = True,
+    ctx: BudgetContext = Depends(get_budget_context),
+):
+    # Copies can be large: run as a job; the new budget id lands in the job result
+    j = jobs.enqueue("snapshot.clone", budget_id, {"name": name, "include_ledger": include_ledger})
+    response.headers["Location"] = f"/api/v1/budgets/{budget_id}/jobs/{j.id}"
+    return job_out(j)
@@ -1,41 +1,92 @@
-import hashlib
 from datetime import date
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Header, Response
-import sqlalchemy as sa
+import hashlib
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
-from app.db import get_db
-from app.models.budget import Budget
+from app.db import get_db, AsyncSessionLocal
+from app import budget_version, changes, fieldsets, replica, singleflight
+from app.responses import trusted
+from app.budget_context import BudgetContext, get_budget_context
 from app.models.category import CategoryGroup, Category, MonthlyCategoryBudget
-from app.models.transaction import Transaction, SubTransaction
 from app.models.account import Account
-from datetime import datetime
 from app.models.audit import AuditLog
+from app.services import age_of_money, merge, month_view
 from app.schemas.categories import (
     CategoryGroupCreate,
     CategoryCreate,
     CategoriesMonthResponse,
-    CategoryMonthOut,
     AssignRequest,
     MoveMonthRequest,
     MoveBetweenCategoriesRequest,
     CategoryPatch,
     CategoryGroupPatch,
+    MergeRequest,
 )
 
 
 router = APIRouter(prefix="/api/v1", tags=["categories"])
 
+MONTH_FIELDS = ("month", "groups", "categories", "months", "available_to_budget_cents", "age_of_money_days")
+
 
 def _normalize_month(d: date) -> date:
     return d.replace(day=1)
 
 
+def _age_of_money(db: Session, budget_id: UUID, m: date) -> int | None:
+    # Advancing AoM may persist new checkpoints; keep them
+    aom = age_of_money.for_month(db, budget_id, m)
+    db.commit()
+    return aom
+
+
+def _add_assigned(db: Session, category_id: UUID, m: date, delta: int) -> tuple[UUID, int]:
+    """Add `delta` to a category month's assignment in one statement; returns (row id, assigned after).
+
+    Creating the row and adding to it is a single upsert on (category_id, month), so
+    concurrent first assignments neither collide on the unique key nor lose an update.
+    """
+    stmt = insert(MonthlyCategoryBudget).values(category_id=category_id, month=m, assigned_cents=delta)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["category_id", "month"],
+        set_={
+            "assigned_cents": MonthlyCategoryBudget.assigned_cents + stmt.excluded.assigned_cents,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ).returning(MonthlyCategoryBudget.id, MonthlyCategoryBudget.assigned_cents)
+    row_id, after = db.execute(stmt).one()
+    return row_id, after
+
+
+def _move_assigned(db: Session, source: tuple[UUID, date], target: tuple[UUID, date], amt: int) -> dict[tuple, int]:
+    """Move `amt` from one category month to another; returns assigned-after per (category, month)."""
+    deltas = {source: -amt, target: amt}
+    # Fixed order, so two opposite moves cannot deadlock on each other's rows
+    return {key: _add_assigned(db, key[0], key[1], deltas[key])[1] for key in sorted(deltas, key=lambda k: (str(k[0]), k[1]))}
+
+
+def _derive_etag(etag: str, extra: str) -> str:
+    # The month view's ETag covers the ledger figures; fold in what is added on top of them
+    return 'W/"' + hashlib.sha256(f"{etag}|{extra}".encode()).hexdigest() + '"'
+
+
+def _month_body(db: Session, budget_id: UUID, m: date) -> tuple[dict, str]:
+    body, etag = month_view.build(db, budget_id, m)
+    body["age_of_money_days"] = _age_of_money(db, budget_id, m)
+    return body, _derive_etag(etag, f"aom:{body['age_of_money_days']}")
+
+
 @router.post("/budgets/{budget_id}/category-groups", response_model=dict)
-def create_group(budget_id: UUID, payload: CategoryGroupCreate, db: Session = Depends(get_db)):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
+def create_group(
+    budget_id: UUID,
+    payload: CategoryGroupCreate,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
     g = CategoryGroup(budget_id=budget_id, name=payload.name, sort=payload.sort)
     db.add(g)
     db.commit()
@@ -44,11 +95,15 @@ def create_group(budget_id: UUID, payload: CategoryGroupCreate, db: Session = De
 
 
 @router.patch("/budgets/{budget_id}/category-groups/{group_id}", response_model=dict)
-def patch_group(budget_id: UUID, group_id: UUID, payload: CategoryGroupPatch, db: Session = Depends(get_db)):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
+def patch_group(
+    budget_id: UUID,
+    group_id: UUID,
+    payload: CategoryGroupPatch,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    ctx.require_group(group_id)
     g = db.get(CategoryGroup, group_id)
-    if not g or g.budget_id != budget_id:
-        raise HTTPException(404, "Category group not found")
     if payload.name is not None:
         g.name = payload.name
     db.commit()
@@ -57,29 +112,63 @@ def patch_group(budget_id: UUID, group_id: UUID, payload: CategoryGroupPatch, db
 
 
 @router.delete("/budgets/{budget_id}/category-groups/{group_id}", status_code=204)
-def delete_group(budget_id: UUID, group_id: UUID, db: Session = Depends(get_db)):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
-    g = db.get(CategoryGroup, group_id)
-    if not g or g.budget_id != budget_id:
-        raise HTTPException(404, "Category group not found")
-    db.delete(g)
+def delete_group(
+    budget_id: UUID,
+    group_id: UUID,
+    reassign_to: UUID | None = None,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    """Without `reassign_to` (a group) the group's categories go too and their transactions become uncategorized."""
+    ctx.require_group(group_id)
+    if reassign_to is not None:
+        ctx.require_group(reassign_to, 400, "Invalid target group")
+    try:
+        merge.delete_group(db, budget_id, group_id, reassign_to)
+    except merge.MergeError as e:
+        raise HTTPException(400, str(e))
     db.commit()
     return
 
 
+@router.post("/budgets/{budget_id}/category-groups/{group_id}/merge", response_model=dict)
+def merge_group(
+    budget_id: UUID,
+    group_id: UUID,
+    payload: MergeRequest,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    ctx.require_group(group_id)
+    ctx.require_group(payload.target_id, 400, "Invalid target group")
+    try:
+        moved = merge.merge_groups(db, budget_id, group_id, payload.target_id)
+    except merge.MergeError as e:
+        raise HTTPException(400, str(e))
+    db.commit()
+    return {"id": str(payload.target_id), "categories_moved": moved}
+
+
 @router.post("/budgets/{budget_id}/categories", response_model=dict)
-def create_category(budget_id: UUID, payload: CategoryCreate, db: Session = Depends(get_db)):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
-    grp = db.get(CategoryGroup, payload.group_id)
-    if not grp or grp.budget_id != budget_id:
-        raise HTTPException(400, "Invalid group")
+def create_category(
+    budget_id: UUID,
+    payload: CategoryCreate,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    ctx.require_group(payload.group_id, 400, "Invalid group")
+    if payload.credit_account_id is not None:
+        ctx.require_account(payload.credit_account_id, 400, "Invalid credit account")
+        if db.get(Account, payload.credit_account_id).type != "credit":
+            raise HTTPException(400, "Account is not a credit account")
     c = Category(
         budget_id=budget_id,
         group_id=payload.group_id,
         name=payload.name,
         sort=payload.sort,
         hidden=payload.hidden,
-        is_credit_payment=payload.is_credit_payment,
+        is_credit_payment=payload.is_credit_payment or payload.credit_account_id is not None,
+        credit_account_id=payload.credit_account_id,
     )
     db.add(c)
     db.commit()
@@ -88,11 +177,15 @@ def create_category(budget_id: UUID, payload: CategoryCreate, db: Session = Depe
 
 
 @router.patch("/budgets/{budget_id}/categories/{category_id}", response_model=dict)
-def patch_category(budget_id: UUID, category_id: UUID, payload: CategoryPatch, db: Session = Depends(get_db)):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
+def patch_category(
+    budget_id: UUID,
+    category_id: UUID,
+    payload: CategoryPatch,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    ctx.require_category(category_id)
     c = db.get(Category, category_id)
-    if not c or c.budget_id != budget_id:
-        raise HTTPException(404, "Category not found")
     if payload.name is not None:
         c.name = payload.name
     if payload.hidden is not None:
@@ -103,121 +196,90 @@ def patch_category(budget_id: UUID, category_id: UUID, payload: CategoryPatch, d
 
 
 @router.delete("/budgets/{budget_id}/categories/{category_id}", status_code=204)
-def delete_category(budget_id: UUID, category_id: UUID, db: Session = Depends(get_db)):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
-    c = db.get(Category, category_id)
-    if not c or c.budget_id != budget_id:
-        raise HTTPException(404, "Category not found")
-    db.delete(c)
+def delete_category(
+    budget_id: UUID,
+    category_id: UUID,
+    reassign_to: UUID | None = None,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    """Without `reassign_to` the category's transactions become uncategorized."""
+    ctx.require_category(category_id)
+    if reassign_to is not None:
+        ctx.require_category(reassign_to, 400, "Invalid target category")
+    try:
+        merge.delete_category(db, budget_id, category_id, reassign_to)
+    except merge.MergeError as e:
+        raise HTTPException(400, str(e))
     db.commit()
     return
 
 
+@router.post("/budgets/{budget_id}/categories/{category_id}/merge", response_model=dict)
+def merge_category(
+    budget_id: UUID,
+    category_id: UUID,
+    payload: MergeRequest,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    ctx.require_category(category_id)
+    ctx.require_category(payload.target_id, 400, "Invalid target category")
+    try:
+        moved = merge.merge_categories(db, budget_id, category_id, payload.target_id)
+    except merge.MergeError as e:
+        raise HTTPException(400, str(e))
+    db.commit()
+    return {"id": str(payload.target_id), "subtransactions_moved": moved}
+
+
 @router.get("/budgets/{budget_id}/categories", response_model=CategoriesMonthResponse)
-def list_categories_month(
+async def list_categories_month(
     budget_id: UUID,
     month: date,
-    db: Session = Depends(get_db),
+    fields: str | None = Query(default=None, description="Comma-separated subset of the top-level sections"),
+    ctx: BudgetContext = Depends(get_budget_context),
     if_none_match: str | None = Header(default=None, alias="If-None-Match"),
-    response: Response = None,
+    consistency_token: str | None = Header(default=None, alias=replica.HEADER),
 ):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
     m = _normalize_month(month)
-
-    groups = db.query(CategoryGroup).filter_by(budget_id=budget_id).order_by(CategoryGroup.sort, CategoryGroup.name).all()
-    cats = db.query(Category).filter_by(budget_id=budget_id).order_by(Category.sort, Category.name).all()
-
-    # Load monthly rows for given month
-    cat_ids = [c.id for c in cats]
-    monthlies = (
-        db.query(MonthlyCategoryBudget)
-        .filter(MonthlyCategoryBudget.category_id.in_(cat_ids), MonthlyCategoryBudget.month == m)
-        .all()
-        if cat_ids
-        else []
-    )
-    m_by_cat = {row.category_id: row for row in monthlies}
-
-    # Compute activity for the month from subtransactions (outflows as positive)
-    # month window: [m, next_month)
-    import datetime as _dt
-    year = m.year
-    month_num = m.month
-    if month_num == 12:
-        next_month = _dt.date(year + 1, 1, 1)
-    else:
-        next_month = _dt.date(year, month_num + 1, 1)
-
-    activity_by_cat: dict[UUID, int] = {}
-    if cat_ids:
-        q = (
-            db.query(SubTransaction.category_id, sa.func.sum(SubTransaction.amount_cents))
-            .join(Transaction, SubTransaction.transaction_id == Transaction.id)
-            .filter(
-                Transaction.budget_id == budget_id,
-                Transaction.deleted_at.is_(None),
-                Transaction.date >= m,
-                Transaction.date < next_month,
-                SubTransaction.category_id.in_(cat_ids),
-            )
-            .group_by(SubTransaction.category_id)
-        )
-        for cid, total in q:
-            # outflows are negative amounts; activity is positive spend
-            activity_by_cat[cid] = int(-total) if total is not None and total < 0 else 0
-
-    # Build response lists
-    months = []
-    for c in cats:
-        row = m_by_cat.get(c.id)
-        assigned = row.assigned_cents if row else 0
-        activity = activity_by_cat.get(c.id, 0)
-        available = assigned - activity
-        months.append(
-            CategoryMonthOut(
-                category_id=c.id,
-                month=m,
-                assigned_cents=assigned,
-                activity_cents=activity,
-                available_cents=available,
-            )
-        )
-
-    # Incomes targeted to this month on on-budget accounts
-    income_sum = (
-        db.query(sa.func.coalesce(sa.func.sum(Transaction.amount_cents), 0))
-        .join(Account, Account.id == Transaction.account_id)
-        .filter(
-            Transaction.budget_id == budget_id,
-            Transaction.deleted_at.is_(None),
-            Transaction.income_month == m,
-            Account.on_budget.is_(True),
-        )
-        .scalar()
-        or 0
-    )
-
-    total_assigned = sum(x.assigned_cents for x in months)
-    available_to_budget = int(income_sum) - int(total_assigned)
-
-    # ETag: hash of assigned values + counts + income
-    etag_raw = f"{budget_id}|{m.isoformat()}|{len(groups)}|{len(cats)}|" + \
-        ",".join(f"{x.category_id}:{x.assigned_cents}" for x in months) + f"|income:{income_sum}"
-    etag = 'W/"' + hashlib.sha256(etag_raw.encode()).hexdigest() + '"'
-    if if_none_match == etag and response is not None:
-        # Short-circuit: Not Modified
-        response.status_code = 304
-        return None  # FastAPI will ignore body for 304
-    if response is not None:
-        response.headers["ETag"] = etag
-
-    return CategoriesMonthResponse(
+    # The ledger of a closed month lives in the archive; see GET .../closes/{id} for its carry-ins
+    ctx.require_open(m)
+    wanted = fieldsets.parse(fields, MONTH_FIELDS, always=())
+
+    async def compute():
+        # Own sessions: the shared computation may outlive the request that started it
+        async with replica.read_session(consistency_token) as db:
+            body, etag = await db.run_sync(month_view.build, budget_id, m)
+            covered, aom = True, None
+            if fieldsets.wants(wanted, "age_of_money_days"):
+                covered, aom = await db.run_sync(age_of_money.peek, budget_id, m)
+        if not covered:
+            # Advancing the checkpoints writes, so it always runs on the primary
+            async with AsyncSessionLocal() as db:
+                aom = await db.run_sync(_age_of_money, budget_id, m)
+        body["age_of_money_days"] = aom
+        etag = _derive_etag(etag, f"aom:{aom}")
+        if wanted is not None:
+            body = fieldsets.prune(body, wanted)
+            # A pruned body is a different representation of the same month
+            etag = _derive_etag(etag, fieldsets.cache_key(wanted))
+        return {"body": body, "etag": etag}
+
+    key = singleflight.make_key(
+        "categories_month",
+        await budget_version.current(budget_id),
+        budget_id=budget_id,
         month=m,
-        groups=groups,
-        categories=cats,
-        months=months,
-        available_to_budget_cents=available_to_budget,
+        source=await replica.read_target(consistency_token),
+        fields=fieldsets.cache_key(wanted),
     )
+    result = await singleflight.run(key, compute)
+    etag = result["etag"]
+    if if_none_match == etag:
+        # Short-circuit: Not Modified
+        return Response(status_code=304, headers={"ETag": etag})
+    return trusted(result["body"], headers={"ETag": etag})
 
 
 @router.post("/budgets/{budget_id}/categories/{category_id}/assign", response_model=CategoriesMonthResponse)
@@ -225,27 +287,15 @@ def assign_to_category(
     budget_id: UUID,
     category_id: UUID,
     payload: AssignRequest,
+    ctx: BudgetContext = Depends(get_budget_context),
     db: Session = Depends(get_db),
 ):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
-    c = db.get(Category, category_id)
-    if not c or c.budget_id != budget_id:
-        raise HTTPException(404, "Category not found")
+    ctx.require_category(category_id)
     m = _normalize_month(payload.month)
+    ctx.require_open(m)
 
-    row = (
-        db.query(MonthlyCategoryBudget)
-        .filter_by(category_id=category_id, month=m)
-        .one_or_none()
-    )
-    before = row.assigned_cents if row else 0
-    if row is None:
-        row = MonthlyCategoryBudget(category_id=category_id, month=m, assigned_cents=0)
-        db.add(row)
-        db.flush()
-    row.assigned_cents = before + int(payload.delta_cents)
-    row.updated_at = datetime.utcnow()
-    db.flush()
+    delta = int(payload.delta_cents)
+    row_id, after = _add_assigned(db, category_id, m, delta)
 
     # Audit
     db.add(
@@ -253,20 +303,22 @@ def assign_to_category(
             budget_id=budget_id,
             action="assign",
             entity_type="monthly_category_budget",
-            entity_id=row.id,
+            entity_id=row_id,
             diff_json={
                 "category_id": str(category_id),
                 "month": m.isoformat(),
-                "assigned_before": before,
-                "delta": int(payload.delta_cents),
-                "assigned_after": row.assigned_cents,
+                "assigned_before": after - delta,
+                "delta": delta,
+                "assigned_after": after,
             },
         )
     )
+    # Assignment rows carry no budget_id, so the flush hook cannot attribute them
+    changes.record(db, budget_id, "monthly_category_budget", category_id)
     db.commit()
 
     # Return updated month rollup
-    return list_categories_month(budget_id, m, db)
+    return trusted(_month_body(db, budget_id, m)[0])
 
 
 @router.post("/budgets/{budget_id}/categories/{category_id}/move", response_model=CategoriesMonthResponse)
@@ -274,42 +326,19 @@ def move_within_category_months(
     budget_id: UUID,
     category_id: UUID,
     payload: MoveMonthRequest,
+    ctx: BudgetContext = Depends(get_budget_context),
     db: Session = Depends(get_db),
 ):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
-    c = db.get(Category, category_id)
-    if not c or c.budget_id != budget_id:
-        raise HTTPException(404, "Category not found")
+    ctx.require_category(category_id)
     from_m = _normalize_month(payload.from_month)
     to_m = _normalize_month(payload.to_month)
+    ctx.require_open(min(from_m, to_m))
     amt = int(payload.amount_cents)
     if amt == 0 or from_m == to_m:
-        return list_categories_month(budget_id, to_m, db)
+        return trusted(_month_body(db, budget_id, to_m)[0])
 
-    # Load or create both rows
-    from_row = (
-        db.query(MonthlyCategoryBudget)
-        .filter_by(category_id=category_id, month=from_m)
-        .one_or_none()
-    )
-    to_row = (
-        db.query(MonthlyCategoryBudget)
-        .filter_by(category_id=category_id, month=to_m)
-        .one_or_none()
-    )
-    if from_row is None:
-        from_row = MonthlyCategoryBudget(category_id=category_id, month=from_m, assigned_cents=0)
-        db.add(from_row)
-        db.flush()
-    if to_row is None:
-        to_row = MonthlyCategoryBudget(category_id=category_id, month=to_m, assigned_cents=0)
-        db.add(to_row)
-        db.flush()
-
-    before_from = from_row.assigned_cents
-    before_to = to_row.assigned_cents
-    from_row.assigned_cents = before_from - amt
-    to_row.assigned_cents = before_to + amt
+    after = _move_assigned(db, (category_id, from_m), (category_id, to_m), amt)
+    from_after, to_after = after[(category_id, from_m)], after[(category_id, to_m)]
 
     # Audit
     db.add(
@@ -322,56 +351,35 @@ def move_within_category_months(
                 "from_month": from_m.isoformat(),
                 "to_month": to_m.isoformat(),
                 "amount_cents": amt,
-                "from_before": before_from,
-                "to_before": before_to,
-                "from_after": from_row.assigned_cents,
-                "to_after": to_row.assigned_cents,
+                "from_before": from_after + amt,
+                "to_before": to_after - amt,
+                "from_after": from_after,
+                "to_after": to_after,
             },
         )
     )
+    changes.record(db, budget_id, "monthly_category_budget", category_id)
     db.commit()
-    return list_categories_month(budget_id, to_m, db)
+    return trusted(_month_body(db, budget_id, to_m)[0])
 
 
 @router.post("/budgets/{budget_id}/categories/move", response_model=CategoriesMonthResponse)
 def move_between_categories(
     budget_id: UUID,
     payload: MoveBetweenCategoriesRequest,
+    ctx: BudgetContext = Depends(get_budget_context),
     db: Session = Depends(get_db),
 ):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
-    from_cat = db.get(Category, payload.from_category_id)
-    to_cat = db.get(Category, payload.to_category_id)
-    if not from_cat or not to_cat or from_cat.budget_id != budget_id or to_cat.budget_id != budget_id:
-        raise HTTPException(400, "Invalid categories")
+    ctx.require_category(payload.from_category_id, 400, "Invalid categories")
+    ctx.require_category(payload.to_category_id, 400, "Invalid categories")
     m = _normalize_month(payload.month)
+    ctx.require_open(m)
     amt = int(payload.amount_cents)
     if amt == 0 or payload.from_category_id == payload.to_category_id:
-        return list_categories_month(budget_id, m, db)
+        return trusted(_month_body(db, budget_id, m)[0])
 
-    from_row = (
-        db.query(MonthlyCategoryBudget)
-        .filter_by(category_id=payload.from_category_id, month=m)
-        .one_or_none()
-    )
-    to_row = (
-        db.query(MonthlyCategoryBudget)
-        .filter_by(category_id=payload.to_category_id, month=m)
-        .one_or_none()
-    )
-    if from_row is None:
-        from_row = MonthlyCategoryBudget(category_id=payload.from_category_id, month=m, assigned_cents=0)
-        db.add(from_row)
-        db.flush()
-    if to_row is None:
-        to_row = MonthlyCategoryBudget(category_id=payload.to_category_id, month=m, assigned_cents=0)
-        db.add(to_row)
-        db.flush()
-
-    before_from = from_row.assigned_cents
-    before_to = to_row.assigned_cents
-    from_row.assigned_cents = before_from - amt
-    to_row.assigned_cents = before_to + amt
+    after = _move_assigned(db, (payload.from_category_id, m), (payload.to_category_id, m), amt)
+    from_after, to_after = after[(payload.from_category_id, m)], after[(payload.to_category_id, m)]
     db.add(
         AuditLog(
             budget_id=budget_id,
@@ -383,12 +391,14 @@ def move_between_categories(
                 "from_category_id": str(payload.from_category_id),
                 "to_category_id": str(payload.to_category_id),
                 "amount_cents": amt,
-                "from_before": before_from,
-                "to_before": before_to,
-                "from_after": from_row.assigned_cents,
-                "to_after": to_row.assigned_cents,
+                "from_before": from_after + amt,
+                "to_before": to_after - amt,
+                "from_after": from_after,
+                "to_after": to_after,
             },
         )
     )
+    changes.record(db, budget_id, "monthly_category_budget", payload.from_category_id)
+    changes.record(db, budget_id, "monthly_category_budget", payload.to_category_id)
     db.commit()
-    return list_categories_month(budget_id, m, db)
+    return trusted(_month_body(db, budget_id, m)[0])
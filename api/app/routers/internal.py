@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from app import profiling
+from app.deps import require_admin
+from app.pool_stats import snapshot_all
+
+
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/pool", response_model=list[dict])
+def pool_status():
+    return snapshot_all()
+
+
+@router.get("/profiles", response_model=list[dict])
+def list_profiles(budget_id: str | None = None, route: str | None = None, limit: int = 50):
+    return profiling.list_profiles(budget_id=budget_id, route=route, limit=min(limit, 500))
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    found = profiling.profile_path(profile_id)
+    if found is None:
+        raise HTTPException(404, "Profile not found")
+    path, media_type = found
+    return FileResponse(path, media_type=media_type, filename=path.rsplit("/", 1)[-1])
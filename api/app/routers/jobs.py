@@ -0,0 +1,76 @@
+import os
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import FileResponse
+from pydantic import ValidationError
+
+from app import jobs
+from app.config import Settings
+from app.budget_context import BudgetContext, get_budget_context
+from app.schemas.jobs import JobCreate, JobOut
+
+
+router = APIRouter(prefix="/api/v1/budgets/{budget_id}/jobs", tags=["jobs"])
+
+settings = Settings()
+
+
+def _get_job(budget_id: UUID, job_id: str):
+    j = jobs.fetch(job_id)
+    if j is None or j.meta.get("budget_id") != str(budget_id):
+        raise HTTPException(404, "Job not found")
+    return j
+
+
+def job_out(j) -> dict:
+    status = j.get_status(refresh=False)
+    error = None
+    if status == "failed" and j.exc_info:
+        error = j.exc_info.strip().splitlines()[-1]
+    return {
+        "id": j.id,
+        "kind": j.meta.get("kind"),
+        "budget_id": j.meta.get("budget_id"),
+        "status": str(getattr(status, "value", status)),
+        "progress": j.meta.get("progress"),
+        "result": j.return_value() if status == "finished" else None,
+        "error": error,
+        "enqueued_at": j.enqueued_at,
+        "started_at": j.started_at,
+        "ended_at": j.ended_at,
+    }
+
+
+@router.post("/", response_model=JobOut, status_code=202)
+def create_job(
+    budget_id: UUID,
+    payload: JobCreate,
+    response: Response,
+    ctx: BudgetContext = Depends(get_budget_context),
+):
+    try:
+        j = jobs.enqueue(payload.kind, budget_id, payload.params)
+    except KeyError:
+        raise HTTPException(400, f"Unknown job kind {payload.kind!r}")
+    except ValidationError as e:
+        raise HTTPException(422, e.errors(include_url=False))
+    response.headers["Location"] = f"/api/v1/budgets/{budget_id}/jobs/{j.id}"
+    return job_out(j)
+
+
+@router.get("/{job_id}", response_model=JobOut)
+def get_job(budget_id: UUID, job_id: str, ctx: BudgetContext = Depends(get_budget_context)):
+    return job_out(_get_job(budget_id, job_id))
+
+
+@router.get("/{job_id}/artifact")
+def get_job_artifact(budget_id: UUID, job_id: str, ctx: BudgetContext = Depends(get_budget_context)):
+    j = _get_job(budget_id, job_id)
+    result = j.return_value() if j.get_status() == "finished" else None
+    if not result or "artifact" not in result:
+        raise HTTPException(404, "Job has no artifact")
+    path = os.path.join(settings.jobs_artifact_dir, result["artifact"])
+    if not os.path.exists(path):
+        raise HTTPException(410, "Artifact expired")
+    return FileResponse(path, media_type="application/octet-stream", filename=result["artifact"])
@@ -1,21 +1,73 @@
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
+import sqlalchemy as sa
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
-from app.models.budget import Budget
+from app.replica import get_async_read_db
+from app.budget_context import BudgetContext, get_budget_context
 from app.models.payee import Payee
+from app.schemas.categories import MergeRequest
+from app.services import merge
 
 
 router = APIRouter(prefix="/api/v1/budgets/{budget_id}/payees", tags=["payees"])
 
 
 @router.get("/", response_model=list[dict])
-def list_payees(budget_id: UUID, q: str | None = None, db: Session = Depends(get_db)):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
-    query = db.query(Payee).filter_by(budget_id=budget_id)
+async def list_payees(
+    budget_id: UUID,
+    q: str | None = None,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    query = sa.select(Payee.id, Payee.name).where(Payee.budget_id == budget_id)
     if q:
-        query = query.filter(Payee.name.ilike(f"%{q}%"))
-    rows = query.order_by(Payee.name).limit(100).all()
+        query = query.where(Payee.name.ilike(f"%{q}%"))
+    rows = (await db.execute(query.order_by(Payee.name).limit(100))).all()
     return [{"id": r.id, "name": r.name} for r in rows]
 
+
+def _require_payee(db: Session, budget_id: UUID, payee_id: UUID, status: int = 404, detail: str = "Payee not found") -> None:
+    p = db.get(Payee, payee_id)
+    if not p or p.budget_id != budget_id:
+        raise HTTPException(status, detail)
+
+
+@router.post("/{payee_id}/merge", response_model=dict)
+def merge_payee(
+    budget_id: UUID,
+    payee_id: UUID,
+    payload: MergeRequest,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    _require_payee(db, budget_id, payee_id)
+    _require_payee(db, budget_id, payload.target_id, 400, "Invalid target payee")
+    try:
+        moved = merge.merge_payees(db, budget_id, payee_id, payload.target_id)
+    except merge.MergeError as e:
+        raise HTTPException(400, str(e))
+    db.commit()
+    return {"id": str(payload.target_id), "transactions_moved": moved}
+
+
+@router.delete("/{payee_id}", status_code=204)
+def delete_payee(
+    budget_id: UUID,
+    payee_id: UUID,
+    reassign_to: UUID | None = None,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    """Without `reassign_to` the payee's transactions are left without a payee."""
+    _require_payee(db, budget_id, payee_id)
+    if reassign_to is not None:
+        _require_payee(db, budget_id, reassign_to, 400, "Invalid target payee")
+    try:
+        merge.merge_payees(db, budget_id, payee_id, reassign_to)
+    except merge.MergeError as e:
+        raise HTTPException(400, str(e))
+    db.commit()
+    return
@@ -0,0 +1,107 @@
+from datetime import date
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import jobs
+from app.budget_context import BudgetContext, get_budget_context
+from app.replica import get_async_read_db
+from app.models.period import PeriodClose, PeriodCloseCarryIn
+from app.routers.jobs import job_out
+from app.schemas.jobs import JobOut
+from app.schemas.periods import CloseCreate, CloseOut
+
+
+router = APIRouter(prefix="/api/v1/budgets/{budget_id}/closes", tags=["periods"])
+
+
+def _close_out(c: PeriodClose, carry_ins: list | None = None) -> dict:
+    out = {
+        "id": c.id,
+        "cutoff": c.cutoff,
+        "summary": c.summary or {},
+        "created_at": c.created_at,
+        "reopened_at": c.reopened_at,
+    }
+    if carry_ins is not None:
+        out["carry_ins"] = [
+            {"category_id": r.category_id, "assigned_cents": r.assigned_cents, "activity_cents": r.activity_cents}
+            for r in carry_ins
+        ]
+    return out
+
+
+def _enqueue(budget_id: UUID, kind: str, params: dict, response: Response) -> dict:
+    j = jobs.enqueue(kind, budget_id, params)
+    response.headers["Location"] = f"/api/v1/budgets/{budget_id}/jobs/{j.id}"
+    return job_out(j)
+
+
+@router.post("/", response_model=JobOut, status_code=202)
+def close_period(
+    budget_id: UUID,
+    payload: CloseCreate,
+    response: Response,
+    ctx: BudgetContext = Depends(get_budget_context),
+):
+    """Queue a close of everything before `cutoff`; the job's result names the close."""
+    if payload.cutoff.day != 1:
+        raise HTTPException(400, "The cutoff must be the first day of a month")
+    if payload.cutoff > date.today().replace(day=1):
+        raise HTTPException(400, "Only past months can be closed")
+    if ctx.closed_before is not None and payload.cutoff <= ctx.closed_before:
+        raise HTTPException(409, f"The period before {ctx.closed_before.isoformat()} is already closed")
+    return _enqueue(budget_id, "period.close", {"cutoff": payload.cutoff.isoformat()}, response)
+
+
+@router.get("/", response_model=list[CloseOut])
+async def list_closes(
+    budget_id: UUID,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    rows = (
+        await db.execute(
+            sa.select(PeriodClose).where(PeriodClose.budget_id == budget_id).order_by(PeriodClose.created_at.desc())
+        )
+    ).scalars().all()
+    return [_close_out(c) for c in rows]
+
+
+async def _get_close(db: AsyncSession, budget_id: UUID, close_id: UUID) -> PeriodClose:
+    c = await db.get(PeriodClose, close_id)
+    if c is None or c.budget_id != budget_id:
+        raise HTTPException(404, "Close not found")
+    return c
+
+
+@router.get("/{close_id}", response_model=CloseOut)
+async def get_close(
+    budget_id: UUID,
+    close_id: UUID,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    c = await _get_close(db, budget_id, close_id)
+    carry_ins = (
+        await db.execute(sa.select(PeriodCloseCarryIn).where(PeriodCloseCarryIn.close_id == close_id))
+    ).scalars().all()
+    return _close_out(c, carry_ins)
+
+
+@router.post("/{close_id}/reopen", response_model=JobOut, status_code=202)
+async def reopen_period(
+    budget_id: UUID,
+    close_id: UUID,
+    response: Response,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    c = await _get_close(db, budget_id, close_id)
+    if c.reopened_at is not None:
+        raise HTTPException(409, "This close was already reopened")
+    if c.cutoff != ctx.closed_before:
+        raise HTTPException(409, "Only the latest close can be reopened")
+    return _enqueue(budget_id, "period.reopen", {"close_id": str(close_id)}, response)
@@ -0,0 +1,181 @@
+from datetime import date
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.replica import get_read_db
+from app.responses import trusted
+from app.budget_context import BudgetContext, get_budget_context
+from app.models.account import Account
+from app.models.category import CategoryGroup, Category
+from app.models.rollup import AccountMonthRollup, CategoryMonthRollup
+from app.schemas.reports import SpendingReport, IncomeExpenseReport, NetWorthReport
+from app.services.rollups import month_start, next_month
+
+
+router = APIRouter(prefix="/api/v1/budgets/{budget_id}/reports", tags=["reports"])
+
+MAX_MONTHS = 240
+
+
+def _month_range(from_month: date, to_month: date) -> list[date]:
+    start, end = month_start(from_month), month_start(to_month)
+    if end < start:
+        raise HTTPException(400, "'to' must not be before 'from'")
+    months = [start]
+    while months[-1] < end:
+        months.append(next_month(months[-1]))
+        if len(months) > MAX_MONTHS:
+            raise HTTPException(400, f"Range exceeds {MAX_MONTHS} months")
+    return months
+
+
+@router.get("/spending", response_model=SpendingReport)
+def spending_report(
+    budget_id: UUID,
+    from_month: date = Query(alias="from"),
+    to_month: date = Query(alias="to"),
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_read_db),
+):
+    months = _month_range(from_month, to_month)
+    idx = {m: i for i, m in enumerate(months)}
+
+    rows = (
+        db.query(
+            Category.id,
+            Category.name,
+            CategoryGroup.id.label("group_id"),
+            CategoryGroup.name.label("group_name"),
+            CategoryMonthRollup.month,
+            sa.func.sum(-CategoryMonthRollup.activity_cents).label("spent"),
+        )
+        .join(Category, Category.id == CategoryMonthRollup.category_id)
+        .join(CategoryGroup, CategoryGroup.id == Category.group_id)
+        .filter(
+            CategoryMonthRollup.budget_id == budget_id,
+            CategoryMonthRollup.month >= months[0],
+            CategoryMonthRollup.month <= months[-1],
+        )
+        .group_by(Category.id, Category.name, CategoryGroup.id, CategoryGroup.name, CategoryMonthRollup.month)
+        .order_by(CategoryGroup.name, Category.name)
+        .all()
+    )
+
+    groups: dict[UUID, dict] = {}
+    cats: dict[UUID, dict] = {}
+    total = [0] * len(months)
+    for r in rows:
+        i = idx[r.month]
+        g = groups.setdefault(r.group_id, {"id": r.group_id, "name": r.group_name, "values": [0] * len(months)})
+        c = cats.setdefault(r.id, {"id": r.id, "group_id": r.group_id, "name": r.name, "values": [0] * len(months)})
+        spent = int(r.spent or 0)
+        c["values"][i] += spent
+        g["values"][i] += spent
+        total[i] += spent
+    return trusted({"months": months, "groups": list(groups.values()), "categories": list(cats.values()), "total_cents": total})
+
+
+@router.get("/income-expense", response_model=IncomeExpenseReport)
+def income_expense_report(
+    budget_id: UUID,
+    from_month: date = Query(alias="from"),
+    to_month: date = Query(alias="to"),
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_read_db),
+):
+    months = _month_range(from_month, to_month)
+    idx = {m: i for i, m in enumerate(months)}
+
+    rows = (
+        db.query(
+            AccountMonthRollup.month,
+            sa.func.sum(AccountMonthRollup.inflow_cents).label("income"),
+            sa.func.sum(AccountMonthRollup.outflow_cents).label("expense"),
+        )
+        .join(Account, Account.id == AccountMonthRollup.account_id)
+        .filter(
+            AccountMonthRollup.budget_id == budget_id,
+            AccountMonthRollup.month >= months[0],
+            AccountMonthRollup.month <= months[-1],
+            Account.on_budget.is_(True),
+        )
+        .group_by(AccountMonthRollup.month)
+        .all()
+    )
+    income = [0] * len(months)
+    expense = [0] * len(months)
+    for r in rows:
+        income[idx[r.month]] = int(r.income or 0)
+        expense[idx[r.month]] = int(r.expense or 0)
+    return trusted(
+        {
+            "months": months,
+            "income_cents": income,
+            "expense_cents": expense,
+            "net_cents": [i - e for i, e in zip(income, expense)],
+        }
+    )
+
+
+_NET_WORTH_SQL = sa.text(
+    """
+    WITH months AS (
+        SELECT generate_series(CAST(:from_month AS date), CAST(:to_month AS date), interval '1 month')::date AS month
+    ),
+    opening AS (
+        SELECT account_id, SUM(net_cents) AS balance
+        FROM account_month_rollups
+        WHERE budget_id = :budget_id AND month < :from_month
+        GROUP BY account_id
+    )
+    SELECT a.id AS account_id, a.name, m.month,
+           COALESCE(o.balance, 0)
+           + SUM(COALESCE(r.net_cents, 0)) OVER (PARTITION BY a.id ORDER BY m.month) AS balance
+    FROM accounts a
+    CROSS JOIN months m
+    LEFT JOIN opening o ON o.account_id = a.id
+    LEFT JOIN account_month_rollups r ON r.account_id = a.id AND r.month = m.month
+    WHERE a.budget_id = :budget_id
+    ORDER BY a.name, a.id, m.month
+    """
+)
+
+
+@router.get("/net-worth", response_model=NetWorthReport)
+def net_worth_report(
+    budget_id: UUID,
+    from_month: date = Query(alias="from"),
+    to_month: date = Query(alias="to"),
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_read_db),
+):
+    months = _month_range(from_month, to_month)
+    idx = {m: i for i, m in enumerate(months)}
+
+    rows = db.execute(
+        _NET_WORTH_SQL, {"budget_id": budget_id, "from_month": months[0], "to_month": months[-1]}
+    ).all()
+    accounts: dict[UUID, dict] = {}
+    assets = [0] * len(months)
+    liabilities = [0] * len(months)
+    for r in rows:
+        i = idx[r.month]
+        balance = int(r.balance or 0)
+        acc = accounts.setdefault(r.account_id, {"id": r.account_id, "name": r.name, "values": [0] * len(months)})
+        acc["values"][i] = balance
+        if balance >= 0:
+            assets[i] += balance
+        else:
+            liabilities[i] += balance
+    return trusted(
+        {
+            "months": months,
+            "assets_cents": assets,
+            "liabilities_cents": liabilities,
+            "net_worth_cents": [a + l for a, l in zip(assets, liabilities)],
+            "accounts": list(accounts.values()),
+        }
+    )
@@ -1,71 +1,93 @@
 from datetime import date
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import ValidationError
 from sqlalchemy.orm import Session, aliased
-from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select
 
+from app import fieldsets
+from app.config import Settings
 from app.db import get_db
-from app.models.budget import Budget
-from app.models.account import Account
+from app.replica import get_async_read_db
+from app.responses import trusted
+from app.budget_context import BudgetContext, get_budget_context
 from app.models.payee import Payee
 from app.models.transaction import Transaction, SubTransaction
-from app.schemas.transactions import TxIn, TxOut
+from app.schemas.transactions import SubTxIn, TxIn, TxOut, TxBulkIn, CategorySuggestionOut, DuplicateCheckIn, DuplicateCandidate
+from app.services import duplicates, suggestions
 
 
+settings = Settings()
+
 router = APIRouter(prefix="/api/v1/budgets/{budget_id}/transactions", tags=["transactions"])
 
 
+TX_FIELDS = (
+    "id",
+    "account_id",
+    "date",
+    "amount_cents",
+    "payee_name",
+    "payee_id",
+    "memo",
+    "transfer_account_id",
+    "subtransactions",
+    "income_for_month",
+    "state",
+)
+
+
 @router.get("/", response_model=list[TxOut])
-def list_transactions(
+async def list_transactions(
     budget_id: UUID,
-    db: Session = Depends(get_db),
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: AsyncSession = Depends(get_async_read_db),
     account_id: UUID | None = None,
     since: date | None = None,
+    fields: str | None = Query(default=None, description="Comma-separated subset of TxOut fields"),
 ):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
-    # Join payee for name and paired transfer to expose other account id
-    other = aliased(Transaction)
-    q = (
-        db.query(
-            Transaction,
-            Payee.name.label("payee_name"),
-            other.account_id.label("other_account_id"),
+    wanted = fieldsets.parse(fields, TX_FIELDS)
+    # Only the columns (and joins) behind the requested fields
+    columns = [Transaction.id]
+    for name in ("account_id", "date", "amount_cents", "payee_id", "memo", "state"):
+        if fieldsets.wants(wanted, name):
+            columns.append(getattr(Transaction, name))
+    q = select(*columns)
+    if fieldsets.wants(wanted, "payee_name"):
+        q = q.add_columns(Payee.name.label("payee_name")).outerjoin(Payee, Transaction.payee_id == Payee.id)
+    if fieldsets.wants(wanted, "transfer_account_id"):
+        # Paired transfer exposes the other account id
+        other = aliased(Transaction)
+        q = q.add_columns(other.account_id.label("transfer_account_id")).outerjoin(
+            other, and_(other.budget_id == Transaction.budget_id, other.id == Transaction.transfer_tx_id)
         )
-        .outerjoin(Payee, Transaction.payee_id == Payee.id)
-        .outerjoin(other, Transaction.transfer_tx_id == other.id)
-        .filter(Transaction.budget_id == budget_id)
-        .filter(Transaction.deleted_at.is_(None))
-    )
+    q = q.where(Transaction.budget_id == budget_id, Transaction.deleted_at.is_(None))
     if account_id:
-        q = q.filter(Transaction.account_id == account_id)
+        q = q.where(Transaction.account_id == account_id)
     if since:
-        q = q.filter(Transaction.date >= since)
+        q = q.where(Transaction.date >= since)
     q = q.order_by(Transaction.date.desc(), Transaction.id.desc())
-    items = q.limit(500).all()
-    out: list[TxOut] = []
-    for t, payee_name, other_account_id in items:
-        out.append(
-            TxOut(
-                id=t.id,
-                account_id=t.account_id,
-                date=t.date,
-                amount_cents=t.amount_cents,
-                payee_id=t.payee_id,
-                payee_name=payee_name,
-                memo=t.memo,
-                transfer_account_id=other_account_id,
-                subtransactions=[
-                    {
-                        "category_id": st.category_id,
-                        "amount_cents": st.amount_cents,
-                        "memo": st.memo,
-                    }
-                    for st in t.subtransactions
-                ],
-                state=t.state,
-            )
+    items = (await db.execute(q.limit(500))).mappings().all()
+
+    subs: dict[UUID, list[dict]] = {}
+    if fieldsets.wants(wanted, "subtransactions") and items:
+        sub_rows = await db.execute(
+            select(SubTransaction.transaction_id, SubTransaction.category_id, SubTransaction.amount_cents, SubTransaction.memo)
+            .where(SubTransaction.budget_id == budget_id, SubTransaction.transaction_id.in_([r["id"] for r in items]))
         )
-    return out
+        for st in sub_rows:
+            subs.setdefault(st.transaction_id, []).append(
+                {"category_id": st.category_id, "amount_cents": st.amount_cents, "memo": st.memo}
+            )
+    # Rows come straight from the ledger, so emit TxOut-shaped dicts without re-validation
+    out = []
+    for r in items:
+        row = dict(r)
+        row["subtransactions"] = subs.get(r["id"], [])
+        row["income_for_month"] = None
+        out.append(fieldsets.prune(row, wanted))
+    return trusted(out)
 
 
 def _get_or_create_payee(db: Session, budget_id: UUID, name: str | None, payee_id: UUID | None) -> UUID | None:
@@ -85,18 +107,113 @@ def _get_or_create_payee(db: Session, budget_id: UUID, name: str | None, payee_i
     return p.id
 
 
+def _resolve_payee_names(db: Session, budget_id: UUID, names: set[str]) -> dict[str, UUID]:
+    """Payee ids by name for a batch, creating missing payees in one flush."""
+    if not names:
+        return {}
+    found = dict(db.query(Payee.name, Payee.id).filter(Payee.budget_id == budget_id, Payee.name.in_(names)).all())
+    missing = [Payee(budget_id=budget_id, name=n) for n in sorted(names - found.keys())]
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        found.update((p.name, p.id) for p in missing)
+    return found
+
+
+def _suggested_category(ctx: BudgetContext, index: suggestions.Index | None, payee_id: UUID | None, memo: str | None) -> UUID | None:
+    if index is None:
+        return None
+    category_id = index.suggest(payee_id, memo)
+    # The index may lag a category delete by up to its TTL
+    return category_id if category_id in ctx.category_ids else None
+
+
+def _tx_out(t: Transaction, payee_name: str | None) -> TxOut:
+    return TxOut(
+        id=t.id,
+        account_id=t.account_id,
+        date=t.date,
+        amount_cents=t.amount_cents,
+        payee_id=t.payee_id,
+        payee_name=payee_name,
+        memo=t.memo,
+        transfer_account_id=None,
+        subtransactions=[
+            {
+                "category_id": st.category_id,
+                "amount_cents": st.amount_cents,
+                "memo": st.memo,
+            }
+            for st in t.subtransactions
+        ],
+        state=t.state,
+    )
+
+
+def _incoming_rows(db: Session, budget_id: UUID, txs: list[TxIn]) -> list[dict]:
+    """Rows for the duplicate detector, payee names resolved in one query."""
+    ids = {r.payee_id for r in txs if r.payee_id is not None}
+    names = (
+        dict(db.query(Payee.id, Payee.name).filter(Payee.budget_id == budget_id, Payee.id.in_(ids)).all()) if ids else {}
+    )
+    return [
+        {
+            "account_id": r.account_id,
+            "date": r.date,
+            "amount_cents": r.amount_cents,
+            "payee_name": names.get(r.payee_id) if r.payee_id is not None else r.payee_name,
+        }
+        for r in txs
+    ]
+
+
+@router.post("/duplicates", response_model=list[list[DuplicateCandidate]])
+def find_duplicates(
+    budget_id: UUID,
+    payload: DuplicateCheckIn,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    """Existing transactions each incoming row may duplicate, best match first."""
+    for i, row in enumerate(payload.transactions):
+        ctx.require_account(row.account_id, 400, f"Invalid account (row {i})")
+    rows = _incoming_rows(db, budget_id, payload.transactions)
+    return trusted(duplicates.find(db, budget_id, rows, payload.window_days))
+
+
+@router.get("/suggest", response_model=CategorySuggestionOut)
+def suggest_category(
+    budget_id: UUID,
+    payee_id: UUID | None = None,
+    payee_name: str | None = None,
+    memo: str | None = None,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    if payee_id is None and payee_name:
+        payee_id = db.query(Payee.id).filter_by(budget_id=budget_id, name=payee_name).scalar()
+    index = suggestions.get_index(db, budget_id)
+    return CategorySuggestionOut(category_id=_suggested_category(ctx, index, payee_id, memo))
+
+
 @router.post("/", response_model=TxOut, status_code=201)
-def create_transaction(budget_id: UUID, payload: TxIn, db: Session = Depends(get_db)):
-    _ = db.get(Budget, budget_id) or (_ for _ in ()).throw(HTTPException(404, "Budget not found"))
-    acc = db.get(Account, payload.account_id)
-    if not acc or acc.budget_id != budget_id:
-        raise HTTPException(400, "Invalid account")
+def create_transaction(
+    budget_id: UUID,
+    payload: TxIn,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    ctx.require_account(payload.account_id, 400, "Invalid account")
+    ctx.require_open(payload.date)
+    if payload.income_for_month is not None:
+        ctx.require_open(payload.income_for_month)
+    for st in payload.subtransactions:
+        if st.category_id is not None:
+            ctx.require_category(st.category_id, 400, "Invalid category")
 
     # Transfers: create pair and link
     if payload.transfer_account_id:
-        other = db.get(Account, payload.transfer_account_id)
-        if not other or other.budget_id != budget_id:
-            raise HTTPException(400, "Invalid transfer account")
+        ctx.require_account(payload.transfer_account_id, 400, "Invalid transfer account")
         if payload.subtransactions:
             raise HTTPException(400, "Transfer cannot have subtransactions")
         t1 = Transaction(
@@ -129,7 +246,7 @@ def create_transaction(budget_id: UUID, payload: TxIn, db: Session = Depends(get
             payee_id=None,
             payee_name=None,
             memo=t1.memo,
-            transfer_account_id=other.id,
+            transfer_account_id=payload.transfer_account_id,
             subtransactions=[],
             state=t1.state,
         )
@@ -157,44 +274,138 @@ def create_transaction(budget_id: UUID, payload: TxIn, db: Session = Depends(get
         for st in payload.subtransactions:
             db.add(
                 SubTransaction(
+                    budget_id=budget_id,
                     transaction_id=t.id,
+                    date=t.date,
                     category_id=st.category_id,
                     amount_cents=st.amount_cents,
                     memo=st.memo,
                 )
             )
+    elif payload.income_for_month is None and settings.auto_categorize:
+        index = suggestions.get_index(db, budget_id)
+        category_id = _suggested_category(ctx, index, payee_id, payload.memo)
+        if category_id is not None:
+            db.add(
+                SubTransaction(
+                    budget_id=budget_id,
+                    transaction_id=t.id,
+                    date=t.date,
+                    category_id=category_id,
+                    amount_cents=t.amount_cents,
+                )
+            )
 
     db.commit()
     db.refresh(t)
 
-    return TxOut(
-        id=t.id,
-        account_id=t.account_id,
-        date=t.date,
-        amount_cents=t.amount_cents,
-        payee_id=t.payee_id,
-        payee_name=payload.payee_name,
-        memo=t.memo,
-        transfer_account_id=None,
-        subtransactions=[
-            {
-                "category_id": st.category_id,
-                "amount_cents": st.amount_cents,
-                "memo": st.memo,
-            }
-            for st in t.subtransactions
-        ],
-        state=t.state,
+    return _tx_out(t, payload.payee_name)
+
+
+@router.post("/bulk", response_model=list[TxOut], status_code=201)
+def create_transactions_bulk(
+    budget_id: UUID,
+    payload: TxBulkIn,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    """Create many non-transfer transactions in one flush and one commit.
+
+    With `dedupe`, a row matching an existing transaction (see POST .../duplicates)
+    is not inserted: the existing one is marked cleared and returned in its slot.
+    """
+    for i, row in enumerate(payload.transactions):
+        ctx.require_account(row.account_id, 400, f"Invalid account (row {i})")
+        ctx.require_open(row.date, detail=f"Date falls in a closed period (row {i})")
+        if row.income_for_month is not None:
+            ctx.require_open(row.income_for_month, detail=f"Income month falls in a closed period (row {i})")
+        if row.transfer_account_id is not None:
+            raise HTTPException(400, f"Transfers are not supported in bulk (row {i})")
+        for st in row.subtransactions:
+            if st.category_id is not None:
+                ctx.require_category(st.category_id, 400, f"Invalid category (row {i})")
+        if row.subtransactions and row.income_for_month is None:
+            if sum(st.amount_cents for st in row.subtransactions) != row.amount_cents:
+                raise HTTPException(400, f"Split amounts must sum to transaction amount (row {i})")
+        if row.payee_id is not None:
+            _get_or_create_payee(db, budget_id, None, row.payee_id)
+
+    payees = _resolve_payee_names(
+        db, budget_id, {r.payee_name for r in payload.transactions if r.payee_id is None and r.payee_name}
     )
+    auto = settings.auto_categorize if payload.auto_categorize is None else payload.auto_categorize
+    # Loaded once per request; every lookup after that is in memory
+    index = suggestions.get_index(db, budget_id) if auto else None
+
+    matched: dict[int, UUID] = {}
+    if payload.dedupe:
+        rows = _incoming_rows(db, budget_id, payload.transactions)
+        matched = duplicates.best_matches(duplicates.find(db, budget_id, rows))
+
+    created = []
+    new_rows = []
+    for i, row in enumerate(payload.transactions):
+        if i in matched:
+            existing = db.get(Transaction, (budget_id, matched[i]))
+            if existing.state == "uncleared":
+                existing.state = "cleared"
+            name = db.query(Payee.name).filter(Payee.id == existing.payee_id).scalar() if existing.payee_id else None
+            created.append((existing, name))
+            continue
+        payee_id = row.payee_id or payees.get(row.payee_name)
+        t = Transaction(
+            budget_id=budget_id,
+            account_id=row.account_id,
+            date=row.date,
+            amount_cents=row.amount_cents,
+            memo=row.memo,
+            payee_id=payee_id,
+            state="uncleared",
+        )
+        t.subtransactions = []
+        if row.income_for_month is not None:
+            t.income_month = row.income_for_month.replace(day=1)
+        elif row.subtransactions:
+            t.subtransactions = [
+                SubTransaction(budget_id=budget_id, date=t.date, category_id=st.category_id, amount_cents=st.amount_cents, memo=st.memo)
+                for st in row.subtransactions
+            ]
+        else:
+            category_id = _suggested_category(ctx, index, payee_id, row.memo)
+            if category_id is not None:
+                t.subtransactions = [SubTransaction(budget_id=budget_id, date=t.date, category_id=category_id, amount_cents=t.amount_cents)]
+        created.append((t, row.payee_name))
+        new_rows.append(t)
+    db.add_all(new_rows)
+    db.flush()
+    # Build the response before commit expires every row
+    out = [_tx_out(t, payee_name) for t, payee_name in created]
+    db.commit()
+    return out
 
 
 @router.patch("/{tx_id}", response_model=TxOut)
-def patch_transaction(budget_id: UUID, tx_id: UUID, payload: dict, db: Session = Depends(get_db)):
-    t = db.get(Transaction, tx_id)
-    if not t or t.budget_id != budget_id:
+def patch_transaction(
+    budget_id: UUID,
+    tx_id: UUID,
+    payload: dict,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    t = db.get(Transaction, (budget_id, tx_id))
+    if not t:
         raise HTTPException(404, "Transaction not found")
+    # Rows of a closed period (and its opening balances) are read-only
+    ctx.require_open(t.date)
+    if t.income_month is not None:
+        ctx.require_open(t.income_month)
     # If it's a transfer, only allow memo/state edits for now
     is_transfer = bool(t.transfer_tx_id)
+    # Income carries no category lines unless this request also clears its month
+    income_after = payload["income_for_month"] if "income_for_month" in payload and not is_transfer else t.income_month
+    if income_after is not None and not is_transfer:
+        if payload.get("subtransactions") or payload.get("category_id") is not None:
+            raise HTTPException(400, "Income cannot be categorized; clear income_for_month first")
 
     # Update state
     state = payload.get("state")
@@ -222,25 +433,77 @@ def patch_transaction(budget_id: UUID, tx_id: UUID, payload: dict, db: Session =
 
     # Date
     if "date" in payload and not is_transfer:
-        t.date = payload["date"]
-
-    # Amount
-    if "amount_cents" in payload and not is_transfer:
         try:
-            t.amount_cents = int(payload["amount_cents"])
-        except Exception:
-            raise HTTPException(400, "amount_cents must be int")
+            new_date = date.fromisoformat(str(payload["date"])[:10])
+        except ValueError:
+            raise HTTPException(400, "Invalid date")
+        ctx.require_open(new_date)
+        t.date = new_date
+        for st in t.subtransactions:
+            st.date = t.date
+
+    # Amount and split lines: validated together, then applied
+    if ("amount_cents" in payload or "subtransactions" in payload) and not is_transfer:
+        amount = t.amount_cents
+        if "amount_cents" in payload:
+            try:
+                amount = int(payload["amount_cents"])
+            except (TypeError, ValueError):
+                raise HTTPException(400, "amount_cents must be int")
+        if "subtransactions" in payload:
+            # Replaces every line; an empty list leaves the transaction uncategorized
+            try:
+                lines = [SubTxIn.model_validate(st) for st in payload["subtransactions"] or []]
+            except (TypeError, ValidationError):
+                raise HTTPException(400, "Invalid subtransactions")
+            for st in lines:
+                if st.category_id is not None:
+                    ctx.require_category(st.category_id, 400, "Invalid category")
+            if lines and sum(st.amount_cents for st in lines) != amount:
+                raise HTTPException(400, "Split amounts must sum to amount_cents")
+            t.subtransactions = [
+                SubTransaction(
+                    budget_id=budget_id,
+                    date=t.date,
+                    category_id=st.category_id,
+                    amount_cents=st.amount_cents,
+                    memo=st.memo,
+                )
+                for st in lines
+            ]
+        else:
+            # Category lines must keep summing to the amount
+            subs = list(t.subtransactions)
+            if len(subs) == 1:
+                subs[0].amount_cents = amount
+            elif len(subs) > 1 and sum(st.amount_cents for st in subs) != amount:
+                raise HTTPException(400, "Split amounts must sum to amount_cents; send the new subtransactions with it")
+        t.amount_cents = amount
 
     # Category (only for non-split, non-transfer): we ensure a single subtransaction mirrors the amount
     if "category_id" in payload and not is_transfer:
         cat_id = payload["category_id"]
+        if cat_id is not None:
+            try:
+                cat_id = UUID(str(cat_id))
+            except ValueError:
+                raise HTTPException(400, "Invalid category")
+            ctx.require_category(cat_id, 400, "Invalid category")
         # Allow None to clear category
         subs = list(t.subtransactions)
         if len(subs) > 1:
             raise HTTPException(400, "Cannot set category on split transaction")
         if len(subs) == 0:
             if cat_id is not None:
-                db.add(SubTransaction(transaction_id=t.id, category_id=cat_id, amount_cents=t.amount_cents))
+                db.add(
+                    SubTransaction(
+                        budget_id=budget_id,
+                        transaction_id=t.id,
+                        date=t.date,
+                        category_id=cat_id,
+                        amount_cents=t.amount_cents,
+                    )
+                )
         else:
             subs[0].category_id = cat_id
             subs[0].amount_cents = t.amount_cents
@@ -251,7 +514,12 @@ def patch_transaction(budget_id: UUID, tx_id: UUID, payload: dict, db: Session =
         if d is None:
             t.income_month = None
         else:
-            t.income_month = d.replace(day=1)
+            try:
+                income_month = date.fromisoformat(str(d)[:10]).replace(day=1)
+            except ValueError:
+                raise HTTPException(400, "Invalid income_for_month")
+            ctx.require_open(income_month)
+            t.income_month = income_month
         if t.income_month is not None:
             for st in list(t.subtransactions):
                 db.delete(st)
@@ -281,17 +549,23 @@ def patch_transaction(budget_id: UUID, tx_id: UUID, payload: dict, db: Session =
 
 
 @router.delete("/{tx_id}", status_code=204)
-def delete_transaction(budget_id: UUID, tx_id: UUID, db: Session = Depends(get_db)):
-    t = db.get(Transaction, tx_id)
-    if not t or t.budget_id != budget_id:
+def delete_transaction(
+    budget_id: UUID,
+    tx_id: UUID,
+    ctx: BudgetContext = Depends(get_budget_context),
+    db: Session = Depends(get_db),
+):
+    t = db.get(Transaction, (budget_id, tx_id))
+    if not t:
         raise HTTPException(404, "Transaction not found")
+    ctx.require_open(t.date)
     # Soft delete
     from datetime import datetime as _dt
 
     t.deleted_at = _dt.utcnow()
     # If transfer, also delete counterpart
     if t.transfer_tx_id:
-        other = db.get(Transaction, t.transfer_tx_id)
+        other = db.get(Transaction, (budget_id, t.transfer_tx_id))
         if other:
             other.deleted_at = _dt.utcnow()
     db.commit()
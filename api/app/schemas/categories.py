@@ -14,6 +14,8 @@ class CategoryCreate(BaseModel):
     sort: int = 0
     hidden: bool = False
     is_credit_payment: bool = False
+    # Link a payment category to its credit card account
+    credit_account_id: UUID | None = None
 
 
 class CategoryGroupOut(BaseModel):
@@ -47,6 +49,8 @@ class CategoriesMonthResponse(BaseModel):
     categories: list[CategoryOut]
     months: list[CategoryMonthOut]
     available_to_budget_cents: int
+    # Mean days between money arriving and being spent (trailing 90 days); None without spending
+    age_of_money_days: int | None = None
 
 
 class AssignRequest(BaseModel):
@@ -74,3 +78,7 @@ class CategoryPatch(BaseModel):
 
 class CategoryGroupPatch(BaseModel):
     name: constr(min_length=1, max_length=200) | None = None
+
+
+class MergeRequest(BaseModel):
+    target_id: UUID
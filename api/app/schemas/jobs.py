@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class JobCreate(BaseModel):
+    kind: str
+    params: dict[str, Any] = {}
+
+
+class JobProgress(BaseModel):
+    done: int
+    total: int | None = None
+    message: str | None = None
+
+
+class JobOut(BaseModel):
+    id: str
+    kind: str
+    budget_id: UUID
+    status: str  # queued | started | finished | failed | ...
+    progress: JobProgress | None = None
+    result: Any = None
+    error: str | None = None
+    enqueued_at: datetime | None = None
+    started_at: datetime | None = None
+    ended_at: datetime | None = None
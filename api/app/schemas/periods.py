@@ -0,0 +1,24 @@
+from datetime import date, datetime
+from typing import Any
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class CloseCreate(BaseModel):
+    # First day of the first month that stays open
+    cutoff: date
+
+
+class CarryInOut(BaseModel):
+    category_id: UUID
+    assigned_cents: int
+    activity_cents: int
+
+
+class CloseOut(BaseModel):
+    id: UUID
+    cutoff: date
+    summary: dict[str, Any] = {}
+    created_at: datetime
+    reopened_at: datetime | None = None
+    carry_ins: list[CarryInOut] | None = None
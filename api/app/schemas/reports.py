@@ -0,0 +1,35 @@
+from datetime import date
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class SeriesOut(BaseModel):
+    id: UUID
+    name: str
+    values: list[int]
+
+
+class CategorySeriesOut(SeriesOut):
+    group_id: UUID
+
+
+class SpendingReport(BaseModel):
+    months: list[date]
+    groups: list[SeriesOut]
+    categories: list[CategorySeriesOut]
+    total_cents: list[int]
+
+
+class IncomeExpenseReport(BaseModel):
+    months: list[date]
+    income_cents: list[int]
+    expense_cents: list[int]
+    net_cents: list[int]
+
+
+class NetWorthReport(BaseModel):
+    months: list[date]
+    assets_cents: list[int]
+    liabilities_cents: list[int]
+    net_worth_cents: list[int]
+    accounts: list[SeriesOut]
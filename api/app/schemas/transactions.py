@@ -25,3 +25,30 @@ class TxIn(BaseModel):
 class TxOut(TxIn):
     id: UUID
     state: str  # 'uncleared'|'cleared'|'reconciled'
+
+
+class TxBulkIn(BaseModel):
+    transactions: List[TxIn] = Field(min_length=1, max_length=1000)
+    # Fill uncategorized rows from payee/memo history (AUTO_CATEGORIZE when unset)
+    auto_categorize: Optional[bool] = None
+    # Rows matching an existing transaction are not inserted; the match is marked cleared and returned instead
+    dedupe: bool = False
+
+
+class CategorySuggestionOut(BaseModel):
+    category_id: Optional[UUID] = None
+
+
+class DuplicateCheckIn(BaseModel):
+    transactions: List[TxIn] = Field(min_length=1, max_length=1000)
+    window_days: Optional[int] = Field(default=None, ge=0, le=31)
+
+
+class DuplicateCandidate(BaseModel):
+    transaction_id: UUID
+    date: date
+    amount_cents: int
+    payee_name: Optional[str] = None
+    days_apart: int
+    payee_similarity: float
+    score: float
@@ -0,0 +1,225 @@
+"""Synthetic budget generator for benchmarks and local load testing.
+
+Builds a realistic, reproducible budget (same --seed, same data): on/off-budget
+accounts, credit cards, category groups, payees, monthly income, spending with
+splits, savings transfers, card payments and monthly assignments.
+
+    python -m app.seeds.synthetic --preset medium --seed 42
+
+Rows are bulk-inserted with Core statements, so rollups and category suggestions
+are rebuilt once at the end instead of per write.
+"""
+import argparse
+import random
+import uuid
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+from itertools import accumulate
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models.budget import Budget
+from app.models.account import Account
+from app.models.category import CategoryGroup, Category, MonthlyCategoryBudget
+from app.models.payee import Payee
+from app.models.transaction import Transaction, SubTransaction
+from app.services import rollups, suggestions
+
+
+@dataclass
+class SeedSize:
+    years: int = 2
+    checking: int = 1
+    savings: int = 1
+    credit_cards: int = 2
+    groups: int = 6
+    categories_per_group: int = 5
+    payees: int = 150
+    tx_per_month: int = 120
+    split_ratio: float = 0.08
+
+
+PRESETS = {
+    "small": SeedSize(years=1, payees=50, tx_per_month=40),
+    "medium": SeedSize(),
+    "large": SeedSize(years=5, checking=2, savings=2, credit_cards=3, groups=10, categories_per_group=8, payees=800, tx_per_month=600),
+    "xlarge": SeedSize(years=10, checking=2, savings=3, credit_cards=4, groups=12, categories_per_group=10, payees=3000, tx_per_month=2500),
+}
+
+GROUP_NAMES = [
+    "Bills", "Everyday", "Transportation", "Home", "Health", "Fun", "Savings Goals",
+    "Kids", "Pets", "Subscriptions", "Giving", "Travel",
+]
+PAYEE_WORDS = [
+    "Corner", "Market", "Fuel", "Cafe", "Pharmacy", "Hardware", "Books", "Diner", "Grocer",
+    "Cinema", "Transit", "Utility", "Bakery", "Garden", "Outfitters", "Electric", "Water", "Pizza",
+]
+CHUNK = 5000
+
+
+def _month_starts(start: date, months: int) -> list[date]:
+    out = [start]
+    for _ in range(months - 1):
+        out.append(rollups.next_month(out[-1]))
+    return out
+
+
+def _insert(db: Session, model, rows: list[dict]) -> None:
+    for i in range(0, len(rows), CHUNK):
+        db.execute(sa.insert(model), rows[i:i + CHUNK])
+
+
+def generate(db: Session, size: SeedSize, seed: int = 42, name: str | None = None) -> uuid.UUID:
+    rng = random.Random(seed)
+    uid = lambda: uuid.UUID(int=rng.getrandbits(128), version=4)  # noqa: E731
+
+    today = date.today().replace(day=1)
+    n_months = size.years * 12
+    start = date(today.year - size.years, today.month, 1)
+    months = _month_starts(start, n_months)
+
+    budget_id = uid()
+    db.execute(sa.insert(Budget), [{"id": budget_id, "name": name or f"Synthetic {seed}", "currency": "USD", "start_month": start}])
+
+    accounts = []
+    for i in range(size.checking):
+        accounts.append({"id": uid(), "budget_id": budget_id, "name": f"Checking {i + 1}", "type": "checking", "on_budget": True})
+    for i in range(size.savings):
+        accounts.append({"id": uid(), "budget_id": budget_id, "name": f"Savings {i + 1}", "type": "savings", "on_budget": True})
+    for i in range(size.credit_cards):
+        accounts.append({"id": uid(), "budget_id": budget_id, "name": f"Card {i + 1}", "type": "credit", "on_budget": True})
+    accounts.append({"id": uid(), "budget_id": budget_id, "name": "Cash", "type": "cash", "on_budget": True})
+    accounts.append({"id": uid(), "budget_id": budget_id, "name": "Brokerage", "type": "asset", "on_budget": False})
+    _insert(db, Account, accounts)
+    checking = [a for a in accounts if a["type"] == "checking"]
+    savings = [a for a in accounts if a["type"] == "savings"]
+    cards = [a for a in accounts if a["type"] == "credit"]
+    spend_accounts = checking + cards + [a for a in accounts if a["type"] == "cash"]
+
+    groups, categories = [], []
+    for gi in range(size.groups):
+        gid = uid()
+        groups.append({"id": gid, "budget_id": budget_id, "name": GROUP_NAMES[gi % len(GROUP_NAMES)] + ("" if gi < len(GROUP_NAMES) else f" {gi}"), "sort": gi})
+        for ci in range(size.categories_per_group):
+            categories.append({
+                "id": uid(), "budget_id": budget_id, "group_id": gid, "name": f"{groups[-1]['name']} {ci + 1}",
+                "sort": ci, "hidden": False, "is_credit_payment": False, "credit_account_id": None,
+            })
+    cc_group = uid()
+    groups.append({"id": cc_group, "budget_id": budget_id, "name": "Credit Card Payments", "sort": size.groups})
+    for ci, card in enumerate(cards):
+        categories.append({
+            "id": uid(), "budget_id": budget_id, "group_id": cc_group, "name": card["name"],
+            "sort": ci, "hidden": False, "is_credit_payment": True, "credit_account_id": card["id"],
+        })
+    _insert(db, CategoryGroup, groups)
+    _insert(db, Category, categories)
+    spend_categories = [c for c in categories if not c["is_credit_payment"]]
+
+    payees = []
+    seen = set()
+    while len(payees) < size.payees:
+        pname = f"{rng.choice(PAYEE_WORDS)} {rng.choice(PAYEE_WORDS)} #{rng.randint(1, 999)}"
+        if pname in seen:
+            continue
+        seen.add(pname)
+        payees.append({"id": uid(), "budget_id": budget_id, "name": pname, "transfer_account_id": None})
+    employer = {"id": uid(), "budget_id": budget_id, "name": "Employer Payroll", "transfer_account_id": None}
+    spend_payees = list(payees)
+    payees.append(employer)
+    _insert(db, Payee, payees)
+    # Zipf-ish payee popularity so search and suggestion workloads look real
+    cum_weights = list(accumulate(1 / (i + 1) for i in range(size.payees)))
+    # Each payee sticks to one category most of the time
+    payee_cat = {p["id"]: rng.choice(spend_categories)["id"] for p in payees}
+
+    txs, subs, links, monthlies = [], [], [], []
+    for m in months:
+        days = (rollups.next_month(m) - m).days
+        # Income: two paychecks into the first checking account
+        for day in (1, 15):
+            txs.append({
+                "id": uid(), "budget_id": budget_id, "account_id": checking[0]["id"], "date": m + timedelta(days=day - 1),
+                "amount_cents": rng.randint(180_000, 260_000), "state": "cleared", "memo": "Paycheck",
+                "payee_id": employer["id"], "income_month": m,
+            })
+        # Spending
+        for _ in range(size.tx_per_month):
+            acc = rng.choice(spend_accounts)
+            payee = rng.choices(spend_payees, cum_weights=cum_weights)[0]
+            amount = -rng.randint(300, 25_000)
+            tid = uid()
+            d = m + timedelta(days=rng.randrange(days))
+            txs.append({
+                "id": tid, "budget_id": budget_id, "account_id": acc["id"], "date": d,
+                "amount_cents": amount, "state": rng.choice(("uncleared", "cleared", "cleared", "reconciled")),
+                "memo": None, "payee_id": payee["id"], "income_month": None,
+            })
+            if rng.random() < size.split_ratio:
+                parts = rng.randint(2, 3)
+                cut = sorted(rng.sample(range(1, -amount), parts - 1))
+                bounds = [0] + cut + [-amount]
+                for k in range(parts):
+                    subs.append({"id": uid(), "budget_id": budget_id, "transaction_id": tid, "date": d,
+                                 "category_id": rng.choice(spend_categories)["id"],
+                                 "amount_cents": -(bounds[k + 1] - bounds[k]), "memo": f"part {k + 1}"})
+            else:
+                cat = payee_cat[payee["id"]] if rng.random() < 0.85 else rng.choice(spend_categories)["id"]
+                subs.append({"id": uid(), "budget_id": budget_id, "transaction_id": tid, "date": d,
+                             "category_id": cat, "amount_cents": amount, "memo": None})
+        # Transfers: savings contribution and card payments
+        pairs = []
+        if savings:
+            pairs.append((checking[0], rng.choice(savings), rng.randint(20_000, 60_000)))
+        for card in cards:
+            pairs.append((checking[0], card, rng.randint(30_000, 150_000)))
+        for src, dst, amt in pairs:
+            a_id, b_id = uid(), uid()
+            d = m + timedelta(days=rng.randrange(days))
+            for tid, acc_id, signed in ((a_id, src["id"], -amt), (b_id, dst["id"], amt)):
+                txs.append({
+                    "id": tid, "budget_id": budget_id, "account_id": acc_id, "date": d, "amount_cents": signed,
+                    "state": "cleared", "memo": "Transfer", "payee_id": None, "income_month": None,
+                })
+            links += [{"tid": a_id, "other": b_id}, {"tid": b_id, "other": a_id}]
+        # Assignments
+        for c in spend_categories:
+            monthlies.append({"id": uid(), "category_id": c["id"], "month": m, "assigned_cents": rng.randint(0, 60_000)})
+
+    _insert(db, Transaction, txs)
+    _insert(db, SubTransaction, subs)
+    for i in range(0, len(links), CHUNK):
+        db.execute(
+            sa.update(Transaction.__table__)
+            .where(Transaction.__table__.c.budget_id == budget_id, Transaction.__table__.c.id == sa.bindparam("tid"))
+            .values(transfer_tx_id=sa.bindparam("other")),
+            links[i:i + CHUNK],
+        )
+    _insert(db, MonthlyCategoryBudget, monthlies)
+    rollups.rebuild_budget(db, budget_id)
+    suggestions.rebuild(db, budget_id)
+    return budget_id
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--preset", choices=sorted(PRESETS), default="medium")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--name")
+    ap.add_argument("--years", type=int)
+    ap.add_argument("--tx-per-month", type=int)
+    ap.add_argument("--payees", type=int)
+    args = ap.parse_args()
+
+    overrides = {f: getattr(args, f) for f in ("years", "tx_per_month", "payees") if getattr(args, f) is not None}
+    size = replace(PRESETS[args.preset], **overrides)
+    with SessionLocal() as db:
+        budget_id = generate(db, size, seed=args.seed, name=args.name)
+        db.commit()
+    print(budget_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Incremental Age of Money.
+
+Inflows into on-budget accounts form a FIFO queue of (date, cents) buckets;
+outflows consume the oldest buckets first, and each matched cent is aged by
+the days between inflow and outflow. Per-day results land in
+`age_of_money_days`; AoM on a date is the spend-weighted mean age over the
+trailing WINDOW_DAYS.
+
+The queue is checkpointed at every month end and at the furthest date
+processed, so `advance()` replays only the days after the latest checkpoint.
+Any flush that touches a transaction dated D drops checkpoints and day rows
+from D on (just before commit, in the same transaction); the next read resumes
+from the nearest surviving checkpoint. Nothing before a period close's cutoff
+is dropped: the archived rows are no longer there to replay.
+"""
+from collections import deque
+from datetime import date, timedelta
+from itertools import chain
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.account import Account
+from app.models.age_of_money import AgeOfMoneyCheckpoint, AgeOfMoneyDay
+from app.models.period import PeriodClose
+from app.models.transaction import Transaction
+from app.services.rollups import month_start, next_month
+
+
+WINDOW_DAYS = 90
+
+_DIRTY_FROM = "aom_dirty_from"
+
+# Net daily flows; transfers between two on-budget accounts move no money
+_FLOWS_SQL = sa.text(
+    """
+    SELECT t.date,
+           COALESCE(SUM(t.amount_cents) FILTER (WHERE t.amount_cents > 0), 0) AS inflow,
+           COALESCE(-SUM(t.amount_cents) FILTER (WHERE t.amount_cents < 0), 0) AS outflow
+    FROM transactions t
+    JOIN accounts a ON a.id = t.account_id
+    LEFT JOIN transactions o ON o.budget_id = t.budget_id AND o.id = t.transfer_tx_id
+    LEFT JOIN accounts oa ON oa.id = o.account_id
+    WHERE t.budget_id = :budget_id AND t.deleted_at IS NULL AND a.on_budget
+      AND t.date > :after AND t.date <= :through
+      AND NOT COALESCE(oa.on_budget, false) AND t.close_id IS NULL
+    GROUP BY t.date
+    ORDER BY t.date
+    """
+)
+
+
+def _lock(db: Session, budget_id: UUID) -> None:
+    # Serializes advancers and invalidators of one budget; released with the transaction
+    db.execute(sa.select(sa.func.pg_advisory_xact_lock(sa.func.hashtextextended(f"aom:{budget_id}", 0))))
+
+
+def invalidate(db: Session, budget_id: UUID, from_date: date) -> None:
+    # Without the lock, an advance that read the ledger before this write could commit
+    # checkpoints after it, and nothing would ever drop them again
+    _lock(db, budget_id)
+    # The checkpoint a period close left at its cutoff stands in for the archived ledger
+    floor = db.execute(
+        sa.select(sa.func.max(PeriodClose.cutoff)).where(PeriodClose.budget_id == budget_id, PeriodClose.reopened_at.is_(None))
+    ).scalar()
+    if floor is not None:
+        from_date = max(from_date, floor)
+    db.execute(
+        sa.delete(AgeOfMoneyCheckpoint).where(
+            AgeOfMoneyCheckpoint.budget_id == budget_id, AgeOfMoneyCheckpoint.through_date >= from_date
+        )
+    )
+    db.execute(sa.delete(AgeOfMoneyDay).where(AgeOfMoneyDay.budget_id == budget_id, AgeOfMoneyDay.date >= from_date))
+
+
+def _save_checkpoint(db: Session, budget_id: UUID, through: date, queue: deque) -> None:
+    stmt = insert(AgeOfMoneyCheckpoint).values(budget_id=budget_id, through_date=through, queue=list(queue))
+    db.execute(stmt.on_conflict_do_update(index_elements=["budget_id", "through_date"], set_={"queue": stmt.excluded.queue}))
+
+
+def advance(db: Session, budget_id: UUID, through: date) -> None:
+    """Apply every day up to `through` that no checkpoint covers yet."""
+    _lock(db, budget_id)
+    head = db.execute(
+        sa.select(AgeOfMoneyCheckpoint.through_date, AgeOfMoneyCheckpoint.queue)
+        .where(AgeOfMoneyCheckpoint.budget_id == budget_id)
+        .order_by(AgeOfMoneyCheckpoint.through_date.desc())
+        .limit(1)
+    ).first()
+    if head is not None and head.through_date >= through:
+        return
+    after = head.through_date if head is not None else date.min
+    queue = deque(head.queue) if head is not None else deque()
+    last_saved = after
+    days = []
+
+    rows = db.execute(
+        _FLOWS_SQL,
+        {"budget_id": budget_id, "after": after, "through": through},
+        execution_options={"stream_results": True, "yield_per": 1000},
+    )
+    for d, inflow, outflow in rows:
+        month_end = month_start(d) - timedelta(days=1)
+        if month_end > last_saved:
+            _save_checkpoint(db, budget_id, month_end, queue)
+            last_saved = month_end
+        day = d.toordinal()
+        if inflow:
+            if queue and queue[-1][0] == day:
+                queue[-1][1] += int(inflow)
+            else:
+                queue.append([day, int(inflow)])
+        need = int(outflow)
+        matched = weighted = 0
+        while need and queue:
+            bucket = queue[0]
+            take = min(need, bucket[1])
+            matched += take
+            weighted += take * (day - bucket[0])
+            need -= take
+            bucket[1] -= take
+            if not bucket[1]:
+                queue.popleft()
+        # Spending no earlier inflow can cover is left out of the average
+        if matched:
+            days.append({"budget_id": budget_id, "date": d, "spent_cents": matched, "age_weighted": weighted})
+
+    if days:
+        stmt = insert(AgeOfMoneyDay).values(days)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["budget_id", "date"],
+                set_={"spent_cents": stmt.excluded.spent_cents, "age_weighted": stmt.excluded.age_weighted},
+            )
+        )
+    _save_checkpoint(db, budget_id, through, queue)
+    # The previous head is redundant unless it marks a month end
+    if head is not None and next_month(month_start(head.through_date)) - timedelta(days=1) != head.through_date:
+        db.execute(
+            sa.delete(AgeOfMoneyCheckpoint).where(
+                AgeOfMoneyCheckpoint.budget_id == budget_id, AgeOfMoneyCheckpoint.through_date == head.through_date
+            )
+        )
+
+
+def value(db: Session, budget_id: UUID, as_of: date) -> int | None:
+    row = db.execute(
+        sa.select(sa.func.sum(AgeOfMoneyDay.age_weighted), sa.func.sum(AgeOfMoneyDay.spent_cents)).where(
+            AgeOfMoneyDay.budget_id == budget_id,
+            AgeOfMoneyDay.date > as_of - timedelta(days=WINDOW_DAYS),
+            AgeOfMoneyDay.date <= as_of,
+        )
+    ).one()
+    weighted, spent = row
+    if not spent:
+        return None
+    return round(weighted / spent)
+
+
+def _as_of(m: date) -> date:
+    # End of month `m`, or today for the current month
+    return min(next_month(month_start(m)) - timedelta(days=1), date.today())
+
+
+def for_month(db: Session, budget_id: UUID, m: date) -> int | None:
+    """AoM for month `m`, advancing checkpoints as needed; the caller commits."""
+    as_of = _as_of(m)
+    advance(db, budget_id, as_of)
+    return value(db, budget_id, as_of)
+
+
+def peek(db: Session, budget_id: UUID, m: date) -> tuple[bool, int | None]:
+    """(covered, AoM) without writing, for read-only sessions; not covered means for_month() must run."""
+    as_of = _as_of(m)
+    covered = db.execute(
+        sa.select(AgeOfMoneyCheckpoint.through_date)
+        .where(AgeOfMoneyCheckpoint.budget_id == budget_id, AgeOfMoneyCheckpoint.through_date >= as_of)
+        .limit(1)
+    ).first()
+    if covered is None:
+        return False, None
+    return True, value(db, budget_id, as_of)
+
+
+def _as_date(d) -> date:
+    return date.fromisoformat(d[:10]) if isinstance(d, str) else d
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    dirty = session.info.setdefault(_DIRTY_FROM, {})
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Transaction):
+            hist = sa.inspect(obj).attrs["date"].history
+            dates = [_as_date(v) for v in chain(hist.added or (), hist.unchanged or (), hist.deleted or ()) if v is not None]
+        elif isinstance(obj, Account) and (obj in session.deleted or sa.inspect(obj).attrs["on_budget"].history.has_changes()):
+            dates = [date.min]
+        else:
+            continue
+        if dates:
+            earliest = min(dates)
+            dirty[obj.budget_id] = min(earliest, dirty.get(obj.budget_id, earliest))
+
+
+def _before_commit(session: Session) -> None:
+    session.flush()
+    for budget_id, from_date in session.info.pop(_DIRTY_FROM, {}).items():
+        invalidate(session, budget_id, from_date)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_FROM, None)
+
+
+def register(target=Session) -> None:
+    event.listen(target, "after_flush", _after_flush)
+    event.listen(target, "before_commit", _before_commit)
+    event.listen(target, "after_rollback", _after_rollback)
@@ -0,0 +1,103 @@
+"""Credit card payment categories, computed set-wise in SQL.
+
+Rules (project plan, "Budget Math"):
+
+- Categorized spending on an on-budget credit card still counts as activity of
+  the purchase category. The part of it the category could cover - what was
+  assigned minus what it already spent from cash accounts that month - moves
+  into the card's payment category. Overspending stays debt and moves nothing.
+  Refunds on the card move money back out.
+- Payments (transfers into the card) consume the payment category.
+
+So for a payment category: activity = payments - funded spending (activity is
+positive spend, as everywhere in the month view). Everything is month-local,
+like the rest of the month view.
+
+CTES is a fragment of named CTEs, bound to :budget_id, :credit_from and
+:credit_to (exclusive), that ends in `credit_activity(category_id, month,
+activity)`; the single-statement month view splices it in, and
+`payment_activity()` runs it alone for a whole month range.
+"""
+from datetime import date
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.services.rollups import month_start, next_month
+
+
+CTES = """
+    credit_cards AS (
+        SELECT c.id AS category_id, a.id AS account_id
+        FROM categories c
+        JOIN accounts a ON a.id = c.credit_account_id
+        WHERE c.budget_id = :budget_id AND c.is_credit_payment
+          AND a.budget_id = :budget_id AND a.type = 'credit' AND a.on_budget
+    ),
+    credit_lines AS (
+        -- net categorized spend per (category, month, account); card rows flagged
+        SELECT s.category_id,
+               date_trunc('month', s.date)::date AS month,
+               t.account_id,
+               k.account_id IS NOT NULL AS on_card,
+               -SUM(s.amount_cents) AS spent
+        FROM subtransactions s
+        JOIN transactions t ON t.budget_id = s.budget_id AND t.id = s.transaction_id
+        JOIN accounts a ON a.id = t.account_id
+        LEFT JOIN credit_cards k ON k.account_id = t.account_id
+        WHERE s.budget_id = :budget_id AND t.budget_id = :budget_id
+          AND s.date >= :credit_from AND s.date < :credit_to
+          AND t.deleted_at IS NULL AND a.on_budget
+          AND s.category_id IS NOT NULL
+          AND s.category_id NOT IN (SELECT category_id FROM credit_cards)
+        GROUP BY s.category_id, date_trunc('month', s.date), t.account_id, k.account_id
+    ),
+    credit_funding AS (
+        SELECT l.account_id, l.month, l.on_card, l.spent,
+               COALESCE(mb.assigned_cents, 0)
+                 - COALESCE(SUM(l.spent) FILTER (WHERE NOT l.on_card)
+                            OVER (PARTITION BY l.category_id, l.month), 0)
+                 - COALESCE(SUM(l.spent) FILTER (WHERE l.on_card)
+                            OVER (PARTITION BY l.category_id, l.month ORDER BY l.on_card, l.account_id
+                                  ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0) AS room
+        FROM credit_lines l
+        LEFT JOIN monthly_category_budget mb ON mb.category_id = l.category_id AND mb.month = l.month
+    ),
+    credit_moved AS (
+        SELECT account_id, month,
+               SUM(CASE WHEN spent < 0 THEN spent ELSE LEAST(spent, GREATEST(room, 0)) END) AS funded
+        FROM credit_funding
+        WHERE on_card
+        GROUP BY account_id, month
+    ),
+    credit_payments AS (
+        SELECT t.account_id, date_trunc('month', t.date)::date AS month, SUM(t.amount_cents) AS paid
+        FROM transactions t
+        WHERE t.budget_id = :budget_id AND t.deleted_at IS NULL
+          AND t.transfer_tx_id IS NOT NULL AND t.amount_cents > 0
+          AND t.date >= :credit_from AND t.date < :credit_to
+          AND t.account_id IN (SELECT account_id FROM credit_cards)
+        GROUP BY t.account_id, date_trunc('month', t.date)
+    ),
+    credit_activity AS (
+        SELECT k.category_id,
+               COALESCE(m.month, p.month) AS month,
+               COALESCE(p.paid, 0) - COALESCE(m.funded, 0) AS activity
+        FROM credit_moved m
+        FULL JOIN credit_payments p ON p.account_id = m.account_id AND p.month = m.month
+        JOIN credit_cards k ON k.account_id = COALESCE(m.account_id, p.account_id)
+    )
+"""
+
+_SQL = sa.text("WITH " + CTES + " SELECT category_id, month, activity FROM credit_activity")
+
+
+def params(budget_id: UUID, from_month: date, to_month: date) -> dict:
+    return {"budget_id": budget_id, "credit_from": month_start(from_month), "credit_to": next_month(month_start(to_month))}
+
+
+def payment_activity(db: Session, budget_id: UUID, from_month: date, to_month: date) -> dict[tuple[UUID, date], int]:
+    """Activity of every linked payment category for each month in [from_month, to_month]."""
+    rows = db.execute(_SQL, params(budget_id, from_month, to_month)).all()
+    return {(r.category_id, r.month): int(r.activity) for r in rows}
@@ -0,0 +1,129 @@
+"""Fuzzy duplicate detection for incoming transactions.
+
+A manual entry and the bank import of the same purchase share account and
+amount and land within a few days of each other; payees are often spelled
+differently ("AMZN Mktp US*2K4" vs "Amazon"). Incoming rows are grouped by
+(account, amount) and every group fetches its existing rows in one statement
+that walks ix_transactions_live_account_amount_date over the group's date span.
+Each group is then swept in date order with a sliding window, so only rows
+within +-window days are ever compared.
+"""
+import re
+from collections import defaultdict, deque
+from datetime import date, timedelta
+from difflib import SequenceMatcher
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.config import Settings
+
+
+settings = Settings()
+
+# Share of the score from payee similarity; the rest from date proximity
+PAYEE_WEIGHT = 0.6
+
+_WORD = re.compile(r"[a-z]+")
+
+_CANDIDATES_SQL = sa.text(
+    """
+    SELECT t.id, t.account_id, t.amount_cents, t.date, p.name AS payee_name
+    FROM unnest(CAST(:accounts AS uuid[]), CAST(:amounts AS integer[]), CAST(:lo AS date[]), CAST(:hi AS date[]))
+         AS k(account_id, amount_cents, lo, hi)
+    JOIN transactions t
+      ON t.budget_id = :budget_id AND t.deleted_at IS NULL
+     AND t.account_id = k.account_id AND t.amount_cents = k.amount_cents
+     AND t.date BETWEEN k.lo AND k.hi
+    LEFT JOIN payees p ON p.id = t.payee_id
+    """
+)
+
+
+def _normalize(name: str | None) -> str:
+    # Letters only: drops store numbers, card suffixes and punctuation
+    return " ".join(_WORD.findall((name or "").lower()))
+
+
+def payee_similarity(a: str | None, b: str | None) -> float:
+    a, b = _normalize(a), _normalize(b)
+    if not a or not b:
+        return 0.0
+    if a == b or a.startswith(b) or b.startswith(a):
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def find(
+    db: Session, budget_id: UUID, rows: list[dict], window_days: int | None = None, limit: int = 5
+) -> list[list[dict]]:
+    """Ranked candidates for each of `rows` (dicts with account_id, date, amount_cents, payee_name)."""
+    window = settings.duplicate_window_days if window_days is None else window_days
+    span = timedelta(days=window)
+    groups: dict[tuple[UUID, int], list[int]] = defaultdict(list)
+    for i, r in enumerate(rows):
+        groups[(r["account_id"], r["amount_cents"])].append(i)
+    results: list[list[dict]] = [[] for _ in rows]
+    if not groups:
+        return results
+
+    keys = list(groups)
+    existing: dict[tuple[UUID, int], list] = defaultdict(list)
+    for e in db.execute(
+        _CANDIDATES_SQL,
+        {
+            "budget_id": budget_id,
+            "accounts": [k[0] for k in keys],
+            "amounts": [k[1] for k in keys],
+            "lo": [min(rows[i]["date"] for i in groups[k]) - span for k in keys],
+            "hi": [max(rows[i]["date"] for i in groups[k]) + span for k in keys],
+        },
+    ):
+        existing[(e.account_id, e.amount_cents)].append(e)
+
+    for key, idxs in groups.items():
+        found = sorted(existing.get(key, ()), key=lambda e: e.date)
+        window_rows: deque = deque()
+        pos = 0
+        for i in sorted(idxs, key=lambda i: rows[i]["date"]):
+            d: date = rows[i]["date"]
+            while pos < len(found) and found[pos].date <= d + span:
+                window_rows.append(found[pos])
+                pos += 1
+            while window_rows and window_rows[0].date < d - span:
+                window_rows.popleft()
+            scored = []
+            for e in window_rows:
+                days = abs((e.date - d).days)
+                similarity = payee_similarity(rows[i].get("payee_name"), e.payee_name)
+                scored.append(
+                    {
+                        "transaction_id": e.id,
+                        "date": e.date,
+                        "amount_cents": e.amount_cents,
+                        "payee_name": e.payee_name,
+                        "days_apart": days,
+                        "payee_similarity": round(similarity, 3),
+                        "score": round(PAYEE_WEIGHT * similarity + (1 - PAYEE_WEIGHT) * (1 - days / (window + 1)), 3),
+                    }
+                )
+            scored.sort(key=lambda c: (-c["score"], c["days_apart"]))
+            results[i] = scored[:limit]
+    return results
+
+
+def best_matches(candidates: list[list[dict]], min_score: float | None = None) -> dict[int, UUID]:
+    """Pair incoming rows with existing ones, best score first, each existing row used once."""
+    threshold = settings.duplicate_min_score if min_score is None else min_score
+    pairs = sorted(
+        ((c["score"], i, c["transaction_id"]) for i, cs in enumerate(candidates) for c in cs if c["score"] >= threshold),
+        key=lambda p: -p[0],
+    )
+    matched: dict[int, UUID] = {}
+    taken: set[UUID] = set()
+    for _score, i, tx_id in pairs:
+        if i not in matched and tx_id not in taken:
+            matched[i] = tx_id
+            taken.add(tx_id)
+    return matched
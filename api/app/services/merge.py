@@ -0,0 +1,202 @@
+"""Merge and delete-with-reassign for categories, category groups and payees.
+
+Each operation is a handful of set-based statements - re-pointing ledger rows
+with one UPDATE, folding assignments/rollups/suggestion votes with
+INSERT .. SELECT .. ON CONFLICT - so its cost does not grow with the history
+behind the row being removed. Nothing is loaded into the session. The caller
+commits; Core statements bypass the ORM hooks, so changes are recorded here.
+"""
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app import changes
+from app.models.audit import AuditLog
+from app.models.category import Category, CategoryGroup
+from app.models.payee import Payee
+from app.models.transaction import Transaction, SubTransaction, TransactionArchive, SubTransactionArchive
+from app.services import periods, suggestions
+
+
+class MergeError(ValueError):
+    pass
+
+
+_MERGE_ASSIGNMENTS = sa.text(
+    """
+    INSERT INTO monthly_category_budget (id, category_id, month, assigned_cents, goal_type, goal_target_cents,
+                                         goal_target_month, carryover_overspending, updated_at)
+    SELECT gen_random_uuid(), :target, month, assigned_cents, goal_type, goal_target_cents,
+           goal_target_month, carryover_overspending, now()
+    FROM monthly_category_budget
+    WHERE category_id = :source
+    ON CONFLICT (category_id, month) DO UPDATE SET
+        assigned_cents = monthly_category_budget.assigned_cents + EXCLUDED.assigned_cents,
+        updated_at = now()
+    """
+)
+
+_MERGE_ROLLUPS = sa.text(
+    """
+    INSERT INTO category_month_rollups (category_id, month, budget_id, activity_cents)
+    SELECT :target, month, budget_id, activity_cents
+    FROM category_month_rollups
+    WHERE category_id = :source
+    ON CONFLICT (category_id, month) DO UPDATE SET
+        activity_cents = category_month_rollups.activity_cents + EXCLUDED.activity_cents
+    """
+)
+
+_MERGE_CARRY_INS = sa.text(
+    """
+    INSERT INTO period_close_carry_ins (close_id, category_id, budget_id, assigned_cents, activity_cents)
+    SELECT close_id, :target, budget_id, assigned_cents, activity_cents
+    FROM period_close_carry_ins
+    WHERE category_id = :source
+    ON CONFLICT (close_id, category_id) DO UPDATE SET
+        assigned_cents = period_close_carry_ins.assigned_cents + EXCLUDED.assigned_cents,
+        activity_cents = period_close_carry_ins.activity_cents + EXCLUDED.activity_cents
+    """
+)
+
+
+def _lock(db: Session, model, ids: list[UUID]) -> None:
+    # Writers referencing these rows take KEY SHARE locks; they wait for us (and then see the move)
+    db.execute(sa.select(model.id).where(model.id.in_(ids)).with_for_update())
+
+
+def _audit(db: Session, budget_id: UUID, action: str, entity_type: str, entity_id: UUID, diff: dict) -> None:
+    db.add(AuditLog(budget_id=budget_id, action=action, entity_type=entity_type, entity_id=entity_id, diff_json=diff))
+
+
+def _move_categories(db: Session, budget_id: UUID, sources: list[UUID], target: UUID | None) -> int:
+    """Re-point every subtransaction of `sources` to `target` (None: uncategorized)."""
+    moved = db.execute(
+        sa.update(SubTransaction)
+        .where(SubTransaction.budget_id == budget_id, SubTransaction.category_id.in_(sources))
+        .values(category_id=target)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.execute(
+        sa.update(SubTransactionArchive)
+        .where(SubTransactionArchive.budget_id == budget_id, SubTransactionArchive.category_id.in_(sources))
+        .values(category_id=target)
+        .execution_options(synchronize_session=False)
+    )
+    return moved
+
+
+def merge_categories(db: Session, budget_id: UUID, source: UUID, target: UUID) -> int:
+    """Move `source`'s history and assignments into `target`, then delete `source`."""
+    if source == target:
+        raise MergeError("Cannot merge a category into itself")
+    _lock(db, Category, [source, target])
+    linked = sa.select(Category.id).where(Category.id.in_([source, target]), Category.credit_account_id.is_not(None))
+    if db.execute(linked).first() is not None:
+        raise MergeError("Credit card payment categories cannot be merged")
+    moved = _move_categories(db, budget_id, [source], target)
+    params = {"source": source, "target": target}
+    # Folding assignments touches closed months too; the totals per month stay put
+    periods.allow_closed_writes(db)
+    db.execute(_MERGE_ASSIGNMENTS, params)
+    db.execute(_MERGE_ROLLUPS, params)
+    db.execute(_MERGE_CARRY_INS, params)
+    suggestions.merge_category(db, budget_id, source, target)
+    db.execute(sa.delete(Category).where(Category.id == source).execution_options(synchronize_session=False))
+    _audit(db, budget_id, "merge_category", "category", target, {"source": str(source), "subtransactions": moved})
+    changes.record(db, budget_id, "subtransactions", None, "update")
+    changes.record(db, budget_id, "monthly_category_budget", None, "update")
+    changes.record(db, budget_id, "categories", source, "delete")
+    return moved
+
+
+def delete_category(db: Session, budget_id: UUID, category_id: UUID, reassign_to: UUID | None = None) -> int:
+    """Delete a category; its transactions move to `reassign_to` or become uncategorized."""
+    if reassign_to is not None:
+        return merge_categories(db, budget_id, category_id, reassign_to)
+    _lock(db, Category, [category_id])
+    moved = _move_categories(db, budget_id, [category_id], None)
+    # Assignments, rollups and suggestion votes go with the row (ON DELETE CASCADE)
+    db.execute(sa.delete(Category).where(Category.id == category_id).execution_options(synchronize_session=False))
+    _audit(db, budget_id, "delete_category", "category", category_id, {"subtransactions": moved})
+    changes.record(db, budget_id, "subtransactions", None, "update")
+    changes.record(db, budget_id, "categories", category_id, "delete")
+    return moved
+
+
+def merge_groups(db: Session, budget_id: UUID, source: UUID, target: UUID) -> int:
+    """Move every category of `source` under `target`, then delete `source`."""
+    if source == target:
+        raise MergeError("Cannot merge a group into itself")
+    _lock(db, CategoryGroup, [source, target])
+    moved = db.execute(
+        sa.update(Category)
+        .where(Category.budget_id == budget_id, Category.group_id == source)
+        .values(group_id=target)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.execute(sa.delete(CategoryGroup).where(CategoryGroup.id == source).execution_options(synchronize_session=False))
+    _audit(db, budget_id, "merge_group", "category_group", target, {"source": str(source), "categories": moved})
+    changes.record(db, budget_id, "categories", None, "update")
+    changes.record(db, budget_id, "category_groups", source, "delete")
+    return moved
+
+
+def delete_group(db: Session, budget_id: UUID, group_id: UUID, reassign_to: UUID | None = None) -> int:
+    """Delete a group; its categories move to `reassign_to`, or are deleted with their transactions uncategorized."""
+    if reassign_to is not None:
+        return merge_groups(db, budget_id, group_id, reassign_to)
+    _lock(db, CategoryGroup, [group_id])
+    in_group = sa.select(Category.id).where(Category.group_id == group_id).scalar_subquery()
+    moved = db.execute(
+        sa.update(SubTransaction)
+        .where(SubTransaction.budget_id == budget_id, SubTransaction.category_id.in_(in_group))
+        .values(category_id=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.execute(
+        sa.update(SubTransactionArchive)
+        .where(SubTransactionArchive.budget_id == budget_id, SubTransactionArchive.category_id.in_(in_group))
+        .values(category_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    # Categories (and everything hanging off them) cascade in the database, not through the ORM
+    db.execute(sa.delete(CategoryGroup).where(CategoryGroup.id == group_id).execution_options(synchronize_session=False))
+    _audit(db, budget_id, "delete_group", "category_group", group_id, {"subtransactions": moved})
+    changes.record(db, budget_id, "subtransactions", None, "update")
+    changes.record(db, budget_id, "categories", None, "delete")
+    changes.record(db, budget_id, "category_groups", group_id, "delete")
+    return moved
+
+
+def merge_payees(db: Session, budget_id: UUID, source: UUID, target: UUID | None) -> int:
+    """Re-point `source`'s transactions to `target` (None: no payee), then delete `source`."""
+    if source == target:
+        raise MergeError("Cannot merge a payee into itself")
+    _lock(db, Payee, [source] + ([target] if target is not None else []))
+    moved = db.execute(
+        sa.update(Transaction)
+        .where(Transaction.budget_id == budget_id, Transaction.payee_id == source)
+        .values(payee_id=target)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.execute(
+        sa.update(TransactionArchive)
+        .where(TransactionArchive.budget_id == budget_id, TransactionArchive.payee_id == source)
+        .values(payee_id=target)
+        .execution_options(synchronize_session=False)
+    )
+    suggestions.merge_key(db, budget_id, f"p:{source}", f"p:{target}" if target is not None else None)
+    db.execute(sa.delete(Payee).where(Payee.id == source).execution_options(synchronize_session=False))
+    _audit(
+        db,
+        budget_id,
+        "merge_payee" if target is not None else "delete_payee",
+        "payee",
+        target or source,
+        {"source": str(source), "transactions": moved},
+    )
+    changes.record(db, budget_id, "transactions", None, "update")
+    changes.record(db, budget_id, "payees", source, "delete")
+    return moved
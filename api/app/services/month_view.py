@@ -0,0 +1,220 @@
+"""Budget month view (groups, categories, per-category month figures, ready to assign).
+
+Two interchangeable implementations, picked by MONTH_ROLLUP_STRATEGY:
+
+- "queries": one ORM query per piece (groups, categories, monthlies,
+  activity, credit card payments, income) - six round trips.
+- "single": one statement; CTEs aggregate each piece and json_agg folds them
+  into a single row - one round trip.
+
+Both return the same body and ETag (`python -m bench.month_rollup` checks
+parity and times them against each other).
+"""
+import hashlib
+from datetime import date
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.config import Settings
+from app.models.account import Account
+from app.models.category import CategoryGroup, Category, MonthlyCategoryBudget
+from app.models.transaction import Transaction, SubTransaction
+from app.services import credit
+from app.services.rollups import next_month
+
+
+settings = Settings()
+
+STRATEGIES = ("queries", "single")
+
+
+def _assemble(budget_id: UUID, m: date, groups: list[dict], cats: list[dict], figures: dict, income: int) -> tuple[dict, str]:
+    """`figures` maps category id -> (assigned, activity)."""
+    months = []
+    for c in cats:
+        assigned, activity = figures.get(c["id"], (0, 0))
+        months.append(
+            {
+                "category_id": c["id"],
+                "month": m,
+                "assigned_cents": assigned,
+                "activity_cents": activity,
+                "available_cents": assigned - activity,
+            }
+        )
+    total_assigned = sum(x["assigned_cents"] for x in months)
+
+    # ETag: hash of assigned values + counts + income
+    etag_raw = f"{budget_id}|{m.isoformat()}|{len(groups)}|{len(cats)}|" + \
+        ",".join(f"{x['category_id']}:{x['assigned_cents']}" for x in months) + f"|income:{income}"
+    etag = 'W/"' + hashlib.sha256(etag_raw.encode()).hexdigest() + '"'
+
+    body = {
+        "month": m,
+        "groups": groups,
+        "categories": cats,
+        "months": months,
+        "available_to_budget_cents": int(income) - int(total_assigned),
+    }
+    return body, etag
+
+
+def build_queries(db: Session, budget_id: UUID, m: date) -> tuple[dict, str]:
+    groups = db.query(CategoryGroup).filter_by(budget_id=budget_id).order_by(CategoryGroup.sort, CategoryGroup.name).all()
+    cats = db.query(Category).filter_by(budget_id=budget_id).order_by(Category.sort, Category.name).all()
+
+    # Load monthly rows for given month
+    cat_ids = [c.id for c in cats]
+    monthlies = (
+        db.query(MonthlyCategoryBudget.category_id, MonthlyCategoryBudget.assigned_cents)
+        .filter(MonthlyCategoryBudget.category_id.in_(cat_ids), MonthlyCategoryBudget.month == m)
+        .all()
+        if cat_ids
+        else []
+    )
+    assigned_by_cat = {category_id: assigned for category_id, assigned in monthlies}
+
+    # Activity for [m, next month) from subtransactions (outflows as positive)
+    activity_by_cat: dict[UUID, int] = {}
+    if cat_ids:
+        q = (
+            db.query(SubTransaction.category_id, sa.func.sum(SubTransaction.amount_cents))
+            .join(
+                Transaction,
+                sa.and_(Transaction.budget_id == SubTransaction.budget_id, Transaction.id == SubTransaction.transaction_id),
+            )
+            .filter(
+                SubTransaction.budget_id == budget_id,
+                SubTransaction.date >= m,
+                SubTransaction.date < next_month(m),
+                Transaction.budget_id == budget_id,
+                Transaction.deleted_at.is_(None),
+                SubTransaction.category_id.in_(cat_ids),
+            )
+            .group_by(SubTransaction.category_id)
+        )
+        for cid, total in q:
+            # outflows are negative amounts; activity is positive spend
+            activity_by_cat[cid] = int(-total) if total is not None and total < 0 else 0
+
+    # Incomes targeted to this month on on-budget accounts
+    income_sum = (
+        db.query(sa.func.coalesce(sa.func.sum(Transaction.amount_cents), 0))
+        .join(Account, Account.id == Transaction.account_id)
+        .filter(
+            Transaction.budget_id == budget_id,
+            Transaction.deleted_at.is_(None),
+            Transaction.income_month == m,
+            Account.on_budget.is_(True),
+        )
+        .scalar()
+        or 0
+    )
+
+    # Linked credit card payment categories: one set-based query for all cards
+    for (cid, _month), activity in credit.payment_activity(db, budget_id, m, m).items():
+        activity_by_cat[cid] = activity
+
+    figures = {cid: (assigned_by_cat.get(cid, 0), activity_by_cat.get(cid, 0)) for cid in cat_ids}
+    return _assemble(
+        budget_id,
+        m,
+        [{"id": g.id, "name": g.name, "sort": g.sort} for g in groups],
+        [
+            {
+                "id": c.id,
+                "group_id": c.group_id,
+                "name": c.name,
+                "sort": c.sort,
+                "hidden": c.hidden,
+                "is_credit_payment": c.is_credit_payment,
+            }
+            for c in cats
+        ],
+        figures,
+        int(income_sum),
+    )
+
+
+_SINGLE_SQL = sa.text(
+    """
+    WITH c AS (
+        SELECT id, group_id, name, sort, hidden, is_credit_payment
+        FROM categories
+        WHERE budget_id = :budget_id
+    ),
+    mb AS (
+        SELECT category_id, assigned_cents
+        FROM monthly_category_budget
+        WHERE month = :month AND category_id IN (SELECT id FROM c)
+    ),
+    act AS (
+        SELECT s.category_id, SUM(s.amount_cents) AS total
+        FROM subtransactions s
+        JOIN transactions t ON t.budget_id = s.budget_id AND t.id = s.transaction_id
+        WHERE s.budget_id = :budget_id AND s.date >= :month AND s.date < :next_month
+          AND t.budget_id = :budget_id AND t.deleted_at IS NULL
+          AND s.category_id IN (SELECT id FROM c)
+        GROUP BY s.category_id
+    ),
+    """
+    + credit.CTES
+    + """
+    SELECT
+        (SELECT COALESCE(json_agg(json_build_object('id', g.id, 'name', g.name, 'sort', g.sort)
+                                  ORDER BY g.sort, g.name), '[]')
+         FROM category_groups g WHERE g.budget_id = :budget_id) AS groups,
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'id', c.id, 'group_id', c.group_id, 'name', c.name, 'sort', c.sort,
+                    'hidden', c.hidden, 'is_credit_payment', c.is_credit_payment,
+                    'assigned', COALESCE(mb.assigned_cents, 0),
+                    'activity', CASE WHEN ca.category_id IS NOT NULL THEN ca.activity
+                                     WHEN act.total < 0 THEN -act.total ELSE 0 END)
+                  ORDER BY c.sort, c.name), '[]')
+         FROM c
+         LEFT JOIN mb ON mb.category_id = c.id
+         LEFT JOIN act ON act.category_id = c.id
+         LEFT JOIN credit_activity ca ON ca.category_id = c.id AND ca.month = :month) AS categories,
+        (SELECT COALESCE(SUM(t.amount_cents), 0)
+         FROM transactions t JOIN accounts a ON a.id = t.account_id
+         WHERE t.budget_id = :budget_id AND t.deleted_at IS NULL
+           AND t.income_month = :month AND a.on_budget) AS income
+    """
+)
+
+
+def build_single(db: Session, budget_id: UUID, m: date) -> tuple[dict, str]:
+    row = db.execute(
+        _SINGLE_SQL, {"budget_id": budget_id, "month": m, "next_month": next_month(m), **credit.params(budget_id, m, m)}
+    ).one()
+    groups = [{"id": UUID(g["id"]), "name": g["name"], "sort": g["sort"]} for g in row.groups]
+    cats = []
+    figures = {}
+    for c in row.categories:
+        cid = UUID(c["id"])
+        cats.append(
+            {
+                "id": cid,
+                "group_id": UUID(c["group_id"]),
+                "name": c["name"],
+                "sort": c["sort"],
+                "hidden": c["hidden"],
+                "is_credit_payment": c["is_credit_payment"],
+            }
+        )
+        figures[cid] = (int(c["assigned"]), int(c["activity"]))
+    return _assemble(budget_id, m, groups, cats, figures, int(row.income))
+
+
+_BUILDERS = {"queries": build_queries, "single": build_single}
+
+
+def build(db: Session, budget_id: UUID, m: date, strategy: str | None = None) -> tuple[dict, str]:
+    """Month view for `m` (shaped like CategoriesMonthResponse) and its ETag.
+
+    Runs on a sync session (or via AsyncSession.run_sync); callers have already
+    resolved the budget through get_budget_context.
+    """
+    return _BUILDERS[strategy or settings.month_rollup_strategy](db, budget_id, m)
@@ -0,0 +1,310 @@
+"""Period close: compact the ledger before a cutoff, reversibly.
+
+`close_period` moves every transaction dated before `cutoff` (and its
+subtransactions) into the archive tables, tagged with the close, and writes
+one reconciled opening-balance transaction per account dated the day before
+the cutoff. What each category was assigned and spent in the closed span is
+kept as carry-in rows. Rollups before the cutoff are rebuilt from what stays
+live, and Age of Money keeps the checkpoint at the cutoff as its new floor.
+
+Rows that straddle the cutoff stay live: income booked for a month on or after
+it, and transfers whose other half does. Earlier opening balances are never
+closed again, so closes stack. `reopen_period` undoes the latest close.
+
+Both are a handful of set-based statements and check that no account balance
+moved before returning; the caller commits (they run as jobs, see
+app.jobs.tasks). Core statements bypass the ORM hooks, so changes are recorded
+here.
+
+The database refuses ledger writes dated before the active cutoff (triggers
+from migration 0016, SQLSTATE CLOSED_SQLSTATE); the close itself, reopening and
+category merges lift that for their own transaction with
+`allow_closed_writes`.
+"""
+from datetime import date, datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+import sqlalchemy as sa
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app import changes
+from app.models.audit import AuditLog
+from app.models.budget import Budget
+from app.models.period import PeriodClose, PeriodCloseCarryIn
+from app.models.rollup import AccountMonthRollup, CategoryMonthRollup
+from app.models.transaction import Transaction, SubTransaction, TransactionArchive, SubTransactionArchive
+from app.services import age_of_money, rollups
+
+
+class CloseError(ValueError):
+    pass
+
+
+CLOSED_SQLSTATE = "MB409"
+
+
+def allow_closed_writes(db: Session) -> None:
+    """Let this transaction write before the active cutoff (reset at commit/rollback)."""
+    db.execute(sa.select(sa.func.set_config("markbudget.closed_writes", "on", True)))
+
+
+def is_closed_error(exc: DBAPIError) -> bool:
+    return getattr(exc.orig, "sqlstate", None) == CLOSED_SQLSTATE
+
+
+_TX_COLS = [c.name for c in Transaction.__table__.columns]
+_SUB_COLS = [c.name for c in SubTransaction.__table__.columns]
+
+# Ids of the rows being closed; dropped with the transaction
+_STAGE_TABLE_SQL = sa.text("CREATE TEMP TABLE period_closing (id uuid PRIMARY KEY) ON COMMIT DROP")
+
+_STAGE_SQL = sa.text(
+    """
+    INSERT INTO period_closing (id)
+    SELECT t.id
+    FROM transactions t
+    WHERE t.budget_id = :budget_id AND t.close_id IS NULL
+      AND t.date < :cutoff AND COALESCE(t.income_month, t.date) < :cutoff
+      AND (t.transfer_tx_id IS NULL OR EXISTS (
+          SELECT 1 FROM transactions o
+          WHERE o.budget_id = t.budget_id AND o.id = t.transfer_tx_id AND o.close_id IS NULL
+            AND o.date < :cutoff AND COALESCE(o.income_month, o.date) < :cutoff
+      )
+    """
+)
+
+_closing = sa.table("period_closing", sa.column("id"))
+
+_OPENING_SQL = sa.text(
+    """
+    INSERT INTO transactions (id, budget_id, account_id, date, amount_cents, state, memo, close_id)
+    SELECT gen_random_uuid(), :budget_id, t.account_id, :opening_date, SUM(t.amount_cents), 'reconciled', :memo, :close_id
+    FROM transactions t
+    JOIN period_closing c ON c.id = t.id
+    WHERE t.budget_id = :budget_id AND t.deleted_at IS NULL
+    GROUP BY t.account_id
+    HAVING SUM(t.amount_cents) <> 0
+    """
+)
+
+_CARRY_INS_SQL = sa.text(
+    """
+    INSERT INTO period_close_carry_ins (close_id, category_id, budget_id, assigned_cents, activity_cents)
+    SELECT :close_id, c.id, :budget_id, COALESCE(a.assigned, 0), COALESCE(x.activity, 0)
+    FROM categories c
+    LEFT JOIN (
+        SELECT category_id, SUM(assigned_cents) AS assigned
+        FROM monthly_category_budget
+        WHERE month >= :since AND month < :cutoff
+        GROUP BY category_id
+    ) a ON a.category_id = c.id
+    LEFT JOIN (
+        SELECT s.category_id, SUM(s.amount_cents) AS activity
+        FROM subtransactions s
+        JOIN period_closing pc ON pc.id = s.transaction_id
+        JOIN transactions t ON t.budget_id = s.budget_id AND t.id = s.transaction_id
+        WHERE s.budget_id = :budget_id AND t.deleted_at IS NULL AND s.category_id IS NOT NULL
+        GROUP BY s.category_id
+    ) x ON x.category_id = c.id
+    WHERE c.budget_id = :budget_id AND (a.assigned IS NOT NULL OR x.activity IS NOT NULL)
+    """
+)
+
+
+def _balances(db: Session, budget_id: UUID) -> dict[UUID, int]:
+    rows = db.execute(
+        sa.select(Transaction.account_id, sa.func.sum(Transaction.amount_cents))
+        .where(Transaction.budget_id == budget_id, Transaction.deleted_at.is_(None))
+        .group_by(Transaction.account_id)
+    ).all()
+    return {account_id: int(total) for account_id, total in rows if total}
+
+
+def active_cutoff(db: Session, budget_id: UUID) -> date | None:
+    return db.execute(
+        sa.select(sa.func.max(PeriodClose.cutoff)).where(PeriodClose.budget_id == budget_id, PeriodClose.reopened_at.is_(None))
+    ).scalar()
+
+
+def _refresh_rollups_before(db: Session, budget_id: UUID, cutoff: date) -> None:
+    """Rebuild the rollups of every month before `cutoff` from the live rows."""
+    db.execute(sa.delete(AccountMonthRollup).where(AccountMonthRollup.budget_id == budget_id, AccountMonthRollup.month < cutoff))
+    db.execute(sa.delete(CategoryMonthRollup).where(CategoryMonthRollup.budget_id == budget_id, CategoryMonthRollup.month < cutoff))
+    months = db.execute(
+        sa.select(sa.distinct(sa.func.date_trunc("month", Transaction.date).cast(sa.Date))).where(
+            Transaction.budget_id == budget_id, Transaction.deleted_at.is_(None), Transaction.date < cutoff
+        )
+    ).scalars().all()
+    for m in sorted(months):
+        rollups.refresh_month(db, budget_id, m)
+
+
+def _check_balances(before: dict[UUID, int], after: dict[UUID, int]) -> None:
+    moved = sorted(str(a) for a in before.keys() | after.keys() if before.get(a, 0) != after.get(a, 0))
+    if moved:
+        raise CloseError(f"Account balances changed: {', '.join(moved)}")
+
+
+def close_period(db: Session, budget_id: UUID, cutoff: date) -> PeriodClose:
+    """Close everything dated before `cutoff` (the first day of a month)."""
+    # Serializes closes and reopens of one budget
+    db.execute(sa.select(Budget.id).where(Budget.id == budget_id).with_for_update())
+    allow_closed_writes(db)
+    if cutoff.day != 1:
+        raise CloseError("The cutoff must be the first day of a month")
+    if cutoff > rollups.month_start(date.today()):
+        raise CloseError("Only past months can be closed")
+    floor = active_cutoff(db, budget_id)
+    if floor is not None and cutoff <= floor:
+        raise CloseError(f"The period before {floor.isoformat()} is already closed")
+
+    before = _balances(db, budget_id)
+    through = cutoff - timedelta(days=1)
+    # Age of Money resumes from this checkpoint once the rows behind it are gone
+    age_of_money.invalidate(db, budget_id, cutoff)
+    age_of_money.advance(db, budget_id, through)
+
+    close = PeriodClose(id=uuid4(), budget_id=budget_id, cutoff=cutoff, summary={})
+    db.add(close)
+    db.flush()
+    params = {"budget_id": budget_id, "cutoff": cutoff, "close_id": close.id}
+    db.execute(_STAGE_TABLE_SQL)
+    db.execute(_STAGE_SQL, params)
+
+    openings = db.execute(
+        _OPENING_SQL,
+        {**params, "opening_date": through, "memo": f"Opening balance (closed through {through.isoformat()})"},
+    ).rowcount
+    carry_ins = db.execute(_CARRY_INS_SQL, {**params, "since": floor or date.min}).rowcount
+
+    T = Transaction.__table__
+    S = SubTransaction.__table__
+    staged = sa.select(_closing.c.id)
+    tx_cols = [n for n in _TX_COLS if n != "close_id"]
+    archived = db.execute(
+        sa.insert(TransactionArchive.__table__).from_select(
+            tx_cols + ["close_id"],
+            sa.select(*(T.c[n] for n in tx_cols), sa.literal(close.id, T.c.close_id.type)).where(
+                T.c.budget_id == budget_id, T.c.id.in_(staged)
+            ),
+        )
+    ).rowcount
+    archived_subs = db.execute(
+        sa.insert(SubTransactionArchive.__table__).from_select(
+            _SUB_COLS,
+            sa.select(*(S.c[n] for n in _SUB_COLS)).where(S.c.budget_id == budget_id, S.c.transaction_id.in_(staged)),
+        )
+    ).rowcount
+    # Subtransactions go with their parent via ON DELETE CASCADE
+    db.execute(sa.delete(T).where(T.c.budget_id == budget_id, T.c.id.in_(staged)))
+
+    _refresh_rollups_before(db, budget_id, cutoff)
+    _check_balances(before, _balances(db, budget_id))
+
+    close.summary = {
+        "transactions": archived,
+        "subtransactions": archived_subs,
+        "opening_balances": openings,
+        "carry_ins": carry_ins,
+    }
+    db.add(
+        AuditLog(
+            budget_id=budget_id,
+            action="close_period",
+            entity_type="period_close",
+            entity_id=close.id,
+            diff_json={"cutoff": cutoff.isoformat(), **close.summary},
+        )
+    )
+    changes.record(db, budget_id, "transactions", None, "update")
+    changes.record(db, budget_id, "subtransactions", None, "update")
+    return close
+
+
+def reopen_period(db: Session, budget_id: UUID, close_id: UUID) -> PeriodClose:
+    """Put the rows of the latest close back and drop its opening balances."""
+    db.execute(sa.select(Budget.id).where(Budget.id == budget_id).with_for_update())
+    allow_closed_writes(db)
+    close = db.get(PeriodClose, close_id)
+    if close is None or close.budget_id != budget_id:
+        raise CloseError("Close not found")
+    if close.reopened_at is not None:
+        raise CloseError("This close was already reopened")
+    if close.cutoff != active_cutoff(db, budget_id):
+        raise CloseError("Only the latest close can be reopened")
+
+    # The archived rows must still add up to the opening balances standing in for them
+    archived = {
+        account_id: int(total)
+        for account_id, total in db.execute(
+            sa.select(TransactionArchive.account_id, sa.func.sum(TransactionArchive.amount_cents))
+            .where(
+                TransactionArchive.budget_id == budget_id,
+                TransactionArchive.close_id == close_id,
+                TransactionArchive.deleted_at.is_(None),
+            )
+            .group_by(TransactionArchive.account_id)
+        )
+        if total
+    }
+    openings = dict(
+        db.execute(
+            sa.select(Transaction.account_id, Transaction.amount_cents).where(
+                Transaction.budget_id == budget_id, Transaction.close_id == close_id, Transaction.deleted_at.is_(None)
+            )
+        ).all()
+    )
+    if archived != openings:
+        raise CloseError("Opening balances no longer match the closed rows; an account was changed or deleted")
+
+    before = _balances(db, budget_id)
+    T = Transaction.__table__
+    TA = TransactionArchive.__table__
+    SA = SubTransactionArchive.__table__
+    opening_months = db.execute(
+        sa.select(sa.distinct(T.c.date)).where(T.c.budget_id == budget_id, T.c.close_id == close_id)
+    ).scalars().all()
+    db.execute(sa.delete(T).where(T.c.budget_id == budget_id, T.c.close_id == close_id))
+
+    in_close = sa.and_(TA.c.budget_id == budget_id, TA.c.close_id == close_id)
+    tx_cols = [n for n in _TX_COLS if n != "close_id"]
+    restored = db.execute(
+        sa.insert(T).from_select(tx_cols, sa.select(*(TA.c[n] for n in tx_cols)).where(in_close))
+    ).rowcount
+    db.execute(
+        sa.insert(SubTransaction.__table__).from_select(
+            _SUB_COLS,
+            sa.select(*(SA.c[n] for n in _SUB_COLS))
+            .join(TA, sa.and_(TA.c.budget_id == SA.c.budget_id, TA.c.id == SA.c.transaction_id))
+            .where(in_close),
+        )
+    )
+    months = set(
+        db.execute(
+            sa.select(sa.distinct(sa.func.date_trunc("month", TA.c.date).cast(sa.Date))).where(
+                in_close, TA.c.deleted_at.is_(None)
+            )
+        ).scalars()
+    )
+    # Archived subtransactions go with their parent via ON DELETE CASCADE
+    db.execute(sa.delete(TA).where(in_close))
+    db.execute(sa.delete(PeriodCloseCarryIn).where(PeriodCloseCarryIn.close_id == close_id))
+
+    for m in sorted(months | {rollups.month_start(d) for d in opening_months}):
+        rollups.refresh_month(db, budget_id, m)
+    _check_balances(before, _balances(db, budget_id))
+
+    close.reopened_at = datetime.now(timezone.utc)
+    db.add(
+        AuditLog(
+            budget_id=budget_id,
+            action="reopen_period",
+            entity_type="period_close",
+            entity_id=close.id,
+            diff_json={"cutoff": close.cutoff.isoformat(), "transactions": restored},
+        )
+    )
+    changes.record(db, budget_id, "transactions", None, "update")
+    changes.record(db, budget_id, "subtransactions", None, "update")
+    return close
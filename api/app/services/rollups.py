@@ -0,0 +1,136 @@
+"""Materialized monthly rollups backing the reports.
+
+Rows are keyed by (account, month) and (category, month). Any flush that
+touches a transaction or subtransaction marks its (budget, month) dirty
+(subtransactions carry their parent's budget_id/date for partitioning); the
+dirty months are recomputed from the ledger just before the session commits,
+inside the same database transaction, under a per-(budget, month) advisory
+lock (taken in a fixed order, so two commits cannot deadlock on it).
+"""
+from datetime import date
+from itertools import chain
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.transaction import Transaction, SubTransaction
+from app.models.rollup import AccountMonthRollup, CategoryMonthRollup
+
+
+_DIRTY_MONTHS = "rollups_dirty_months"
+
+
+def month_start(d: date | str) -> date:
+    if isinstance(d, str):
+        d = date.fromisoformat(d[:10])
+    return d.replace(day=1)
+
+
+def next_month(m: date) -> date:
+    if m.month == 12:
+        return date(m.year + 1, 1, 1)
+    return date(m.year, m.month + 1, 1)
+
+
+def refresh_month(db: Session, budget_id: UUID, month: date) -> None:
+    m = month_start(month)
+    nm = next_month(m)
+    # Concurrent commits touching the same month would both delete and then both insert
+    # the same keys; the second waits here instead and recomputes after the first commits
+    db.execute(sa.select(sa.func.pg_advisory_xact_lock(sa.func.hashtextextended(f"rollups:{budget_id}:{m.isoformat()}", 0))))
+    live = (
+        Transaction.budget_id == budget_id,
+        Transaction.deleted_at.is_(None),
+        Transaction.date >= m,
+        Transaction.date < nm,
+    )
+
+    db.execute(sa.delete(AccountMonthRollup).where(AccountMonthRollup.budget_id == budget_id, AccountMonthRollup.month == m))
+    # Opening balances of a period close are neither income nor spending
+    non_transfer = sa.and_(Transaction.transfer_tx_id.is_(None), Transaction.close_id.is_(None))
+    accounts = (
+        sa.select(
+            Transaction.account_id,
+            sa.literal(m, sa.Date),
+            sa.literal(budget_id, Transaction.budget_id.type),
+            sa.func.coalesce(sa.func.sum(Transaction.amount_cents).filter(non_transfer, Transaction.amount_cents > 0), 0),
+            sa.func.coalesce(-sa.func.sum(Transaction.amount_cents).filter(non_transfer, Transaction.amount_cents < 0), 0),
+            sa.func.sum(Transaction.amount_cents),
+        )
+        .where(*live)
+        .group_by(Transaction.account_id)
+    )
+    db.execute(
+        sa.insert(AccountMonthRollup).from_select(
+            ["account_id", "month", "budget_id", "inflow_cents", "outflow_cents", "net_cents"], accounts
+        )
+    )
+
+    db.execute(sa.delete(CategoryMonthRollup).where(CategoryMonthRollup.budget_id == budget_id, CategoryMonthRollup.month == m))
+    categories = (
+        sa.select(
+            SubTransaction.category_id,
+            sa.literal(m, sa.Date),
+            sa.literal(budget_id, Transaction.budget_id.type),
+            sa.func.sum(SubTransaction.amount_cents),
+        )
+        .join(
+            Transaction,
+            sa.and_(Transaction.budget_id == SubTransaction.budget_id, Transaction.id == SubTransaction.transaction_id),
+        )
+        .where(
+            *live,
+            SubTransaction.budget_id == budget_id,
+            SubTransaction.date >= m,
+            SubTransaction.date < nm,
+            SubTransaction.category_id.is_not(None),
+        )
+        .group_by(SubTransaction.category_id)
+    )
+    db.execute(
+        sa.insert(CategoryMonthRollup).from_select(["category_id", "month", "budget_id", "activity_cents"], categories)
+    )
+
+
+def rebuild_budget(db: Session, budget_id: UUID) -> None:
+    """Recompute every rollup row of a budget (used after bulk loads that bypass the ORM)."""
+    months = db.execute(
+        sa.select(sa.distinct(sa.func.date_trunc("month", Transaction.date).cast(sa.Date)))
+        .where(Transaction.budget_id == budget_id, Transaction.deleted_at.is_(None))
+    ).scalars().all()
+    db.execute(sa.delete(AccountMonthRollup).where(AccountMonthRollup.budget_id == budget_id))
+    db.execute(sa.delete(CategoryMonthRollup).where(CategoryMonthRollup.budget_id == budget_id))
+    for m in sorted(months):
+        refresh_month(db, budget_id, m)
+
+
+def _history_values(obj, attr: str):
+    hist = sa.inspect(obj).attrs[attr].history
+    return [v for v in chain(hist.added or (), hist.unchanged or (), hist.deleted or ()) if v is not None]
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    months = session.info.setdefault(_DIRTY_MONTHS, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (Transaction, SubTransaction)):
+            for d in _history_values(obj, "date"):
+                months.add((obj.budget_id, month_start(d)))
+
+
+def _before_commit(session: Session) -> None:
+    session.flush()
+    months = session.info.pop(_DIRTY_MONTHS, set())
+    for budget_id, m in sorted(months, key=lambda k: (str(k[0]), k[1])):
+        refresh_month(session, budget_id, m)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_MONTHS, None)
+
+
+def register(target=Session) -> None:
+    event.listen(target, "after_flush", _after_flush)
+    event.listen(target, "before_commit", _before_commit)
+    event.listen(target, "after_rollback", _after_rollback)
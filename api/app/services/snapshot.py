@@ -0,0 +1,315 @@
+"""Whole-budget snapshots: export, restore and clone.
+
+A snapshot is a stream of msgpack objects:
+
+    {"format": "markbudget-snapshot", "version": 2, "budget_id": <uuid>, ...}
+    {"table": "accounts", "columns": [...], "rows": [[...], ...]}   # repeated
+    {"end": true, "counts": {"accounts": 12, ...}}
+
+Tables are written parent-first in chunks of CHUNK rows, read through a
+server-side cursor, so memory stays flat regardless of budget size. UUIDs are
+16-byte bins and dates/timestamps msgpack ext types. Import streams each chunk
+into its table with COPY; clones remap every id to a fresh UUID on the way.
+
+Period closes travel with the ledger: the closes, their carry-ins, the archived
+rows and the Age of Money checkpoints that stand in for them (version 2). A
+clone without the ledger leaves all of it behind.
+"""
+import argparse
+import sys
+import tempfile
+import uuid
+from collections.abc import Iterator
+from datetime import date, datetime
+from typing import BinaryIO
+
+import msgpack
+import sqlalchemy as sa
+from psycopg.types.json import Jsonb
+from sqlalchemy.dialects.postgresql import JSONB, UUID as PG_UUID
+from sqlalchemy.orm import Session
+
+from app import changes
+from app.db import SessionLocal
+from app.models.budget import Budget
+from app.models.account import Account
+from app.models.payee import Payee
+from app.models.category import CategoryGroup, Category, MonthlyCategoryBudget
+from app.models.age_of_money import AgeOfMoneyCheckpoint, AgeOfMoneyDay
+from app.models.period import PeriodClose, PeriodCloseCarryIn
+from app.models.transaction import Transaction, SubTransaction, TransactionArchive, SubTransactionArchive
+from app.services import periods, rollups, suggestions
+
+
+FORMAT = "markbudget-snapshot"
+VERSION = 2
+# Version 1 predates period closes; its snapshots load unchanged
+READABLE_VERSIONS = (1, 2)
+CHUNK = 10_000
+
+_EXT_DATE = 1
+_EXT_DATETIME = 2
+
+# Parent-first so foreign keys hold while loading
+TABLES = (
+    Budget,
+    Account,
+    Payee,
+    CategoryGroup,
+    Category,
+    MonthlyCategoryBudget,
+    PeriodClose,
+    PeriodCloseCarryIn,
+    Transaction,
+    SubTransaction,
+    TransactionArchive,
+    SubTransactionArchive,
+    AgeOfMoneyCheckpoint,
+    AgeOfMoneyDay,
+)
+LEDGER_TABLES = frozenset(
+    {
+        "monthly_category_budget",
+        "period_closes",
+        "period_close_carry_ins",
+        "transactions",
+        "subtransactions",
+        "transactions_archive",
+        "subtransactions_archive",
+        "age_of_money_checkpoints",
+        "age_of_money_days",
+    }
+)
+# Columns naming a budget-owned parent; on import they must name a row of the same snapshot
+_REFS = {
+    "account_id": "accounts",
+    "credit_account_id": "accounts",
+    "payee_id": "payees",
+    "group_id": "category_groups",
+    "category_id": "categories",
+    "close_id": "period_closes",
+}
+# Archived rows keep ids of accounts, payees and categories deleted since (no foreign keys);
+# those may name no row of the snapshot, as long as they name no row of the database either
+_LOOSE_REFS = frozenset({"transactions_archive", "subtransactions_archive"})
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class BudgetExists(SnapshotError):
+    pass
+
+
+def _budget_filter(model, budget_id: uuid.UUID):
+    if model is Budget:
+        return Budget.id == budget_id
+    if model is MonthlyCategoryBudget:
+        return MonthlyCategoryBudget.category_id.in_(sa.select(Category.id).where(Category.budget_id == budget_id))
+    return model.budget_id == budget_id
+
+
+def _uuid_columns(table: sa.Table) -> set[str]:
+    return {c.name for c in table.columns if isinstance(c.type, PG_UUID)}
+
+
+def _json_columns(table: sa.Table) -> set[str]:
+    return {c.name for c in table.columns if isinstance(c.type, JSONB)}
+
+
+def _default(obj):
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, date):
+        return msgpack.ExtType(_EXT_DATE, obj.toordinal().to_bytes(4, "big"))
+    raise TypeError(f"cannot serialize {type(obj).__name__}")
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == _EXT_DATE:
+        return date.fromordinal(int.from_bytes(data, "big"))
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def iter_export(db: Session, budget_id: uuid.UUID, tables: tuple = TABLES) -> Iterator[bytes]:
+    if db.get(Budget, budget_id) is None:
+        raise SnapshotError("Budget not found")
+    packer = msgpack.Packer(default=_default)
+    yield packer.pack(
+        {"format": FORMAT, "version": VERSION, "budget_id": budget_id.bytes, "exported_at": datetime.utcnow()}
+    )
+    counts = {}
+    for model in tables:
+        table = model.__table__
+        uuid_cols = _uuid_columns(table)
+        # uuid_send() hands msgpack raw bytes instead of UUID objects per cell
+        cols = [sa.func.uuid_send(c).label(c.name) if c.name in uuid_cols else c for c in table.columns]
+        result = db.execute(
+            sa.select(*cols).where(_budget_filter(model, budget_id)),
+            execution_options={"stream_results": True, "yield_per": CHUNK},
+        )
+        names = list(result.keys())
+        n = 0
+        for rows in result.partitions():
+            n += len(rows)
+            yield packer.pack({"table": table.name, "columns": names, "rows": [tuple(r) for r in rows]})
+        counts[table.name] = n
+    yield packer.pack({"end": True, "counts": counts})
+
+
+def export_budget(db: Session, budget_id: uuid.UUID, fp: BinaryIO, tables: tuple = TABLES) -> None:
+    for chunk in iter_export(db, budget_id, tables):
+        fp.write(chunk)
+
+
+def import_snapshot(db: Session, fp: BinaryIO, clone: bool = False, name: str | None = None) -> uuid.UUID:
+    """Load a snapshot into the database; the caller commits.
+
+    Without `clone` the original ids are kept (restore / move between
+    databases) and the budget must not exist yet. With `clone` every id is
+    replaced, so the copy can live next to its source. Every row must belong
+    to the header's budget and reference only rows of the snapshot.
+    Closed periods are loaded as they were, past the close guards.
+    """
+    unpacker = msgpack.Unpacker(fp, ext_hook=_ext_hook, raw=False)
+    header = next(unpacker, None)
+    if not isinstance(header, dict) or header.get("format") != FORMAT:
+        raise SnapshotError("Not a budget snapshot")
+    if header.get("version") not in READABLE_VERSIONS:
+        raise SnapshotError(f"Unsupported snapshot version {header.get('version')}")
+
+    try:
+        source_id = uuid.UUID(bytes=header["budget_id"])
+    except (KeyError, TypeError, ValueError):
+        raise SnapshotError("Snapshot header has no valid budget_id")
+    remap: dict[bytes, uuid.UUID] = {}
+
+    def convert(raw: bytes | None) -> uuid.UUID | None:
+        if raw is None:
+            return None
+        if not clone:
+            return uuid.UUID(bytes=raw)
+        new = remap.get(raw)
+        if new is None:
+            new = remap[raw] = uuid.uuid4()
+        return new
+
+    budget_id = convert(source_id.bytes)
+    if not clone and db.get(Budget, budget_id) is not None:
+        raise BudgetExists("Budget already exists; import it as a clone instead")
+
+    tables = {m.__table__.name: m.__table__ for m in TABLES}
+    # Raw ids per parent table, filled as the (parent-first) chunks arrive
+    seen: dict[str, set[bytes]] = {t: set() for t in set(_REFS.values())}
+    dangling: dict[str, set[bytes]] = {t: set() for t in set(_REFS.values())}
+    # Opening balances and archived months lie before the close's cutoff
+    periods.allow_closed_writes(db)
+    cursor = db.connection().connection.driver_connection.cursor()
+    ended = False
+    for obj in unpacker:
+        if not isinstance(obj, dict):
+            raise SnapshotError("Malformed snapshot")
+        if obj.get("end"):
+            ended = True
+            break
+        table = tables.get(obj.get("table"))
+        if table is None:
+            raise SnapshotError(f"Unknown table {obj.get('table')!r}")
+        names, rows = obj.get("columns"), obj.get("rows")
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names) or not isinstance(rows, list):
+            raise SnapshotError(f"Malformed chunk for {table.name}")
+        unknown = set(names) - set(table.columns.keys())
+        if unknown:
+            raise SnapshotError(f"Unknown columns for {table.name}: {sorted(unknown)}")
+        owner = "id" if table.name == "budgets" else "budget_id"
+        owner_idx = names.index(owner) if owner in names else None
+        if owner_idx is None and table.name != "monthly_category_budget":
+            raise SnapshotError(f"{table.name} rows carry no {owner}")
+        ref_idx = [(i, _REFS[n]) for i, n in enumerate(names) if n in _REFS and table.name != _REFS[n]]
+        id_idx = names.index("id") if table.name in seen and "id" in names else None
+        uuid_idx = [i for i, n in enumerate(names) if n in _uuid_columns(table)]
+        # COPY would send lists as arrays
+        json_idx = [i for i, n in enumerate(names) if n in _json_columns(table)]
+        name_idx = names.index("name") if table.name == "budgets" and name else None
+        with cursor.copy(f"COPY {table.name} ({', '.join(names)}) FROM STDIN") as copy:
+            for row in rows:
+                if not isinstance(row, list) or len(row) != len(names):
+                    raise SnapshotError(f"Malformed row for {table.name}")
+                if owner_idx is not None and row[owner_idx] != source_id.bytes:
+                    raise SnapshotError(f"A {table.name} row belongs to another budget")
+                for i, parent in ref_idx:
+                    if row[i] is not None and row[i] not in seen[parent]:
+                        if table.name not in _LOOSE_REFS or parent == "period_closes":
+                            raise SnapshotError(f"A {table.name} row references a {parent} row outside the snapshot")
+                        dangling[parent].add(row[i])
+                if id_idx is not None:
+                    seen[table.name].add(row[id_idx])
+                for i in uuid_idx:
+                    row[i] = convert(row[i])
+                for i in json_idx:
+                    if row[i] is not None:
+                        row[i] = Jsonb(row[i])
+                if name_idx is not None:
+                    row[name_idx] = name
+                copy.write_row(row)
+    if not ended:
+        raise SnapshotError("Snapshot is truncated")
+    # Clones remap dangling ids to fresh ones; restores must not let them land on another budget's rows
+    if not clone:
+        for parent, raw_ids in dangling.items():
+            if raw_ids and db.execute(
+                sa.select(sa.literal(1))
+                .select_from(tables[parent])
+                .where(tables[parent].c.id.in_([uuid.UUID(bytes=r) for r in raw_ids]))
+                .limit(1)
+            ).first():
+                raise SnapshotError(f"An archived row references a {parent} row of another budget")
+
+    # COPY bypasses the ORM hooks: rebuild derived rows and announce the budget ourselves
+    rollups.rebuild_budget(db, budget_id)
+    suggestions.rebuild(db, budget_id)
+    changes.record(db, budget_id, "budgets", budget_id, "insert")
+    return budget_id
+
+
+def clone_budget(db: Session, budget_id: uuid.UUID, name: str | None = None, include_ledger: bool = True) -> uuid.UUID:
+    """Copy a budget under new ids; without the ledger this is a "fresh start"."""
+    tables = TABLES if include_ledger else tuple(m for m in TABLES if m.__table__.name not in LEDGER_TABLES)
+    with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as buf:
+        export_budget(db, budget_id, buf, tables)
+        buf.seek(0)
+        return import_snapshot(db, buf, clone=True, name=name)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export")
+    ex.add_argument("budget_id", type=uuid.UUID)
+    ex.add_argument("-o", "--output", help="file to write (default: stdout)")
+    im = sub.add_parser("import")
+    im.add_argument("input", help="snapshot file ('-' for stdin)")
+    im.add_argument("--clone", action="store_true", help="assign new ids")
+    im.add_argument("--name")
+    args = ap.parse_args()
+
+    with SessionLocal() as db:
+        if args.cmd == "export":
+            if args.output:
+                with open(args.output, "wb") as fp:
+                    export_budget(db, args.budget_id, fp)
+            else:
+                export_budget(db, args.budget_id, sys.stdout.buffer)
+        else:
+            fp = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+            with fp:
+                budget_id = import_snapshot(db, fp, clone=args.clone, name=args.name)
+            db.commit()
+            print(budget_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Payee/memo -> category suggestions learned from each budget's ledger.
+
+Every categorized, unsplit, non-transfer transaction votes for its category
+under its payee ("p:<payee id>") and each memo token ("m:<token>"). Votes
+decay with the transaction date (half-life SUGGESTION_HALF_LIFE_DAYS); a
+stored weight is "as of updated_on", so casting or retracting a vote is one
+upsert: weight' = weight * decay(new - old) + vote * decay(old - new).
+
+Upkeep is incremental: a flush notes the transactions it touched, and before
+commit their previous votes (category_suggestion_sources) are retracted and
+their current ones cast. Lookups go through an in-process per-budget index, so
+suggesting for a row is a handful of dict hits; once the commit lands, the same
+vote deltas are folded into the cached index. Category changes, merges and
+rebuilds drop it instead, and SUGGESTION_CACHE_TTL_SECONDS bounds staleness
+across workers.
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from itertools import chain
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import changes
+from app.config import Settings
+from app.models.suggestion import CategorySuggestion, CategorySuggestionSource
+from app.models.transaction import Transaction, SubTransaction
+
+
+settings = Settings()
+
+# A memo token is weaker evidence than the payee
+MEMO_WEIGHT = 0.5
+MAX_MEMO_TOKENS = 8
+CHUNK = 5000
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_DIRTY = "suggestions_dirty"
+# budget id -> vote deltas to fold into the cached index after commit (None: drop it)
+_PENDING = "suggestions_pending"
+
+S = CategorySuggestion.__table__
+SRC = CategorySuggestionSource.__table__
+
+_VOTES_SQL = """
+    SELECT t.id, t.payee_id, t.memo, t.date, (array_agg(s.category_id))[1] AS category_id
+    FROM transactions t
+    JOIN subtransactions s ON s.budget_id = t.budget_id AND s.transaction_id = t.id
+    WHERE t.budget_id = :budget_id AND s.budget_id = :budget_id
+      AND t.deleted_at IS NULL AND t.transfer_tx_id IS NULL AND t.income_month IS NULL
+      {filter}
+    GROUP BY t.id
+    HAVING count(DISTINCT s.category_id) = 1 AND bool_and(s.category_id IS NOT NULL)
+"""
+_ALL_VOTES = sa.text(_VOTES_SQL.format(filter=""))
+_SOME_VOTES = sa.text(_VOTES_SQL.format(filter="AND t.id = ANY(:ids)"))
+
+_ON_CONFLICT_ADD = """
+    ON CONFLICT (budget_id, key, category_id) DO UPDATE SET
+        weight = category_suggestions.weight
+                   * power(0.5, GREATEST(EXCLUDED.updated_on - category_suggestions.updated_on, 0) / :half_life)
+               + EXCLUDED.weight
+                   * power(0.5, GREATEST(category_suggestions.updated_on - EXCLUDED.updated_on, 0) / :half_life),
+        updated_on = GREATEST(category_suggestions.updated_on, EXCLUDED.updated_on)
+"""
+_UPSERT = sa.text(
+    """
+    INSERT INTO category_suggestions (budget_id, key, category_id, weight, updated_on)
+    VALUES (:budget_id, :key, :category_id, :weight, :updated_on)
+    """
+    + _ON_CONFLICT_ADD
+)
+_MERGE_CATEGORY = sa.text(
+    """
+    INSERT INTO category_suggestions (budget_id, key, category_id, weight, updated_on)
+    SELECT budget_id, key, :target, weight, updated_on
+    FROM category_suggestions
+    WHERE budget_id = :budget_id AND category_id = :source
+    """
+    + _ON_CONFLICT_ADD
+)
+_MERGE_KEY = sa.text(
+    """
+    INSERT INTO category_suggestions (budget_id, key, category_id, weight, updated_on)
+    SELECT budget_id, :target, category_id, weight, updated_on
+    FROM category_suggestions
+    WHERE budget_id = :budget_id AND key = :source
+    """
+    + _ON_CONFLICT_ADD
+)
+
+
+def keys_for(payee_id: UUID | None, memo: str | None) -> list[str]:
+    keys = [f"p:{payee_id}"] if payee_id else []
+    tokens: set[str] = set()
+    for tok in _TOKEN.findall((memo or "").lower()):
+        if len(tok) < 3 or tok.isdigit() or tok in tokens:
+            continue
+        tokens.add(tok)
+        keys.append(f"m:{tok[:78]}")
+        if len(tokens) == MAX_MEMO_TOKENS:
+            break
+    return keys
+
+
+def _decay(days: int) -> float:
+    return 0.5 ** (days / settings.suggestion_half_life_days)
+
+
+def _fold(acc: dict, keys: list[str], category_id: UUID, d: date, vote: int) -> None:
+    for key in keys:
+        k = (key, category_id)
+        if k not in acc:
+            acc[k] = (float(vote), d)
+            continue
+        weight, on = acc[k]
+        top = max(on, d)
+        acc[k] = (weight * _decay((top - on).days) + vote * _decay((top - d).days), top)
+
+
+def _apply(db: Session, budget_id: UUID, tx_ids: list[UUID] | None) -> dict[tuple[str, UUID], tuple[float, date]]:
+    """Re-vote `tx_ids` (None: rebuild the whole budget from its ledger); returns the vote deltas."""
+    acc: dict[tuple[str, UUID], tuple[float, date]] = {}
+    if tx_ids is None:
+        db.execute(sa.delete(S).where(S.c.budget_id == budget_id))
+        db.execute(sa.delete(SRC).where(SRC.c.budget_id == budget_id))
+        old = set()
+        rows = db.execute(_ALL_VOTES, {"budget_id": budget_id}, execution_options={"stream_results": True, "yield_per": CHUNK})
+    else:
+        old = {
+            (r.transaction_id, tuple(r.keys), r.category_id, r.date)
+            for r in db.execute(
+                sa.delete(SRC)
+                .where(SRC.c.budget_id == budget_id, SRC.c.transaction_id.in_(tx_ids))
+                .returning(SRC.c.transaction_id, SRC.c.keys, SRC.c.category_id, SRC.c.date)
+            )
+        }
+        rows = db.execute(_SOME_VOTES, {"budget_id": budget_id, "ids": tx_ids})
+
+    new = set()
+    for r in rows:
+        keys = keys_for(r.payee_id, r.memo)
+        if keys:
+            new.add((r.id, tuple(keys), r.category_id, r.date))
+    # Edits that changed nothing a vote depends on (state, amount, ...) cancel out
+    for _tx, keys, category_id, d in old - new:
+        _fold(acc, list(keys), category_id, d, -1)
+    for _tx, keys, category_id, d in new - old:
+        _fold(acc, list(keys), category_id, d, 1)
+
+    sources = [
+        {"budget_id": budget_id, "transaction_id": tx, "keys": list(keys), "category_id": category_id, "date": d}
+        for tx, keys, category_id, d in new
+    ]
+    for i in range(0, len(sources), CHUNK):
+        db.execute(sa.insert(SRC), sources[i:i + CHUNK])
+    votes = [
+        {
+            "budget_id": budget_id,
+            "key": key,
+            "category_id": category_id,
+            "weight": weight,
+            "updated_on": on,
+            "half_life": float(settings.suggestion_half_life_days),
+        }
+        # Key order, so concurrent commits lock category_suggestions rows in the same order
+        for (key, category_id), (weight, on) in sorted(acc.items(), key=lambda kv: kv[0])
+        if weight
+    ]
+    for i in range(0, len(votes), CHUNK):
+        db.execute(_UPSERT, votes[i:i + CHUNK])
+    if tx_ids is not None and votes:
+        # Fully retracted pairs
+        db.execute(
+            sa.delete(S).where(S.c.budget_id == budget_id, S.c.key.in_(sorted({v["key"] for v in votes})), S.c.weight < 1e-6)
+        )
+    return acc
+
+
+def _stale(db: Session, budget_id: UUID) -> None:
+    """Drop the budget's cached index once this session commits."""
+    db.info.setdefault(_PENDING, {})[budget_id] = None
+
+
+def merge_category(db: Session, budget_id: UUID, source: UUID, target: UUID) -> None:
+    """Fold `source`'s votes into `target` (the caller deletes `source`)."""
+    db.execute(
+        _MERGE_CATEGORY,
+        {"budget_id": budget_id, "source": source, "target": target, "half_life": float(settings.suggestion_half_life_days)},
+    )
+    db.execute(
+        sa.update(SRC).where(SRC.c.budget_id == budget_id, SRC.c.category_id == source).values(category_id=target)
+    )
+    _stale(db, budget_id)
+
+
+def merge_key(db: Session, budget_id: UUID, source: str, target: str | None) -> None:
+    """Fold votes under key `source` into `target`, or drop them when `target` is None."""
+    if target is not None:
+        db.execute(
+            _MERGE_KEY,
+            {"budget_id": budget_id, "source": source, "target": target, "half_life": float(settings.suggestion_half_life_days)},
+        )
+    db.execute(sa.delete(S).where(S.c.budget_id == budget_id, S.c.key == source))
+    keys = (
+        sa.func.array_replace(SRC.c.keys, sa.cast(source, SRC.c.keys.type.item_type), sa.cast(target, SRC.c.keys.type.item_type))
+        if target is not None
+        else sa.func.array_remove(SRC.c.keys, sa.cast(source, SRC.c.keys.type.item_type))
+    )
+    db.execute(
+        sa.update(SRC)
+        .where(SRC.c.budget_id == budget_id, SRC.c.keys.contains([source]))
+        .values(keys=keys)
+    )
+    _stale(db, budget_id)
+
+
+def rebuild(db: Session, budget_id: UUID) -> None:
+    """Recompute a budget's suggestions (after bulk loads that bypass the ORM)."""
+    _apply(db, budget_id, None)
+    _stale(db, budget_id)
+
+
+@dataclass(frozen=True)
+class Index:
+    votes: dict[str, list[tuple[UUID, float]]]
+    loaded_at: float
+
+    def suggest(self, payee_id: UUID | None, memo: str | None) -> UUID | None:
+        scores: dict[UUID, float] = defaultdict(float)
+        for key in keys_for(payee_id, memo):
+            factor = 1.0 if key.startswith("p:") else MEMO_WEIGHT
+            for category_id, weight in self.votes.get(key, ()):
+                scores[category_id] += factor * weight
+        if not scores:
+            return None
+        category_id, best = max(scores.items(), key=lambda kv: kv[1])
+        if best < settings.suggestion_min_weight or best < settings.suggestion_min_confidence * sum(scores.values()):
+            return None
+        return category_id
+
+
+_cache: dict[UUID, Index] = {}
+_lock = threading.Lock()
+
+
+def invalidate(budget_id: UUID) -> None:
+    with _lock:
+        _cache.pop(budget_id, None)
+
+
+def _fold_into_cache(budget_id: UUID, acc: dict[tuple[str, UUID], tuple[float, date]]) -> None:
+    """Add committed vote deltas to the cached index, decayed to today as get_index does."""
+    today = date.today()
+    by_key: dict[str, dict[UUID, float]] = defaultdict(dict)
+    for (key, category_id), (weight, on) in acc.items():
+        if weight:
+            by_key[key][category_id] = weight * _decay(max((today - on).days, 0))
+    with _lock:
+        index = _cache.get(budget_id)
+        if index is None:
+            return
+        for key, deltas in by_key.items():
+            weights = dict(index.votes.get(key, ()))
+            for category_id, delta in deltas.items():
+                weights[category_id] = weights.get(category_id, 0.0) + delta
+            # A new list per key: readers iterating the old one are unaffected
+            index.votes[key] = [(c, w) for c, w in weights.items() if w >= 1e-6]
+
+
+@changes.subscribe
+def _invalidate_on_change(batch: list[changes.Change]) -> None:
+    for budget_id in {c.budget_id for c in batch if c.entity_type == "categories"}:
+        invalidate(budget_id)
+
+
+def get_index(db: Session, budget_id: UUID) -> Index:
+    index = _cache.get(budget_id)
+    if index is not None and time.monotonic() - index.loaded_at < settings.suggestion_cache_ttl_seconds:
+        return index
+    today = date.today()
+    votes: dict[str, list[tuple[UUID, float]]] = defaultdict(list)
+    for key, category_id, weight, on in db.execute(
+        sa.select(S.c.key, S.c.category_id, S.c.weight, S.c.updated_on).where(S.c.budget_id == budget_id, S.c.weight > 0)
+    ):
+        votes[key].append((category_id, weight * _decay(max((today - on).days, 0))))
+    index = Index(votes=dict(votes), loaded_at=time.monotonic())
+    with _lock:
+        _cache[budget_id] = index
+    return index
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    dirty = session.info.setdefault(_DIRTY, {})
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Transaction):
+            dirty.setdefault(obj.budget_id, set()).add(obj.id)
+        elif isinstance(obj, SubTransaction):
+            dirty.setdefault(obj.budget_id, set()).add(obj.transaction_id)
+
+
+def _before_commit(session: Session) -> None:
+    session.flush()
+    pending = session.info.setdefault(_PENDING, {})
+    for budget_id, tx_ids in session.info.pop(_DIRTY, {}).items():
+        acc = _apply(session, budget_id, sorted(tx_ids, key=str))
+        # A merge or rebuild in this transaction already asked for a reload
+        pending.setdefault(budget_id, acc)
+
+
+def _after_commit(session: Session) -> None:
+    for budget_id, acc in session.info.pop(_PENDING, {}).items():
+        if acc is None:
+            invalidate(budget_id)
+        else:
+            _fold_into_cache(budget_id, acc)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY, None)
+    session.info.pop(_PENDING, None)
+
+
+def register(target=Session) -> None:
+    event.listen(target, "after_flush", _after_flush)
+    event.listen(target, "before_commit", _before_commit)
+    event.listen(target, "after_commit", _after_commit)
+    event.listen(target, "after_rollback", _after_rollback)
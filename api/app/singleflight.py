@@ -0,0 +1,93 @@
+"""Coalesce identical concurrent reads into one computation.
+
+Within a worker, callers with the same key await one shared task. Across
+workers, the first caller takes a Redis lock (`sf:lock:{key}`), computes, and
+parks the result under `sf:result:{key}` for a moment; callers that find the
+lock held poll for that result instead of recomputing. Keys include the budget
+version, so a read that starts after a commit never joins one from before it.
+
+Results must be orjson-serializable. Callers in other workers get the decoded
+JSON (UUIDs/dates as strings), which renders to the same response bytes.
+"""
+import asyncio
+import hashlib
+import logging
+import uuid
+from typing import Any, Awaitable, Callable
+
+import orjson
+from redis.exceptions import RedisError
+
+from app.config import Settings
+from app.redis import async_client
+
+
+logger = logging.getLogger("app.singleflight")
+settings = Settings()
+
+_inflight: dict[str, asyncio.Task] = {}
+
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+return 0
+"""
+
+
+def make_key(route: str, budget_version: str, **params: Any) -> str:
+    raw = "|".join([route, budget_version] + [f"{k}={params[k]}" for k in sorted(params)])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+async def _across_workers(key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    r = async_client()
+    lock_key, result_key = f"sf:lock:{key}", f"sf:result:{key}"
+    token = uuid.uuid4().hex
+    try:
+        leader = await r.set(lock_key, token, nx=True, px=settings.singleflight_lock_ttl_ms)
+    except RedisError:
+        logger.warning("singleflight lock unavailable; computing locally", exc_info=True)
+        return await fn()
+
+    if leader:
+        try:
+            value = await fn()
+            try:
+                await r.set(result_key, orjson.dumps(value), px=settings.singleflight_result_ttl_ms)
+            except (RedisError, TypeError):
+                logger.warning("could not publish singleflight result", exc_info=True)
+            return value
+        finally:
+            try:
+                await r.eval(_RELEASE, 1, lock_key, token)
+            except RedisError:
+                pass  # the lock expires on its own
+
+    # Another worker is computing: wait for its result while the lock is held
+    deadline = asyncio.get_running_loop().time() + settings.singleflight_lock_ttl_ms / 1000
+    try:
+        while asyncio.get_running_loop().time() < deadline:
+            cached = await r.get(result_key)
+            if cached is not None:
+                return orjson.loads(cached)
+            if not await r.exists(lock_key):
+                cached = await r.get(result_key)
+                if cached is not None:
+                    return orjson.loads(cached)
+                break  # leader gave up without a result
+            await asyncio.sleep(settings.singleflight_poll_ms / 1000)
+    except RedisError:
+        logger.warning("singleflight wait failed; computing locally", exc_info=True)
+    return await fn()
+
+
+async def run(key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """Return fn()'s result, sharing it with every concurrent caller of `key`."""
+    if not settings.singleflight_enabled:
+        return await fn()
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_across_workers(key, fn))
+        _inflight[key] = task
+        task.add_done_callback(lambda _t: _inflight.pop(key, None))
+    # shield: one caller disconnecting must not cancel the others' result
+    return await asyncio.shield(task)
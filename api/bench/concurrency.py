@@ -0,0 +1,121 @@
+"""Closed-loop concurrency benchmark for the hot read endpoints.
+
+Runs N concurrent clients against a running API for a fixed duration and
+reports requests/sec and latency percentiles per endpoint. To compare the sync
+and async read paths, run it against each server build and diff the results:
+
+    python -m bench.concurrency --base-url http://localhost:8000 --budget-id <id> \
+        --concurrency 64 --duration 20 --out sync.json
+    python -m bench.concurrency ... --out async.json
+    python -m bench.concurrency --compare sync.json async.json
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date
+
+import httpx
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run_load(client: httpx.AsyncClient, make_request, concurrency: int, duration: float) -> dict:
+    """Drive `make_request(client)` from `concurrency` workers for `duration` seconds."""
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                r = await make_request(client)
+                if r.status_code >= 400:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def read_endpoints(budget_id: str, month: date) -> dict:
+    base = f"/api/v1/budgets/{budget_id}"
+    return {
+        "month_view": lambda c: c.get(f"{base}/categories", params={"month": month.isoformat()}),
+        "register": lambda c: c.get(f"{base}/transactions/"),
+        "balances": lambda c: c.get(f"{base}/accounts/with-balances"),
+        "payee_search": lambda c: c.get(f"{base}/payees/", params={"q": "a"}),
+    }
+
+
+async def main_async(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {"concurrency": args.concurrency, "duration": args.duration, "endpoints": {}}
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30.0) as client:
+        for name, fn in read_endpoints(args.budget_id, args.month).items():
+            results["endpoints"][name] = await run_load(client, fn, args.concurrency, args.duration)
+            print(f"{name:14s} {results['endpoints'][name]}")
+    return results
+
+
+def compare(a_path: str, b_path: str) -> None:
+    a = json.load(open(a_path))["endpoints"]
+    b = json.load(open(b_path))["endpoints"]
+    print(f"{'endpoint':14s} {'rps':>18s} {'p99_ms':>20s}")
+    for name in a:
+        if name not in b:
+            continue
+        print(
+            f"{name:14s} {a[name]['rps']:>8} -> {b[name]['rps']:<8}"
+            f" {a[name]['p99_ms']:>9} -> {b[name]['p99_ms']:<9}"
+        )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://localhost:8000")
+    ap.add_argument("--budget-id")
+    ap.add_argument("--month", type=date.fromisoformat, default=date.today().replace(day=1))
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--duration", type=float, default=15.0)
+    ap.add_argument("--out")
+    ap.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = ap.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if not args.budget_id:
+        ap.error("--budget-id is required")
+    results = asyncio.run(main_async(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Month view: parity check and timing of the two MONTH_ROLLUP_STRATEGY implementations.
+
+For every month of the budget both builders must return identical bodies and
+ETags (exit 1 otherwise); then each is timed over --repeat runs per month.
+
+    python -m bench.month_rollup <budget_id> [--months 12] [--repeat 20]
+"""
+import argparse
+import statistics
+import sys
+import time
+import uuid
+
+import sqlalchemy as sa
+
+from app.db import SessionLocal
+from app.models.transaction import Transaction
+from app.services import month_view
+from app.services.rollups import month_start
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("budget_id", type=uuid.UUID)
+    ap.add_argument("--months", type=int, default=12, help="most recent N months with activity")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    with SessionLocal() as db:
+        months = sorted(
+            {
+                month_start(d)
+                for d in db.execute(
+                    sa.select(sa.distinct(Transaction.date)).where(Transaction.budget_id == args.budget_id)
+                ).scalars()
+            }
+        )[-args.months:]
+        if not months:
+            sys.exit("budget has no transactions")
+
+        mismatches = 0
+        for m in months:
+            a = month_view.build(db, args.budget_id, m, "queries")
+            b = month_view.build(db, args.budget_id, m, "single")
+            if a != b:
+                mismatches += 1
+                print(f"MISMATCH {m}: etag {a[1]} != {b[1]}" if a[1] != b[1] else f"MISMATCH {m}: body differs")
+        print(f"parity: {len(months) - mismatches}/{len(months)} months identical")
+
+        for strategy in month_view.STRATEGIES:
+            samples = []
+            for _ in range(args.repeat):
+                for m in months:
+                    t0 = time.perf_counter()
+                    month_view.build(db, args.budget_id, m, strategy)
+                    samples.append((time.perf_counter() - t0) * 1000)
+            samples.sort()
+            p95 = samples[int(len(samples) * 0.95) - 1]
+            print(f"{strategy:8s} median {statistics.median(samples):7.2f} ms  p95 {p95:7.2f} ms")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
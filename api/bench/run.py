@@ -0,0 +1,165 @@
+"""Benchmark harness for the hot API paths.
+
+Seeds (optionally) a synthetic budget into the local Postgres, then drives each
+scenario at a fixed concurrency against a running API and reports throughput
+and latency percentiles. Results can be checked against a stored baseline so a
+regression fails the run (non-zero exit) in CI:
+
+    python -m app.seeds.synthetic --preset medium          # prints a budget id
+    python -m bench.run --budget-id <id> --preset medium --check-baseline
+    python -m bench.run --budget-id <id> --preset medium --update-baseline
+
+Or let the harness seed its own budget (needs POSTGRES_URL):
+
+    python -m bench.run --generate --preset small
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+from datetime import date
+from pathlib import Path
+
+import httpx
+
+from bench.concurrency import run_load
+
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+# A scenario regresses when throughput drops or p99 grows past these ratios
+RPS_TOLERANCE = 0.15
+P99_TOLERANCE = 0.25
+
+
+async def discover(client: httpx.AsyncClient, budget_id: str, month: date) -> dict:
+    base = f"/api/v1/budgets/{budget_id}"
+    accounts = (await client.get(f"{base}/accounts/")).raise_for_status().json()
+    view = (await client.get(f"{base}/categories", params={"month": month.isoformat()})).raise_for_status().json()
+    payees = (await client.get(f"{base}/payees/")).raise_for_status().json()
+    return {
+        "accounts": [a["id"] for a in accounts if a.get("on_budget", True)],
+        "categories": [c["id"] for c in view["categories"] if not c["is_credit_payment"]],
+        "payee_prefixes": sorted({p["name"][:3] for p in payees}) or ["a"],
+    }
+
+
+def scenarios(budget_id: str, month: date, ids: dict, rng: random.Random) -> dict:
+    base = f"/api/v1/budgets/{budget_id}"
+    sign = [1]
+
+    def assign(c):
+        # Alternate +1/-1 so repeated runs leave assignments unchanged
+        sign[0] = -sign[0]
+        cat = rng.choice(ids["categories"])
+        return c.post(f"{base}/categories/{cat}/assign", json={"month": month.isoformat(), "delta_cents": sign[0]})
+
+    def create_tx(c):
+        return c.post(f"{base}/transactions/", json={
+            "account_id": rng.choice(ids["accounts"]),
+            "date": month.isoformat(),
+            "amount_cents": -rng.randint(100, 5000),
+            "payee_name": "Bench Payee",
+            "subtransactions": [],
+        })
+
+    return {
+        "month_view": lambda c: c.get(f"{base}/categories", params={"month": month.isoformat()}),
+        "assign": assign,
+        "register": lambda c: c.get(f"{base}/transactions/", params={"account_id": rng.choice(ids["accounts"])}),
+        "balances": lambda c: c.get(f"{base}/accounts/with-balances"),
+        "payee_search": lambda c: c.get(f"{base}/payees/", params={"q": rng.choice(ids["payee_prefixes"])}),
+        "create_transaction": create_tx,
+    }
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30.0) as client:
+        ids = await discover(client, args.budget_id, args.month)
+        selected = scenarios(args.budget_id, args.month, ids, rng)
+        if args.only:
+            selected = {k: v for k, v in selected.items() if k in args.only}
+        results = {}
+        for name, fn in selected.items():
+            if args.warmup:
+                await run_load(client, fn, args.concurrency, args.warmup)
+            results[name] = await run_load(client, fn, args.concurrency, args.duration)
+            print(f"{name:20s} rps={results[name]['rps']:>8}  p50={results[name]['p50_ms']:>7}ms  "
+                  f"p95={results[name]['p95_ms']:>7}ms  p99={results[name]['p99_ms']:>7}ms  err={results[name]['errors']}")
+    return {
+        "preset": args.preset,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "python": platform.python_version(),
+        "scenarios": results,
+    }
+
+
+def check(results: dict, baseline: dict) -> list[str]:
+    problems = []
+    for name, cur in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base:
+            continue
+        if base["rps"] and cur["rps"] < base["rps"] * (1 - RPS_TOLERANCE):
+            problems.append(f"{name}: rps {base['rps']} -> {cur['rps']}")
+        if base["p99_ms"] and cur["p99_ms"] > base["p99_ms"] * (1 + P99_TOLERANCE):
+            problems.append(f"{name}: p99 {base['p99_ms']}ms -> {cur['p99_ms']}ms")
+        if cur["errors"] and not base.get("errors"):
+            problems.append(f"{name}: {cur['errors']} errors")
+    return problems
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://localhost:8000")
+    ap.add_argument("--budget-id")
+    ap.add_argument("--generate", action="store_true", help="seed a synthetic budget first (uses POSTGRES_URL)")
+    ap.add_argument("--preset", default="medium")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--month", type=date.fromisoformat, default=date.today().replace(day=1))
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--warmup", type=float, default=2.0)
+    ap.add_argument("--only", nargs="*")
+    ap.add_argument("--out")
+    ap.add_argument("--check-baseline", action="store_true")
+    ap.add_argument("--update-baseline", action="store_true")
+    args = ap.parse_args()
+
+    if args.generate:
+        from app.db import SessionLocal
+        from app.seeds.synthetic import PRESETS, generate
+
+        with SessionLocal() as db:
+            args.budget_id = str(generate(db, PRESETS[args.preset], seed=args.seed))
+            db.commit()
+        print(f"seeded budget {args.budget_id} ({args.preset})")
+    if not args.budget_id:
+        ap.error("--budget-id or --generate is required")
+
+    results = asyncio.run(run(args))
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2))
+
+    baseline_path = BASELINE_DIR / f"{args.preset}.json"
+    if args.update_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"baseline written to {baseline_path}")
+    if args.check_baseline:
+        if not baseline_path.exists():
+            sys.exit(f"no baseline at {baseline_path}; run with --update-baseline first")
+        problems = check(results, json.loads(baseline_path.read_text()))
+        for p in problems:
+            print(f"REGRESSION {p}")
+        if problems:
+            sys.exit(1)
+        print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
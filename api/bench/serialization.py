@@ -0,0 +1,117 @@
+"""Micro-benchmark: validated response path vs. the trusted orjson path.
+
+"before" mirrors what FastAPI did for these routes: build Pydantic models by
+hand, validate them again against `response_model`, `jsonable_encoder`, then
+stdlib `json.dumps`. "after" builds plain dicts and hands them to orjson, which
+is what `app.responses.trusted` does.
+
+    python -m bench.serialization --rows 500 --categories 60
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.schemas.categories import CategoriesMonthResponse, CategoryMonthOut
+from app.schemas.transactions import TxOut
+
+
+def _register_rows(n: int, rng: random.Random) -> list[dict]:
+    accounts = [uuid.uuid4() for _ in range(4)]
+    cats = [uuid.uuid4() for _ in range(40)]
+    rows = []
+    for i in range(n):
+        amount = -rng.randint(100, 20000)
+        rows.append({
+            "id": uuid.uuid4(),
+            "account_id": rng.choice(accounts),
+            "date": date(2025, 1, 1) + timedelta(days=i % 365),
+            "amount_cents": amount,
+            "payee_id": uuid.uuid4(),
+            "payee_name": f"Payee {i % 97}",
+            "memo": "memo text" if i % 3 else None,
+            "transfer_account_id": None,
+            "subtransactions": [{"category_id": rng.choice(cats), "amount_cents": amount, "memo": None}],
+            "state": "cleared",
+        })
+    return rows
+
+
+def _month_parts(n: int, rng: random.Random):
+    groups = [{"id": uuid.uuid4(), "name": f"Group {i}", "sort": i} for i in range(max(1, n // 6))]
+    cats = [
+        {"id": uuid.uuid4(), "group_id": groups[i % len(groups)]["id"], "name": f"Cat {i}", "sort": i,
+         "hidden": False, "is_credit_payment": False}
+        for i in range(n)
+    ]
+    months = [
+        {"category_id": c["id"], "month": date(2025, 1, 1), "assigned_cents": rng.randint(0, 50000),
+         "activity_cents": rng.randint(0, 50000), "available_cents": 0}
+        for c in cats
+    ]
+    return groups, cats, months
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=500)
+    ap.add_argument("--categories", type=int, default=60)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+    rng = random.Random(1)
+
+    rows = _register_rows(args.rows, rng)
+    tx_adapter = TypeAdapter(list[TxOut])
+
+    def register_before():
+        models = [TxOut(**r) for r in rows]
+        validated = tx_adapter.validate_python([m.model_dump() for m in models])
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    def register_after():
+        return orjson.dumps([dict(r, income_for_month=None) for r in rows])
+
+    groups, cats, months = _month_parts(args.categories, rng)
+
+    def month_before():
+        body = CategoriesMonthResponse(
+            month=date(2025, 1, 1), groups=groups, categories=cats,
+            months=[CategoryMonthOut(**m) for m in months], available_to_budget_cents=0,
+        )
+        validated = CategoriesMonthResponse.model_validate(body.model_dump())
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    def month_after():
+        return orjson.dumps({
+            "month": date(2025, 1, 1), "groups": groups, "categories": cats,
+            "months": months, "available_to_budget_cents": 0,
+        })
+
+    print(f"{'payload':24s} {'before ms':>10s} {'after ms':>10s} {'speedup':>8s} {'bytes':>8s}")
+    for name, before, after in (
+        (f"register ({args.rows} rows)", register_before, register_after),
+        (f"month ({args.categories} cats)", month_before, month_after),
+    ):
+        b = _time(before, args.repeat)
+        a = _time(after, args.repeat)
+        print(f"{name:24s} {b:10.3f} {a:10.3f} {b / a if a else 0:7.1f}x {len(after()):8d}")
+
+
+if __name__ == "__main__":
+    main()
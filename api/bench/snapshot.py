@@ -0,0 +1,42 @@
+"""Time a snapshot round trip (export, then import as a clone) for one budget.
+
+    python -m app.seeds.synthetic --preset xlarge      # prints a budget id
+    python -m bench.snapshot <budget_id> [--keep]
+
+The clone is rolled back unless --keep is given.
+"""
+import argparse
+import tempfile
+import time
+import uuid
+
+from app.db import SessionLocal
+from app.services import snapshot
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("budget_id", type=uuid.UUID)
+    ap.add_argument("--keep", action="store_true", help="commit the clone")
+    args = ap.parse_args()
+
+    with SessionLocal() as db, tempfile.TemporaryFile() as fp:
+        t0 = time.perf_counter()
+        snapshot.export_budget(db, args.budget_id, fp)
+        exported = time.perf_counter() - t0
+        size = fp.tell()
+        fp.seek(0)
+        t0 = time.perf_counter()
+        new_id = snapshot.import_snapshot(db, fp, clone=True, name="snapshot bench")
+        imported = time.perf_counter() - t0
+        if args.keep:
+            db.commit()
+        else:
+            db.rollback()
+
+    print(f"export  {exported:8.2f}s  {size / 1e6:8.1f} MB")
+    print(f"import  {imported:8.2f}s  (clone {new_id}{'' if args.keep else ', rolled back'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Bytes on the wire and server CPU per response encoding.
+
+Serializes the register and month-view payloads (full, and with a typical
+`fields=` selection) the way the trusted path does, then compresses each with
+every coding this process can produce at the configured levels. Reports the
+body size and the median time spent serializing plus compressing.
+
+    python -m bench.wire --rows 500 --categories 60
+"""
+import argparse
+import random
+from datetime import date
+
+import orjson
+
+from app import compression, fieldsets
+from bench.serialization import _month_parts, _register_rows, _time
+
+
+REGISTER_FIELDS = frozenset({"id", "date", "amount_cents", "payee_name"})
+MONTH_FIELDS = frozenset({"month", "months", "available_to_budget_cents"})
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=500)
+    ap.add_argument("--categories", type=int, default=60)
+    ap.add_argument("--repeat", type=int, default=100)
+    args = ap.parse_args()
+    rng = random.Random(1)
+
+    rows = [dict(r, income_for_month=None) for r in _register_rows(args.rows, rng)]
+    groups, cats, months = _month_parts(args.categories, rng)
+    month = {
+        "month": date(2025, 1, 1), "groups": groups, "categories": cats,
+        "months": months, "available_to_budget_cents": 0, "age_of_money_days": 21,
+    }
+    payloads = (
+        (f"register ({args.rows} rows)", lambda: [fieldsets.prune(r, None) for r in rows]),
+        ("register ?fields", lambda: [fieldsets.prune(r, REGISTER_FIELDS) for r in rows]),
+        (f"month ({args.categories} cats)", lambda: month),
+        ("month ?fields", lambda: fieldsets.prune(month, MONTH_FIELDS)),
+    )
+
+    codings = ["identity", *compression.available()]
+    print(f"{'payload':24s} {'coding':>8s} {'bytes':>9s} {'ratio':>6s} {'cpu ms':>8s}")
+    for name, build in payloads:
+        raw = len(orjson.dumps(build()))
+        for coding in codings:
+            if coding == "identity":
+                def encode():
+                    return orjson.dumps(build())
+            else:
+                def encode(coding=coding):
+                    return compression.compress(coding, orjson.dumps(build()))
+            size = len(encode())
+            ms = _time(encode, args.repeat)
+            print(f"{name:24s} {coding:>8s} {size:9d} {raw / size:5.1f}x {ms:8.3f}")
+
+
+if __name__ == "__main__":
+    main()